@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark the linear PCM mixer against repeated AudioSegment concatenation
+for 10-, 30- and 60-minute episodes. With --mp3, also compare the full mux
+stage (decode + mix + export) against MP3 frame-level stream copy.
+
+    python benchmarks/bench_audio_mixer.py --minutes 10 30 60
+    python benchmarks/bench_audio_mixer.py --minutes 10 30 60 --mp3 --skip-quadratic
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydub import AudioSegment
+from src.server.generate_audio.mixer import mix_segments
+from src.server.generate_audio.audio_format import decode_audio_bytes
+from src.server.generate_audio.mp3_frames import concat_mp3
+
+FRAME_RATE = 44100
+
+
+def make_segments(minutes, segment_seconds):
+    """Noise segments shaped like decoded ElevenLabs output (44.1 kHz mono 16-bit)"""
+    count = max(1, int(minutes * 60 / (segment_seconds + 0.5)))
+    # A handful of distinct buffers is enough; reusing them keeps memory in check
+    pool = [
+        AudioSegment(data=os.urandom(int(FRAME_RATE * segment_seconds) * 2),
+                     sample_width=2, frame_rate=FRAME_RATE, channels=1)
+        for _ in range(4)
+    ]
+    return [pool[i % len(pool)] for i in range(count)]
+
+
+def concat_quadratic(segments, gap_ms=500):
+    """The previous implementation: += for every pause and segment"""
+    combined = AudioSegment.empty()
+    for i, segment in enumerate(segments):
+        if i > 0 and len(combined) > 0:
+            combined += AudioSegment.silent(duration=gap_ms, frame_rate=FRAME_RATE)
+        combined += segment
+    return combined
+
+
+def encode_mp3(segments):
+    """Encode segments like ElevenLabs' mp3_44100_128 output"""
+    encoded = []
+    cache = {}
+    for segment in segments:
+        if id(segment) not in cache:
+            buffer = io.BytesIO()
+            segment.export(buffer, format='mp3', bitrate='128k')
+            cache[id(segment)] = buffer.getvalue()
+        encoded.append(cache[id(segment)])
+    return encoded
+
+
+def mux_pcm(mp3_segments):
+    """Decode every segment, mix, and re-encode at 192k stereo"""
+    mixed = mix_segments([decode_audio_bytes(data, 'mp3') for data in mp3_segments])
+    buffer = io.BytesIO()
+    mixed.export(buffer, format='mp3', bitrate='192k', parameters=['-ac', '2'])
+    return buffer.getvalue()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--minutes', type=int, nargs='+', default=[10, 30, 60])
+    parser.add_argument('--segment-seconds', type=float, default=15.0)
+    parser.add_argument('--skip-quadratic', action='store_true', help="only time the linear mixer")
+    parser.add_argument('--mp3', action='store_true', help="also time the mux stage on MP3 input (needs ffmpeg)")
+    args = parser.parse_args()
+
+    for minutes in args.minutes:
+        segments = make_segments(minutes, args.segment_seconds)
+        linear_time, mixed = timed(mix_segments, segments)
+        line = f"{minutes:>3} min ({len(segments)} segments): mixer {linear_time:7.3f}s"
+        if not args.skip_quadratic:
+            quadratic_time, concatenated = timed(concat_quadratic, segments)
+            assert len(mixed) == len(concatenated), "mixer and += disagree on duration"
+            line += f"  +=-loop {quadratic_time:7.3f}s  speedup {quadratic_time / linear_time:6.1f}x"
+        print(line)
+
+        if args.mp3:
+            mp3_segments = encode_mp3(segments)
+            pcm_time, _ = timed(mux_pcm, mp3_segments)
+            copy_time, joined = timed(concat_mp3, mp3_segments)
+            assert joined is not None, "segments were not stream-copyable"
+            print(f"      mux: decode+mix+encode {pcm_time:7.3f}s  stream copy {copy_time * 1000:8.1f}ms  "
+                  f"speedup {pcm_time / copy_time:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
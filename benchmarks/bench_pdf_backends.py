@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Compare PDF extraction backends on a corpus of local PDFs: throughput and
+output parity (word overlap of the text, number of images found) against
+the first backend listed.
+
+    python benchmarks/bench_pdf_backends.py --corpus ~/papers --backends pdfplumber pymupdf
+"""
+
+import argparse
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.server.generate_transcript.pdf_backends import open_pdf
+from src.server.generate_transcript.pdf_processor import extract_pdf_content
+
+
+def word_overlap(a, b):
+    """Share of words (with multiplicity) the two texts have in common; insensitive to layout"""
+    a_words, b_words = Counter(re.findall(r'\w+', a.lower())), Counter(re.findall(r'\w+', b.lower()))
+    total = max(sum(a_words.values()), sum(b_words.values()))
+    return sum((a_words & b_words).values()) / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', required=True, help="directory searched recursively for *.pdf")
+    parser.add_argument('--backends', nargs='+', default=['pdfplumber', 'pymupdf'])
+    parser.add_argument('--workers', type=int, default=1, help="extraction processes per document")
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.corpus).expanduser().glob('**/*.pdf'))
+    if not paths:
+        sys.exit(f"No PDFs found under {args.corpus}")
+    documents = [(path.name, path.read_bytes()) for path in paths]
+    total_pages = 0
+    for _, content in documents:
+        with open_pdf(content, args.backends[0]) as pdf:
+            total_pages += pdf.page_count
+    print(f"{len(documents)} PDFs, {total_pages} pages, workers={args.workers}")
+
+    reference = {}
+    for backend in args.backends:
+        start = time.perf_counter()
+        outputs = {name: extract_pdf_content(content, workers=args.workers, backend=backend)
+                   for name, content in documents}
+        elapsed = time.perf_counter() - start
+        reference = reference or outputs
+
+        overlaps = [word_overlap(reference[name][0], text) for name, (text, _) in outputs.items()]
+        images = sum(len(found) for _, found in outputs.values())
+        reference_images = sum(len(found) for _, found in reference.values())
+        print(f"  {backend:<11} {elapsed:7.2f}s  {total_pages / elapsed:7.1f} pages/s  "
+              f"text overlap min {min(overlaps):.3f} mean {sum(overlaps) / len(overlaps):.3f}  "
+              f"images {images} (reference {reference_images})")
+
+
+if __name__ == '__main__':
+    main()
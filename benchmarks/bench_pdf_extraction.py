@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark serial vs. process-pool PDF extraction on a corpus of local PDFs.
+
+    python benchmarks/bench_pdf_extraction.py --corpus ~/papers --workers 1 2 4 8
+"""
+
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pdfplumber
+from src.server.generate_transcript.pdf_processor import extract_pdf_content
+
+
+def load_corpus(corpus):
+    paths = sorted(Path(corpus).expanduser().glob('**/*.pdf'))
+    if not paths:
+        sys.exit(f"No PDFs found under {corpus}")
+    documents = []
+    for path in paths:
+        content = path.read_bytes()
+        with pdfplumber.open(io.BytesIO(content)) as pdf:
+            documents.append((path.name, content, len(pdf.pages)))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', required=True, help="directory searched recursively for *.pdf")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus)
+    total_pages = sum(pages for _, _, pages in documents)
+    print(f"{len(documents)} PDFs, {total_pages} pages")
+
+    baseline = None
+    reference = {}
+    for workers in args.workers:
+        start = time.perf_counter()
+        mismatches = 0
+        for name, content, _ in documents:
+            text, images = extract_pdf_content(content, workers=workers)
+            # Every worker count must reproduce the serial output exactly
+            output = (text, [(image['page'], image['image'], len(image['data'])) for image in images])
+            if reference.setdefault(name, output) != output:
+                mismatches += 1
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"  workers={workers:<3} {elapsed:7.2f}s  {total_pages / elapsed:7.1f} pages/s  "
+              f"{baseline / elapsed:5.1f}x  mismatches={mismatches}")
+
+
+if __name__ == '__main__':
+    main()
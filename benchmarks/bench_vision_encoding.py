@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare full-resolution PNG encoding of figures against the downscaled,
+compact encoding now sent to the vision model: bytes per image, encode time
+and estimated upload time. Figures come from a corpus of local PDFs.
+
+    python benchmarks/bench_vision_encoding.py --corpus ~/papers --mbps 20
+"""
+
+import argparse
+import base64
+import io
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+from src.server.generate_transcript.pdf_processor import extract_pdf_content, encode_image_to_base64
+
+
+def encode_png_full(image):
+    """The previous encoding: lossless PNG at full resolution"""
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', required=True, help="directory searched recursively for *.pdf")
+    parser.add_argument('--mbps', type=float, default=20.0, help="uplink bandwidth for the upload estimate")
+    args = parser.parse_args()
+
+    figures = []
+    for path in sorted(Path(args.corpus).expanduser().glob('**/*.pdf')):
+        _, images = extract_pdf_content(path.read_bytes(), workers=1)
+        for image in images:
+            try:
+                figures.append(Image.open(io.BytesIO(image['data'])))
+            except Exception:
+                continue  # raw streams PIL cannot read are skipped by describe_images too
+    if not figures:
+        sys.exit(f"No decodable figures found under {args.corpus}")
+    print(f"{len(figures)} figures, upload estimate at {args.mbps} Mbit/s")
+
+    def measure(encode):
+        sizes, seconds, formats = [], 0.0, Counter()
+        for figure in figures:
+            figure.load()
+            start = time.perf_counter()
+            result = encode(figure)
+            seconds += time.perf_counter() - start
+            encoded, mime_type = result if isinstance(result, tuple) else (result, 'image/png')
+            sizes.append(len(encoded) * 3 // 4)
+            formats[mime_type] += 1
+        return sizes, seconds, formats
+
+    for name, encode in [("png full-res", encode_png_full), ("vision-ready", encode_image_to_base64)]:
+        sizes, seconds, formats = measure(encode)
+        upload = sum(sizes) * 8 / (args.mbps * 1_000_000)
+        print(f"  {name:<13} mean {sum(sizes) / len(sizes) / 1024:8.1f} KiB/image  max {max(sizes) / 1024:8.1f} KiB  "
+              f"encode {seconds / len(sizes) * 1000:6.1f} ms/image  upload {upload / len(sizes) * 1000:7.1f} ms/image  "
+              f"{dict(formats)}")
+
+
+if __name__ == '__main__':
+    main()
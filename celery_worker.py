@@ -17,10 +17,11 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 # Import the Celery app and tasks from the Flask application
-from src.app import celery, process_paper_async
+from src.app import celery
+from src.server.pipeline import QUEUES
 
 # Ensure the task is registered
-celery.autodiscover_tasks(['src.app'])
+celery.autodiscover_tasks(['src.app', 'src.server.pipeline'])
 
 # Debug: Print registered tasks
 print("Registered tasks:")
@@ -28,5 +29,10 @@ for task_name in celery.tasks.keys():
     print(f"  - {task_name}")
 
 if __name__ == '__main__':
+    # Consume every pipeline stage by default; set CELERY_QUEUES (e.g. "tts")
+    # to run a worker dedicated to specific stages
+    queues = os.environ.get('CELERY_QUEUES', ','.join(['celery'] + QUEUES))
+    print(f"Consuming queues: {queues}")
+    
     # Start the Celery worker
-    celery.worker_main(['worker', '--loglevel=info']) 
\ No newline at end of file
+    celery.worker_main(['worker', '--loglevel=info', '-Q', queues]) 
\ No newline at end of file
@@ -1,13 +1,17 @@
-import time
 import os
+import json
 import socket
 import logging
 from pathlib import Path
-from flask import Flask, render_template, send_from_directory, jsonify, request, send_file
-from src.server.generate_transcript.arxiv import query, query_for_pdf
-from src.server.generate_transcript.transcript_generator import generate_transcript
-from src.server.generate_audio.audio_generator import TTSMiddleware
-from src.server.generate_transcript.pdf_processor import process_pdf
+from flask import Flask, render_template, send_from_directory, jsonify, request, send_file, Response, stream_with_context
+from src.server.generate_transcript.arxiv import query, get_search_cache, get_pdf_cache
+from src.server.generate_audio.audio_generator import TTSMiddleware, get_segment_cache
+from src.server.generate_transcript.pdf_processor import get_vision_cache
+from src.server.generate_transcript.transcript_generator import get_transcript_cache
+from src.server.pipeline import submit_podcast_job, TASK_ROUTES
+from src.server.job_registry import JobRegistry
+from src.server.http_client import connection_stats, worker_connection_stats
+from src.server.progress import get_status, status_event, subscribe_events
 from celery import Celery
 
 # Configure logging
@@ -41,10 +45,9 @@ celery.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
-    task_routes={
-        'whitepaper_pod.process_paper_async': {'queue': 'celery'}
-    },
-    imports=['src.app']
+    # Each pipeline stage has its own queue (see src/server/pipeline.py)
+    task_routes=TASK_ROUTES,
+    imports=['src.app', 'src.server.pipeline']
 )
 
 # Ensure required directories exist
@@ -99,51 +102,6 @@ def upload_pdf():
     
     return jsonify({"error": "Invalid file type"}), 400
 
-@celery.task(name='whitepaper_pod.process_paper_async')
-def process_paper_async(paper_url, paper_title, podcast_settings=None):
-    try:
-        pdf_content = query_for_pdf(paper_url)
-        if not pdf_content:
-            raise Exception("Failed to retrieve the PDF content")
-
-        text, image_descriptions = process_pdf(pdf_content)
-        
-        # Use podcast settings from frontend, with defaults
-        if podcast_settings:
-            options = {
-                "length_minutes": podcast_settings.get("length", 5),
-                "listener_expertise_level": podcast_settings.get("expertise", "Intermediate"),
-                "number_of_speakers": podcast_settings.get("speakers", 3)
-            }
-            print(f"Using frontend settings: {options}")
-        else:
-            options = {
-                "length_minutes": 5, 
-                "listener_expertise_level": "Intermediate", 
-                "number_of_speakers": 3 
-            }
-            print(f"Using default settings: {options}")
-
-        transcript = generate_transcript({
-            "title": paper_title,
-            "summary": text
-        }, options, image_descriptions)
-        
-        # Generate audio
-        filename = f"{paper_title.replace(' ', '_')}_{int(time.time())}"
-        tts_middleware = TTSMiddleware()
-        audio_path = tts_middleware.convert_to_audio(transcript, filename)
-
-        return {
-            "title": paper_title,
-            "transcript": transcript,
-            "audio_url": f"/static/audio/{filename}.mp3",
-            "audio_path": audio_path
-        }
-    except Exception as e:
-        print(f"Error processing paper: {str(e)}")
-        raise
-
 @app.route('/api/generate_podcast', methods=['POST'])
 def generate_podcast():
     if not request.json:
@@ -162,27 +120,92 @@ def generate_podcast():
         return jsonify({"error": "Missing paper_id or paper_title"}), 400
 
     try:
-        task = process_paper_async.delay(selected_paper_url, selected_paper_title, podcast_settings)
-        return jsonify({"task_id": task.id})
+        # Identical in-flight or finished jobs are shared instead of re-run
+        return jsonify(submit_podcast_job(selected_paper_url, selected_paper_title, podcast_settings))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/task_status/<task_id>')
 def task_status(task_id):
-    task = process_paper_async.AsyncResult(task_id)
-    if task.ready():
-        if task.successful():
-            return jsonify(task.result)
-        else:
-            return jsonify({"error": str(task.result)}), 500
+    # One backend lookup; while running, the meta is just the small progress dict
+    event, payload = status_event(get_status(task_id))
+    if event == 'failed':
+        return jsonify(payload), 500
+    return jsonify(payload)
+
+@app.route('/api/task_events/<task_id>')
+def task_events(task_id):
+    """
+    Server-Sent Events stream of a task's progress, ending with its result
+
+    Subscribes to the job's Redis channel instead of having clients poll
+    /api/task_status. The backend state is re-read on every heartbeat so a
+    missed final event can't leave the stream hanging.
+    """
+    heartbeat = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+
+    def format_event(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    def stream():
+        # Subscribe before reading the snapshot so no event falls in between
+        pubsub = subscribe_events(task_id)
+        try:
+            event, payload = status_event(get_status(task_id))
+            yield format_event(event, payload)
+            if event != 'progress':
+                return
+
+            while True:
+                message = pubsub.get_message(timeout=heartbeat)
+                if message is None:
+                    event, payload = status_event(get_status(task_id))
+                    if event != 'progress':
+                        yield format_event(event, payload)
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+
+                message = json.loads(message['data'])
+                yield format_event(message['event'], message['data'])
+                if message['event'] != 'progress':
+                    return
+        finally:
+            pubsub.close()
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let nginx buffer the stream
+    })
+
+@app.route('/api/cache_stats')
+def cache_stats():
+    """Report hit/miss counters of the persistent caches and the job registry"""
+    segment_cache = get_segment_cache()
+    vision_cache = get_vision_cache()
+    search_cache = get_search_cache()
+    pdf_cache = get_pdf_cache()
+    transcript_cache = get_transcript_cache()
+    return jsonify({
+        "tts_segments": segment_cache.stats() if segment_cache else None,
+        "vision_descriptions": vision_cache.stats() if vision_cache else None,
+        "arxiv_search": search_cache.stats() if search_cache else None,
+        "arxiv_pdfs": pdf_cache.stats() if pdf_cache else None,
+        "transcripts": transcript_cache.stats() if transcript_cache else None,
+        "jobs": JobRegistry().stats()
+    })
+
+@app.route('/api/http_stats')
+def http_stats():
+    """Report keep-alive connection reuse of the arXiv HTTP pool per process"""
     return jsonify({
-        "status": "processing",
-        "current_step": "Processing document...",
-        "progress": 50
+        "web": connection_stats(),
+        "workers": worker_connection_stats()
     })
 
-@app.route('/static/audio/<filename>')
+@app.route('/static/audio/<path:filename>')
 def serve_audio(filename):
+    # Also serves early-playback chunks and playlists under <episode>/
     return send_from_directory('src/client/static/audio', filename)
 
 @app.route('/convert-to-audio', methods=['POST'])
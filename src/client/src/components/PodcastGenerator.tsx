@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Card } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Progress } from '@/components/ui/progress';
@@ -38,6 +38,13 @@ const PodcastGenerator: React.FC<PodcastGeneratorProps> = ({
   const [audioProgress, setAudioProgress] = useState(0);
   const [audioDuration, setAudioDuration] = useState(0);
   const [currentTime, setCurrentTime] = useState(0);
+  // Early playback of the chunks published while the rest is still being generated
+  const [earlyAvailable, setEarlyAvailable] = useState(false);
+  const [isEarlyPlaying, setIsEarlyPlaying] = useState(false);
+  const earlyManifestUrl = useRef<string | null>(null);
+  const earlyAudio = useRef<HTMLAudioElement | null>(null);
+  const earlyChunk = useRef(0);
+  const earlyOffset = useRef(0);
 
   const steps = [
     { id: 'parsing', label: 'Parsing document content', duration: 2000 },
@@ -53,6 +60,173 @@ const PodcastGenerator: React.FC<PodcastGeneratorProps> = ({
     }
   }, [document]);
 
+  // Apply a task status payload; returns true once the podcast is ready
+  const applyTaskStatus = (result: any): boolean => {
+    if (result.status === 'processing') {
+      if (result.progressive?.manifest_url) {
+        earlyManifestUrl.current = result.progressive.manifest_url;
+        setEarlyAvailable(true);
+      }
+      // The server reports real per-stage progress (0-100) and a step label;
+      // a payload without progress (task retrying) keeps the current figure
+      setProgress((current) => result.progress ?? current);
+      setCurrentStep(
+        result.total
+          ? `${result.current_step} (${result.done}/${result.total})`
+          : result.current_step || 'Processing...'
+      );
+      return false;
+    }
+
+    if (result.audio_url) {
+      // Task completed successfully
+      const resumeAt = stopEarlyPlayback();
+      setProgress(100);
+      setCurrentStep('Podcast generated successfully!');
+      setIsGenerating(false);
+      setPodcastUrl(result.audio_url);
+      
+      // Create audio element for playback
+      const audio = new Audio(result.audio_url);
+      audio.addEventListener('ended', () => setIsPlaying(false));
+      audio.addEventListener('loadedmetadata', () => {
+        setAudioDuration(audio.duration);
+      });
+      audio.addEventListener('timeupdate', () => {
+        setCurrentTime(audio.currentTime);
+        setAudioProgress((audio.currentTime / audio.duration) * 100);
+      });
+      setAudioElement(audio);
+      if (resumeAt !== null) {
+        // Carry on in the full episode from where early playback got to
+        audio.currentTime = resumeAt;
+        audio.play();
+        setIsPlaying(true);
+      }
+      return true;
+    }
+
+    // Task failed
+    throw new Error(result.error || 'Podcast generation failed');
+  };
+
+  // Play published chunks back to back, waiting for the next one when we catch up
+  const playNextEarlyChunk = async () => {
+    if (!earlyManifestUrl.current) {
+      return;
+    }
+    try {
+      const response = await fetch(earlyManifestUrl.current, { cache: 'no-store' });
+      const manifest = await response.json();
+      const chunk = manifest.chunks[earlyChunk.current];
+      if (!earlyManifestUrl.current) {
+        return; // the full episode arrived in the meantime
+      }
+      if (!chunk) {
+        if (!manifest.complete) {
+          setTimeout(playNextEarlyChunk, 2000);
+        }
+        return;
+      }
+      if (earlyChunk.current > 0) {
+        earlyOffset.current += manifest.chunks[earlyChunk.current - 1].duration;
+      }
+      earlyChunk.current += 1;
+      const audio = new Audio(chunk.url);
+      audio.addEventListener('ended', playNextEarlyChunk);
+      earlyAudio.current = audio;
+      await audio.play();
+      setIsEarlyPlaying(true);
+    } catch (error) {
+      console.error('Early playback failed:', error);
+    }
+  };
+
+  const handleEarlyPlayPause = () => {
+    const audio = earlyAudio.current;
+    if (!audio) {
+      playNextEarlyChunk();
+    } else if (isEarlyPlaying) {
+      audio.pause();
+      setIsEarlyPlaying(false);
+    } else {
+      audio.play();
+      setIsEarlyPlaying(true);
+    }
+  };
+
+  // Stop early playback; returns the position reached if it was playing
+  const stopEarlyPlayback = (): number | null => {
+    const audio = earlyAudio.current;
+    earlyManifestUrl.current = null;
+    earlyAudio.current = null;
+    setEarlyAvailable(false);
+    setIsEarlyPlaying(false);
+    if (!audio || audio.paused) {
+      return null;
+    }
+    audio.pause();
+    return earlyOffset.current + audio.currentTime;
+  };
+
+  const failGeneration = (error: unknown) => {
+    console.error('Error following task status:', error);
+    stopEarlyPlayback();
+    setCurrentStep('Error: Failed to generate podcast');
+    setIsGenerating(false);
+  };
+
+  const pollTaskStatus = (taskId: string) => {
+    const pollInterval = setInterval(async () => {
+      try {
+        const statusResponse = await fetch(`/api/task_status/${taskId}`);
+        if (!statusResponse.ok) {
+          throw new Error('Failed to check task status');
+        }
+        if (applyTaskStatus(await statusResponse.json())) {
+          clearInterval(pollInterval);
+        }
+      } catch (error) {
+        clearInterval(pollInterval);
+        failGeneration(error);
+      }
+    }, 2000); // Poll every 2 seconds
+  };
+
+  const followTask = (taskId: string) => {
+    // Prefer server-pushed updates; fall back to polling if SSE is unavailable
+    if (typeof EventSource === 'undefined') {
+      pollTaskStatus(taskId);
+      return;
+    }
+
+    const source = new EventSource(`/api/task_events/${taskId}`);
+    let finished = false;
+    const onEvent = (event: MessageEvent) => {
+      try {
+        if (applyTaskStatus(JSON.parse(event.data))) {
+          finished = true;
+          source.close();
+        }
+      } catch (error) {
+        finished = true;
+        source.close();
+        failGeneration(error);
+      }
+    };
+    source.addEventListener('progress', onEvent);
+    source.addEventListener('done', onEvent);
+    source.addEventListener('failed', onEvent);
+    source.onerror = () => {
+      // Connection dropped before a final event: carry on by polling
+      if (!finished) {
+        finished = true;
+        source.close();
+        pollTaskStatus(taskId);
+      }
+    };
+  };
+
   const generatePodcast = async () => {
     setIsGenerating(true);
     setProgress(0);
@@ -86,65 +260,17 @@ const PodcastGenerator: React.FC<PodcastGeneratorProps> = ({
         throw new Error('Failed to start podcast generation');
       }
 
-      const { task_id } = await response.json();
-      
-      // Step 2: Poll for task completion
+      const { task_id, result } = await response.json();
+
+      // An identical podcast was already generated: play it right away
+      if (result && applyTaskStatus(result)) {
+        return;
+      }
+
+      // Step 2: Follow the task until it completes
       setCurrentStep('Processing document content...');
       setProgress(20);
-      
-      const pollInterval = setInterval(async () => {
-        try {
-          const statusResponse = await fetch(`/api/task_status/${task_id}`);
-          
-          if (statusResponse.ok) {
-            const result = await statusResponse.json();
-            
-            if (result.status === 'processing') {
-              // Update progress based on current step
-              const progressMap = {
-                'parsing': 30,
-                'analyzing': 50,
-                'scripting': 70,
-                'synthesizing': 90,
-                'finalizing': 95
-              };
-              
-              setProgress(progressMap[result.current_step] || 20);
-              setCurrentStep(result.current_step || 'Processing...');
-            } else if (result.audio_url) {
-              // Task completed successfully
-              clearInterval(pollInterval);
-              setProgress(100);
-              setCurrentStep('Podcast generated successfully!');
-              setIsGenerating(false);
-              setPodcastUrl(result.audio_url);
-              
-              // Create audio element for playback
-              const audio = new Audio(result.audio_url);
-              audio.addEventListener('ended', () => setIsPlaying(false));
-              audio.addEventListener('loadedmetadata', () => {
-                setAudioDuration(audio.duration);
-              });
-              audio.addEventListener('timeupdate', () => {
-                setCurrentTime(audio.currentTime);
-                setAudioProgress((audio.currentTime / audio.duration) * 100);
-              });
-              setAudioElement(audio);
-            } else {
-              // Task failed
-              clearInterval(pollInterval);
-              throw new Error(result.error || 'Podcast generation failed');
-            }
-          } else {
-            throw new Error('Failed to check task status');
-          }
-        } catch (error) {
-          clearInterval(pollInterval);
-          console.error('Error polling task status:', error);
-          setCurrentStep('Error: Failed to generate podcast');
-          setIsGenerating(false);
-        }
-      }, 2000); // Poll every 2 seconds
+      followTask(task_id);
 
     } catch (error) {
       console.error('Error generating podcast:', error);
@@ -219,6 +345,17 @@ const PodcastGenerator: React.FC<PodcastGeneratorProps> = ({
               <Progress value={progress} className="w-full" />
             </div>
 
+            {earlyAvailable && (
+              <div className="flex items-center justify-between bg-green-50 p-4 rounded-lg">
+                <p className="text-sm text-gray-700 text-left">
+                  The first part of your podcast is ready. Start listening while the rest is generated.
+                </p>
+                <Button variant="outline" size="sm" onClick={handleEarlyPlayPause} className="ml-4">
+                  {isEarlyPlaying ? <Pause className="h-4 w-4" /> : <Play className="h-4 w-4" />}
+                </Button>
+              </div>
+            )}
+
             <div className="bg-blue-50 p-4 rounded-lg">
               <h4 className="font-semibold mb-2">What's happening:</h4>
               <ul className="text-sm text-gray-700 space-y-1">
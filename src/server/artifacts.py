@@ -0,0 +1,83 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """
+    File-backed store for intermediate pipeline artifacts
+
+    Celery tasks exchange small references (relative paths) instead of pushing
+    PDFs, images and audio through the Redis result backend. When workers run
+    on several hosts, ARTIFACT_ROOT must point at storage they all share.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv('ARTIFACT_ROOT', 'tmp/artifacts')
+
+    def path(self, ref: str) -> str:
+        """Absolute path on disk for an artifact reference"""
+        return os.path.join(self.root, ref)
+
+    def put_bytes(self, job_id: str, name: str, data: bytes) -> str:
+        """Write data for a job and return its reference"""
+        ref = os.path.join(job_id, name)
+        path = self.path(ref)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial artifact
+        temp_path = f"{path}.part"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return ref
+
+    def put_file(self, job_id: str, name: str, source_path: str, move: bool = False) -> str:
+        """Copy (or move) a file into a job's artifacts without reading it into memory"""
+        ref = os.path.join(job_id, name)
+        path = self.path(ref)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if move:
+            shutil.move(source_path, path)
+        else:
+            temp_path = f"{path}.part"
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, path)
+        return ref
+
+    def sha256(self, ref: str) -> str:
+        """Content hash of an artifact, read in blocks"""
+        digest = hashlib.sha256()
+        with open(self.path(ref), 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_bytes(self, ref: str) -> bytes:
+        with open(self.path(ref), 'rb') as f:
+            return f.read()
+
+    def put_json(self, job_id: str, name: str, value) -> str:
+        return self.put_bytes(job_id, name, json.dumps(value).encode('utf-8'))
+
+    def get_json(self, ref: str):
+        return json.loads(self.get_bytes(ref).decode('utf-8'))
+
+    def exists(self, ref: str) -> bool:
+        return os.path.exists(self.path(ref))
+
+    def list(self, job_id: str, prefix: str = ''):
+        """References of a job's artifacts under prefix (e.g. 'segments/')"""
+        directory = self.path(os.path.join(job_id, prefix))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(job_id, prefix, name)
+                      for name in os.listdir(directory) if not name.endswith('.part'))
+
+    def delete_job(self, job_id: str):
+        """Remove every artifact belonging to a job"""
+        shutil.rmtree(self.path(job_id), ignore_errors=True)
+        logger.info(f"Removed artifacts for job {job_id}")
@@ -0,0 +1,137 @@
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFailure:
+    """
+    Placeholder returned in place of a result when an item exhausted its retries
+    """
+
+    def __init__(self, index: int, error: Exception, attempts: int):
+        self.index = index
+        self.error = error
+        self.attempts = attempts
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"TaskFailure(index={self.index}, attempts={self.attempts}, error={self.error!r})"
+
+
+def run_with_retry(fn: Callable[[], Any],
+                   max_retries: int = 2,
+                   backoff: float = 0.5,
+                   retry_delay: Optional[Callable[[Exception, int], Optional[float]]] = None,
+                   description: str = "task") -> Any:
+    """
+    Call fn(), retrying with exponential backoff and jitter on failure
+
+    Args:
+        fn: Zero-argument callable to run
+        max_retries: Number of retries after the first attempt
+        backoff: Base delay in seconds, doubled on each retry
+        retry_delay: Optional hook returning a delay for a given exception
+            (e.g. from a Retry-After header), or None to use the default backoff
+        description: Label used in log messages
+
+    Returns:
+        The return value of fn()
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = retry_delay(e, attempt) if retry_delay else None
+            if delay is None:
+                delay = backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+            attempt += 1
+            logger.warning(f"{description} failed ({e}), retry {attempt}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+
+def retry_after(exc: Exception, attempt: int) -> Optional[float]:
+    """
+    retry_delay hook honouring the Retry-After header of HTTP 429/503 errors
+
+    Works with API client exceptions that carry the HTTP response (OpenAI,
+    Anthropic, ElevenLabs, requests). Returns None to use the default backoff.
+    """
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        # HTTP-date form or garbage: fall back to exponential backoff
+        pass
+    return None
+
+
+def map_bounded(fn: Callable[[Any], Any],
+                items: Iterable[Any],
+                max_in_flight: int = 4,
+                max_retries: int = 2,
+                backoff: float = 0.5,
+                retry_delay: Optional[Callable[[Exception, int], Optional[float]]] = None,
+                on_done: Optional[Callable[[int, Any], None]] = None,
+                description: str = "task") -> List[Any]:
+    """
+    Apply fn to every item on a thread pool with at most max_in_flight calls
+    running at once, keeping the results in input order
+
+    Items that still fail after max_retries come back as TaskFailure objects
+    (which are falsy) so one bad item does not sink the whole batch.
+
+    Args:
+        fn: Callable taking a single item
+        items: Items to process
+        max_in_flight: Maximum number of concurrent calls
+        max_retries: Retries per item after the first attempt
+        backoff: Base retry delay in seconds
+        retry_delay: Optional hook overriding the delay for a given exception
+        on_done: Optional callback invoked as on_done(index, result) when an item finishes
+        description: Label used in log messages
+
+    Returns:
+        list: Results (or TaskFailure) in the same order as items
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    results: List[Any] = [None] * len(items)
+    callback_lock = threading.Lock()
+
+    def run(index):
+        try:
+            result = run_with_retry(lambda: fn(items[index]),
+                                    max_retries=max_retries,
+                                    backoff=backoff,
+                                    retry_delay=retry_delay,
+                                    description=f"{description} {index + 1}/{len(items)}")
+        except Exception as e:
+            logger.error(f"{description} {index + 1}/{len(items)} failed after {max_retries + 1} attempts: {e}")
+            result = TaskFailure(index, e, max_retries + 1)
+        results[index] = result
+        if on_done:
+            with callback_lock:
+                on_done(index, result)
+
+    workers = max(1, min(max_in_flight, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() propagates unexpected errors raised outside of run_with_retry
+        list(executor.map(run, range(len(items))))
+
+    return results
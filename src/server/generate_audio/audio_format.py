@@ -0,0 +1,79 @@
+import io
+import os
+import logging
+import tempfile
+from typing import Optional
+from pydub import AudioSegment
+
+logger = logging.getLogger(__name__)
+
+
+def detect_audio_format(audio_bytes: bytes) -> Optional[str]:
+    """
+    Identify the container/codec of audio data from its header bytes
+
+    Args:
+        audio_bytes: Raw audio data
+
+    Returns:
+        str: pydub/ffmpeg format name ('mp3', 'aac', 'mp4', 'wav', 'ogg', 'flac'),
+            or None if the header is not recognized
+    """
+    if not audio_bytes or len(audio_bytes) < 4:
+        return None
+
+    if audio_bytes.startswith(b'ID3'):
+        return 'mp3'
+    if audio_bytes.startswith(b'RIFF') and audio_bytes[8:12] == b'WAVE':
+        return 'wav'
+    if audio_bytes[4:8] == b'ftyp':
+        return 'mp4'
+    if audio_bytes.startswith(b'OggS'):
+        return 'ogg'
+    if audio_bytes.startswith(b'fLaC'):
+        return 'flac'
+
+    # MPEG audio frame sync: 11 set bits. ADTS (AAC) uses layer bits 00,
+    # MP3/MP2 frames use a non-zero layer.
+    if audio_bytes[0] == 0xFF and (audio_bytes[1] & 0xE0) == 0xE0:
+        layer = (audio_bytes[1] >> 1) & 0x03
+        return 'aac' if layer == 0 else 'mp3'
+
+    return None
+
+
+def decode_audio_bytes(audio_bytes: bytes, audio_format: Optional[str] = None) -> AudioSegment:
+    """
+    Decode audio data to an AudioSegment in a single attempt
+
+    WAV is parsed in-process; other formats are piped to ffmpeg from memory.
+    MP4 needs a seekable input (the moov atom may sit at the end of the file),
+    so it is the only format that still goes through a temporary file.
+
+    Args:
+        audio_bytes: Raw audio data
+        audio_format: Format name if already known, otherwise detected from the header
+
+    Returns:
+        AudioSegment: The decoded audio
+    """
+    audio_format = audio_format or detect_audio_format(audio_bytes)
+
+    if audio_format == 'wav':
+        return AudioSegment.from_wav(io.BytesIO(audio_bytes))
+
+    if audio_format == 'mp4':
+        temp_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
+        try:
+            temp_file.write(audio_bytes)
+            temp_file.close()
+            return AudioSegment.from_file(temp_file.name, format='mp4')
+        finally:
+            os.unlink(temp_file.name)
+
+    if audio_format is None:
+        # Unknown header: let ffmpeg probe the stream once
+        logger.warning("Unrecognized audio header, falling back to ffmpeg auto-detection")
+        return AudioSegment.from_file(io.BytesIO(audio_bytes))
+
+    return AudioSegment.from_file(io.BytesIO(audio_bytes), format=audio_format)
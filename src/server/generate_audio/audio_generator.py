@@ -4,9 +4,13 @@ import sqlite3
 import logging
 from typing import List, Dict
 from elevenlabs import ElevenLabs, VoiceSettings
-from pydub import AudioSegment
-import tempfile
 import json
+from contextlib import nullcontext
+from src.server.concurrency import map_bounded, TaskFailure
+from src.server.sqlite_cache import SQLiteLRUCache, make_cache_key
+from src.server.generate_audio.mixer import mix_segments
+from src.server.generate_audio.audio_format import detect_audio_format, decode_audio_bytes
+from src.server.generate_audio.mp3_frames import concat_mp3
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,35 +23,91 @@ elevenlabs = ElevenLabs(
   api_key=os.getenv("ELEVENLABS_API_KEY"),
 )
 
+# voice IDs for 10 distinct speakers
+# https://elevenlabs.io/app/default-voices
+DEFAULT_VOICE_MAPPING = {
+    'female_speaker_1': '9BWtsMINqrJLrRacOk9x',  #Aria
+    'female_speaker_2': 'EXAVITQu4vr4xnSDxMaL', #Sarah
+    'female_speaker_3': 'Xb7hH8MSUJpSbSDYk0k2', #Alice
+    'female_speaker_4': 'XrExE9yKIg1WjnnlVkGX', #Matilda
+    'female_speaker_5': 'pFZP5JQG7iQjIQuC4Bku', #Lily
+    'male_speaker_1': 'JBFqnCBsd6RMkjVDRZzb', #George
+    'male_speaker_2': 'TX3LPaxmHKxFdv7VOQHJ', #Liam
+    'male_speaker_3': 'bIHbv24MWmeRgasZH58o', #Will
+    'male_speaker_4': 'iP95p4xoKVk53GoZ742B', #Chris
+    'male_speaker_5': 'pqHfZKP75CvOlQylNhV4', #Bill
+}
+
+# Shared per-process cache of synthesized segments, created on first use
+_segment_cache = None
+
+def get_segment_cache():
+    """
+    Return the process-wide TTS segment cache, or None if disabled (TTS_CACHE_MAX_MB=0)
+    """
+    global _segment_cache
+    max_mb = float(os.getenv('TTS_CACHE_MAX_MB', 512))
+    if max_mb <= 0:
+        return None
+    if _segment_cache is None:
+        _segment_cache = SQLiteLRUCache(
+            os.getenv('TTS_CACHE_PATH', 'cache/tts_segments.db'),
+            table='tts_segments',
+            max_bytes=int(max_mb * 1024 * 1024)
+        )
+    return _segment_cache
+
+def filter_valid_segments(transcript: list[dict]) -> list[dict]:
+    """
+    Drop transcript entries that are malformed or have no text to speak
+    """
+    segments = []
+    for i, segment in enumerate(transcript):
+        if not isinstance(segment, dict) or 'speaker' not in segment or 'text' not in segment:
+            logger.warning(f"Invalid segment format at index {i}, skipping")
+            continue
+        
+        if not segment['text'].strip():
+            logger.warning(f"Empty text for speaker {segment['speaker']}, skipping")
+            continue
+        
+        segments.append(segment)
+    return segments
+
 class TTSMiddleware:
     """
     Text-to-Speech middleware using ElevenLabs API
     Converts text segments with different speakers to combined audio file
     """
     
-    def __init__(self, app=None):
+    def __init__(self, app=None, client=None, max_in_flight=None, max_retries=None, segment_cache=None, voice_mapping=None,
+                 request_slot=None):
         self.app = app
-        self.client = None
+        self.client = client
+        # Context manager factory held around each ElevenLabs request, e.g. a
+        # semaphore shared by every worker (see pipeline.get_tts)
+        self.request_slot = request_slot or nullcontext
         self.db_path = 'podcast_audio.db'
+        self.segment_cache = segment_cache if segment_cache is not None else get_segment_cache()
+        # Synthesis parameters, all part of the segment cache key
+        self.model_id = "eleven_flash_v2_5"  # You can change this model as needed
+        self.output_format = "mp3_44100_128"
+        self.voice_settings = VoiceSettings(
+            stability=0.5,
+            similarity_boost=0.75,
+        )
+        # Number of ElevenLabs requests allowed in flight at once, and retries per segment
+        self.max_in_flight = max_in_flight or int(os.getenv('TTS_MAX_IN_FLIGHT', 4))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('TTS_MAX_RETRIES', 2))
         # Initialize database
         self._init_database()
         # Create audio directory
         self._create_audio_directory()
         
-        # voice IDs for 10 distinct speakers
-        # https://elevenlabs.io/app/default-voices
-        self.voice_mapping = {
-        'female_speaker_1': '9BWtsMINqrJLrRacOk9x',  #Aria
-        'female_speaker_2': 'EXAVITQu4vr4xnSDxMaL', #Sarah
-        'female_speaker_3': 'Xb7hH8MSUJpSbSDYk0k2', #Alice
-        'female_speaker_4': 'XrExE9yKIg1WjnnlVkGX', #Matilda
-        'female_speaker_5': 'pFZP5JQG7iQjIQuC4Bku', #Lily
-        'male_speaker_1': 'JBFqnCBsd6RMkjVDRZzb', #George
-        'male_speaker_2': 'TX3LPaxmHKxFdv7VOQHJ', #Liam
-        'male_speaker_3': 'bIHbv24MWmeRgasZH58o', #Will
-        'male_speaker_4': 'iP95p4xoKVk53GoZ742B', #Chris
-        'male_speaker_5': 'pqHfZKP75CvOlQylNhV4', #Bill
-        }
+        # Per-job overrides on top of the default voices
+        self.voice_mapping = dict(DEFAULT_VOICE_MAPPING)
+        if voice_mapping:
+            self.voice_mapping.update(voice_mapping)
         
         if app is not None:
             self.init_app(app)
@@ -115,31 +175,55 @@ class TTSMiddleware:
             logger.error(f"Failed to create audio directory: {str(e)}")
             raise
     
-    def _generate_speech_segment(self, text: str, speaker: str) -> bytes:
+    def _segment_cache_key(self, text: str, voice_id: str) -> str:
+        """
+        Content-addressed key for a synthesized line: any change to the text,
+        voice, model, output format or voice settings yields a new key
+        """
+        settings = self.voice_settings
+        if hasattr(settings, 'model_dump'):
+            settings = settings.model_dump()
+        elif hasattr(settings, 'dict'):
+            settings = settings.dict()
+        return make_cache_key(text, voice_id, self.model_id, self.output_format, settings)
+    
+    def _generate_speech_segment(self, text: str, speaker: str, voice_mapping: Dict[str, str] = None) -> bytes:
         """
         Generate speech for a single text segment using ElevenLabs API
+        
+        voice_mapping overrides self.voice_mapping for this call only, so one
+        middleware can serve jobs with different voices.
         """
         try:
+            voices = {**self.voice_mapping, **voice_mapping} if voice_mapping else self.voice_mapping
             # Get voice ID for speaker, default to speaker_1 if not found
-            voice_id = self.voice_mapping.get(speaker, self.voice_mapping['female_speaker_1'])
-            
-            # Generate speech using ElevenLabs API
-            audio = elevenlabs.text_to_speech.convert(
-                text=text,
-                voice_id=voice_id,
-                model_id="eleven_flash_v2_5",  # You can change this model as needed
-                output_format="mp3_44100_128",
-                voice_settings=VoiceSettings(
-                    stability=0.5,
-                    similarity_boost=0.75,
+            voice_id = voices.get(speaker, voices['female_speaker_1'])
+            
+            # Identical lines with identical voice settings are served from the cache
+            cache_key = self._segment_cache_key(text, voice_id)
+            if self.segment_cache is not None:
+                cached = self.segment_cache.get(cache_key)
+                if cached:
+                    logger.info(f"TTS cache hit for speaker {speaker}, text length: {len(text)}")
+                    return cached
+            
+            # Generate speech using ElevenLabs API (or the client injected at init)
+            client = self.client or elevenlabs
+            with self.request_slot():
+                audio = client.text_to_speech.convert(
+                    text=text,
+                    voice_id=voice_id,
+                    model_id=self.model_id,
+                    output_format=self.output_format,
+                    voice_settings=self.voice_settings
                 )
-            )
-            
-            
-            # Convert generator to bytes
-            audio_bytes = b''.join(audio)
+                
+                # Convert generator to bytes (the audio streams in while the request is open)
+                audio_bytes = b''.join(audio)
             logger.info(f"Generated speech for speaker {speaker}, text length: {len(text)}")
-           
+            
+            if self.segment_cache is not None and audio_bytes:
+                self.segment_cache.put(cache_key, audio_bytes)
             
             return audio_bytes
             
@@ -148,13 +232,57 @@ class TTSMiddleware:
             raise
       
         
-    def _combine_audio_segments(self, audio_segments: List[bytes], filename: str) -> str:
+    def _unique_output_path(self, audio_dir: str, filename: str) -> str:
+        """
+        Path for the combined MP3, suffixed with a counter so existing files are never overwritten
+        """
+        output_path = os.path.join(audio_dir, f"{filename}.mp3")
+        
+        counter = 1
+        original_output_path = output_path
+        while os.path.exists(output_path):
+            base_name = f"{filename}_{counter}"
+            output_path = os.path.join(audio_dir, f"{base_name}.mp3")
+            counter += 1
+        
+        if output_path != original_output_path:
+            print(f"File exists, saving as: {output_path}")
+        
+        return output_path
+    
+    def _stream_copy_mp3(self, audio_segments: List[bytes], audio_dir: str, filename: str, progress_callback=None):
+        """
+        Join MP3 segments at the frame level with pre-encoded silence for the pauses
+        
+        Returns:
+            str: Path to the combined audio file, or None if the segments are not
+                all MP3 with matching codec parameters (caller falls back to PCM mixing)
+        """
+        segments = [audio_bytes for audio_bytes in audio_segments if audio_bytes]
+        if not segments or any(detect_audio_format(audio_bytes) != 'mp3' for audio_bytes in segments):
+            return None
+        
+        combined = concat_mp3(segments, gap_ms=500, progress_callback=progress_callback)
+        if combined is None:
+            logger.info("Segments not stream-copyable, falling back to PCM mixing")
+            return None
+        
+        output_path = self._unique_output_path(audio_dir, filename)
+        with open(output_path, 'wb') as output_file:
+            output_file.write(combined)
+        
+        print(f"Stream-copied {len(segments)} MP3 segments to: {output_path} ({len(combined)} bytes)")
+        logger.info(f"Combined audio saved to: {output_path}")
+        return output_path
+    
+    def _combine_audio_segments(self, audio_segments: List[bytes], filename: str, progress_callback=None) -> str:
         """
         Combine multiple audio segments into a single MP3 file
         
         Args:
             audio_segments: List of audio data in bytes format
             filename: Base filename for output (without extension)
+            progress_callback: Optional callback invoked as progress_callback(segments_done, total_segments)
             
         Returns:
             str: Path to the combined audio file
@@ -177,10 +305,14 @@ class TTSMiddleware:
             os.makedirs(audio_dir)
             print(f"Created audio directory: {audio_dir}")
         
-        temp_files = []  # Keep track of temp files for cleanup
-        
         try:
-            combined_audio = AudioSegment.empty()
+            # Fast path: join MP3 segments frame by frame without decoding or re-encoding
+            if os.getenv('AUDIO_STREAM_COPY', '1') != '0':
+                output_path = self._stream_copy_mp3(audio_segments, audio_dir, filename, progress_callback)
+                if output_path:
+                    return output_path
+            
+            decoded_segments = []  # Decoded once, mixed in a single pass below
             
             for i, audio_bytes in enumerate(audio_segments):
                 print(f"Processing segment {i+1}/{len(audio_segments)}")
@@ -193,82 +325,19 @@ class TTSMiddleware:
                 if not isinstance(audio_bytes, bytes):
                     raise TypeError(f"Segment {i+1} is not bytes type: {type(audio_bytes)}")
                 
-                print(f"Segment {i+1} size: {len(audio_bytes)} bytes")
-                
-                # Create temporary file for each segment
-                temp_file = None
                 try:
-                    temp_file = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-                    temp_file.write(audio_bytes)
-                    temp_file.flush()  # Ensure data is written to disk
-                    temp_file_path = temp_file.name
-                    temp_file.close()  # Close file handle before reading
-                    
-                    temp_files.append(temp_file_path)  # Track for cleanup
-                    
-                    print(f"Created temp file: {temp_file_path}")
-                    
-                    # Verify temp file was created and has content
-                    if not os.path.exists(temp_file_path):
-                        raise FileNotFoundError(f"Temp file was not created: {temp_file_path}")
-                    
-                    temp_file_size = os.path.getsize(temp_file_path)
-                    if temp_file_size == 0:
-                        raise ValueError(f"Temp file is empty: {temp_file_path}")
-                    
-                    print(f"Temp file size: {temp_file_size} bytes")
-                    
-                    # Try to load audio segment with multiple format attempts
-                    segment = None
-                    load_successful = False
-                    
-                    # Try different formats in order of likelihood
-                    formats_to_try = [
-                        ('mp3', 'MP3'),
-                        ('mp4', 'MP4/AAC'),
-                        ('wav', 'WAV'),
-                        ('m4a', 'M4A'),
-                        ('aac', 'AAC')
-                    ]
-                    
-                    for format_name, format_description in formats_to_try:
-                        try:
-                            segment = AudioSegment.from_file(temp_file_path, format=format_name)
-                            print(f"Successfully loaded segment {i+1} as {format_description}")
-                            load_successful = True
-                            break
-                        except Exception as format_error:
-                            print(f"Failed to load segment {i+1} as {format_description}: {str(format_error)}")
-                            continue
-                    
-                    # If no format worked, try without specifying format (let pydub auto-detect)
-                    if not load_successful:
-                        try:
-                            segment = AudioSegment.from_file(temp_file_path)
-                            print(f"Successfully loaded segment {i+1} with auto-detection")
-                            load_successful = True
-                        except Exception as auto_error:
-                            print(f"Auto-detection failed for segment {i+1}: {str(auto_error)}")
-                    
-                    if not load_successful:
-                        raise ValueError(f"Could not load audio segment {i+1} in any supported format")
+                    # Sniff the format from the header once and decode straight from memory
+                    audio_format = detect_audio_format(audio_bytes)
+                    segment = decode_audio_bytes(audio_bytes, audio_format)
                     
                     # Validate loaded segment
                     if segment is None or len(segment) == 0:
                         print(f"Warning: Loaded segment {i+1} has zero duration, skipping")
                         continue
                     
-                    print(f"Segment {i+1} duration: {len(segment)}ms, channels: {segment.channels}, frame_rate: {segment.frame_rate}")
+                    print(f"Segment {i+1} ({audio_format or 'auto-detected'}, {len(audio_bytes)} bytes) duration: {len(segment)}ms, channels: {segment.channels}, frame_rate: {segment.frame_rate}")
                     
-                    # Add small pause between segments (0.5 seconds)
-                    if i > 0 and len(combined_audio) > 0:
-                        pause = AudioSegment.silent(duration=500)
-                        combined_audio += pause
-                        print(f"Added 500ms pause after segment {i}")
-                    
-                    # Add segment to combined audio
-                    combined_audio += segment
-                    print(f"Added segment {i+1} to combined audio")
+                    decoded_segments.append(segment)
                     
                 except Exception as segment_error:
                     print(f"Error processing segment {i+1}: {str(segment_error)}")
@@ -277,9 +346,11 @@ class TTSMiddleware:
                     continue
                 
                 finally:
-                    # Clean up temp file immediately after processing
-                    if temp_file and not temp_file.closed:
-                        temp_file.close()
+                    if progress_callback:
+                        progress_callback(i + 1, len(audio_segments))
+            
+            # Lay all segments out in one preallocated buffer with a 0.5 second pause between each
+            combined_audio = mix_segments(decoded_segments, gap_ms=500)
             
             # Check if we have any audio to save
             if len(combined_audio) == 0:
@@ -288,18 +359,7 @@ class TTSMiddleware:
             print(f"Combined audio duration: {len(combined_audio)}ms")
             
             # Save combined audio
-            output_path = os.path.join(audio_dir, f"{filename}.mp3")
-            
-            # Ensure we don't overwrite existing files
-            counter = 1
-            original_output_path = output_path
-            while os.path.exists(output_path):
-                base_name = f"{filename}_{counter}"
-                output_path = os.path.join(audio_dir, f"{base_name}.mp3")
-                counter += 1
-            
-            if output_path != original_output_path:
-                print(f"File exists, saving as: {output_path}")
+            output_path = self._unique_output_path(audio_dir, filename)
             
             # Export with specific parameters for better compatibility
             combined_audio.export(
@@ -327,16 +387,6 @@ class TTSMiddleware:
             print(f"ERROR: {error_msg}")
             logger.error(error_msg)
             raise
-        
-        finally:
-            # Clean up all temporary files
-            for temp_file_path in temp_files:
-                try:
-                    if os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
-                        print(f"Cleaned up temp file: {temp_file_path}")
-                except Exception as cleanup_error:
-                    print(f"Warning: Could not delete temp file {temp_file_path}: {cleanup_error}")
 
 
     # Additional helper method for debugging audio data
@@ -362,16 +412,8 @@ class TTSMiddleware:
         
         if audio_bytes and len(audio_bytes) >= 16:
             debug_info['first_16_bytes'] = audio_bytes[:16].hex()
-            
-            # Check for common audio format signatures
-            if audio_bytes.startswith(b'ID3') or audio_bytes[0:2] == b'\xff\xfb':
-                debug_info['likely_format'] = 'mp3'
-            elif audio_bytes.startswith(b'ftyp'):
-                debug_info['likely_format'] = 'mp4/m4a'
-            elif audio_bytes.startswith(b'RIFF') and b'WAVE' in audio_bytes[:12]:
-                debug_info['likely_format'] = 'wav'
-            elif audio_bytes.startswith(b'\xff\xf1') or audio_bytes.startswith(b'\xff\xf9'):
-                debug_info['likely_format'] = 'aac'
+            # Same header sniffing _combine_audio_segments uses to pick a decoder
+            debug_info['likely_format'] = detect_audio_format(audio_bytes) or 'unknown'
         
         print(f"Debug info for segment {segment_number}: {debug_info}")
         return debug_info
@@ -429,6 +471,58 @@ class TTSMiddleware:
             logger.error(f"Failed to save to database: {str(e)}")
             raise
     
+    def synthesize_segment(self, segment: dict, voice_mapping: Dict[str, str] = None) -> bytes:
+        """
+        Generate speech for one transcript segment (served from the segment cache when possible)
+        
+        Args:
+            segment: Dict with 'speaker' and 'text'
+            voice_mapping: Optional per-job voice overrides on top of self.voice_mapping
+        """
+        return self._generate_speech_segment(segment['text'], segment['speaker'], voice_mapping)
+    
+    def synthesize_segments(self, transcript: list[dict]) -> List[bytes]:
+        """
+        Generate speech for every valid transcript segment with at most
+        self.max_in_flight ElevenLabs requests running at once
+        
+        Args:
+            transcript: List of speaker segments with 'speaker' and 'text' fields
+            
+        Returns:
+            list: Audio bytes for each successfully synthesized segment, in transcript order
+        """
+        jobs = [(segment['text'], segment['speaker']) for segment in filter_valid_segments(transcript)]
+        
+        logger.info(f"Synthesizing {len(jobs)} segments with up to {self.max_in_flight} in flight")
+        
+        results = map_bounded(
+            lambda job: self._generate_speech_segment(*job),
+            jobs,
+            max_in_flight=self.max_in_flight,
+            max_retries=self.max_retries,
+            description="TTS segment"
+        )
+        
+        # Failed segments are dropped instead of failing the whole episode
+        return [audio for audio in results if not isinstance(audio, TaskFailure)]
+    
+    def finalize_audio(self, audio_segments: List[bytes], filename: str, transcript: list[dict], progress_callback=None) -> str:
+        """
+        Combine synthesized segments into the episode file and record it in the database
+        
+        Returns:
+            str: Path to the generated audio file
+        """
+        audio_path = self._combine_audio_segments(audio_segments, filename, progress_callback)
+        
+        # Save to database
+        transcript_str = json.dumps(transcript)
+        self._save_to_database(filename, transcript_str, audio_path)
+        
+        logger.info(f"Audio conversion completed successfully: {audio_path}")
+        return audio_path
+    
     def convert_to_audio(self, transcript: list[dict], filename: str) -> str:
         """
         Main middleware function to convert transcript to audio
@@ -450,41 +544,14 @@ class TTSMiddleware:
             if not transcript:
                 raise ValueError("No segments found in transcript")
             
-            # Generate speech for each segment
-            audio_segments = []
-            for i, segment in enumerate(transcript):
-                if not isinstance(segment, dict) or 'speaker' not in segment or 'text' not in segment:
-                    logger.warning(f"Invalid segment format at index {i}, skipping")
-                    continue
-                
-                speaker = segment['speaker']
-                text = segment['text']
-                
-                if not text.strip():
-                    logger.warning(f"Empty text for speaker {speaker}, skipping")
-                    continue
-                
-                try:
-                    audio_bytes = self._generate_speech_segment(text, speaker)
-                    audio_segments.append(audio_bytes)
-                except Exception as e:
-                    logger.error(f"Failed to generate speech for segment {i}: {str(e)}")
-                    # Continue with other segments instead of failing completely
-                    continue
+            # Generate speech for all segments concurrently
+            audio_segments = self.synthesize_segments(transcript)
             
             if not audio_segments:
                 raise ValueError("No audio segments were generated successfully")
             
-            # Combine audio segments
-            audio_path = self._combine_audio_segments(audio_segments, filename)
-            
-            # Save to database
-            transcript_str = json.dumps(transcript)
-            self._save_to_database(filename, transcript_str, audio_path)
-            
-            logger.info(f"Audio conversion completed successfully: {audio_path}")
-            return audio_path
+            return self.finalize_audio(audio_segments, filename, transcript)
             
         except Exception as e:
             logger.error(f"Audio conversion failed: {str(e)}")
-            raise
\ No newline at end of file
+            raise
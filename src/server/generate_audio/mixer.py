@@ -0,0 +1,72 @@
+import logging
+from typing import Callable, List, Optional
+from pydub import AudioSegment
+
+logger = logging.getLogger(__name__)
+
+
+def mix_segments(segments: List[AudioSegment],
+                 gap_ms: int = 500,
+                 progress_callback: Optional[Callable[[int, int], None]] = None) -> AudioSegment:
+    """
+    Concatenate decoded segments with a silent gap between each, in linear time
+
+    Repeated `combined += segment` makes pydub copy the whole accumulated buffer
+    on every step, which is O(n^2) in episode length. Instead, all segments are
+    brought to a common format, a single PCM buffer is allocated for the total
+    duration (gaps included) and each segment is written into it at its offset.
+
+    Args:
+        segments: Decoded audio segments in playback order
+        gap_ms: Silence inserted between consecutive segments
+        progress_callback: Optional callback invoked as progress_callback(done, total)
+
+    Returns:
+        AudioSegment: The combined audio
+    """
+    segments = [segment for segment in segments if segment is not None and len(segment) > 0]
+    if not segments:
+        return AudioSegment.empty()
+
+    # Same target format pydub picks when adding segments: the highest of each parameter
+    frame_rate = max(segment.frame_rate for segment in segments)
+    channels = max(segment.channels for segment in segments)
+    sample_width = max(segment.sample_width for segment in segments)
+    frame_width = channels * sample_width
+
+    normalized = []
+    for segment in segments:
+        if segment.frame_rate != frame_rate:
+            segment = segment.set_frame_rate(frame_rate)
+        if segment.channels != channels:
+            segment = segment.set_channels(channels)
+        if segment.sample_width != sample_width:
+            segment = segment.set_sample_width(sample_width)
+        normalized.append(segment)
+
+    gap_bytes = int(frame_rate * gap_ms / 1000) * frame_width
+    total_bytes = sum(len(segment.raw_data) for segment in normalized) + gap_bytes * (len(normalized) - 1)
+
+    # Zeroed PCM is silence, so the gaps need no explicit writes
+    buffer = bytearray(total_bytes)
+    view = memoryview(buffer)
+    offset = 0
+    for i, segment in enumerate(normalized):
+        if i > 0:
+            offset += gap_bytes
+        data = segment.raw_data
+        view[offset:offset + len(data)] = data
+        offset += len(data)
+        if progress_callback:
+            progress_callback(i + 1, len(normalized))
+    view.release()
+
+    logger.info(f"Mixed {len(normalized)} segments into {total_bytes} bytes of PCM "
+                f"({frame_rate} Hz, {channels} ch, {sample_width * 8}-bit)")
+
+    return AudioSegment(
+        data=bytes(buffer),
+        sample_width=sample_width,
+        frame_rate=frame_rate,
+        channels=channels
+    )
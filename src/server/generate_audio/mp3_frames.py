@@ -0,0 +1,234 @@
+import io
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional
+from pydub import AudioSegment
+
+logger = logging.getLogger(__name__)
+
+# Bitrates in kbps indexed by the 4-bit bitrate index, per (MPEG-1?, layer)
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates indexed by the 2-bit rate index, per 2-bit version id
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+# Trailing metadata that may follow the last audio frame
+_TRAILING_TAGS = (b'TAG', b'APETAGEX', b'LYRICSBEGIN')
+
+
+class StreamParams(NamedTuple):
+    """Codec parameters that must match for frames to be concatenated"""
+    version_id: int
+    layer: int
+    sample_rate: int
+    channels: int
+
+
+class FrameHeader(NamedTuple):
+    params: StreamParams
+    bitrate: int
+    length: int
+    samples: int
+
+
+class Mp3Stream(NamedTuple):
+    params: StreamParams
+    frames: List[memoryview]
+    bitrate: int  # most common frame bitrate in kbps
+
+
+def parse_frame_header(data, offset: int) -> Optional[FrameHeader]:
+    """
+    Decode the 4-byte MPEG audio frame header at offset
+
+    Returns:
+        FrameHeader, or None if the bytes at offset are not a valid frame header
+    """
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version_id = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)  # 01 -> layer 3, 10 -> layer 2, 11 -> layer 1
+    bitrate_index = (b2 >> 4) & 0x0F
+    rate_index = (b2 >> 2) & 0x03
+    padding = (b2 >> 1) & 0x01
+    channel_mode = (b3 >> 6) & 0x03
+    if version_id == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version_id == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index]
+    sample_rate = _SAMPLE_RATES[version_id][rate_index]
+
+    if layer == 1:
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+        samples = 384
+    elif layer == 3 and not mpeg1:
+        length = 72 * bitrate * 1000 // sample_rate + padding
+        samples = 576
+    else:
+        length = 144 * bitrate * 1000 // sample_rate + padding
+        samples = 1152
+
+    channels = 1 if channel_mode == 3 else 2
+    return FrameHeader(StreamParams(version_id, layer, sample_rate, channels), bitrate, length, samples)
+
+
+def _skip_id3v2(data) -> int:
+    """Return the offset of the first byte after a leading ID3v2 tag (0 if none)"""
+    if len(data) < 10 or bytes(data[:3]) != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_info_frame(frame, header: FrameHeader) -> bool:
+    """Xing/Info/VBRI headers describe the whole file and are wrong once files are joined"""
+    crc = 0 if frame[1] & 0x01 else 2
+    if header.params.version_id == 3:
+        side_info = 32 if header.params.channels == 2 else 17
+    else:
+        side_info = 17 if header.params.channels == 2 else 9
+    xing_offset = 4 + crc + side_info
+    return (bytes(frame[xing_offset:xing_offset + 4]) in (b'Xing', b'Info') or
+            bytes(frame[36:40]) == b'VBRI')
+
+
+def parse_mp3(audio_bytes: bytes) -> Optional[Mp3Stream]:
+    """
+    Split MP3 data into audio frames, dropping ID3 tags and Xing/Info headers
+
+    Returns:
+        Mp3Stream, or None if the data is not a clean single-format MP3 stream
+    """
+    data = memoryview(audio_bytes)
+    offset = _skip_id3v2(data)
+    frames = []
+    bitrates = Counter()
+    params = None
+
+    while offset < len(data):
+        header = parse_frame_header(data, offset)
+        if header is None:
+            if any(bytes(data[offset:offset + len(tag)]) == tag for tag in _TRAILING_TAGS):
+                break
+            logger.debug(f"Lost MP3 frame sync at byte {offset}")
+            return None
+        if params is None:
+            params = header.params
+        elif header.params != params:
+            return None
+        if offset + header.length > len(data):
+            break  # truncated final frame
+        frame = data[offset:offset + header.length]
+        if not frames and _is_info_frame(frame, header):
+            offset += header.length
+            continue
+        frames.append(frame)
+        bitrates[header.bitrate] += 1
+        offset += header.length
+
+    if not frames:
+        return None
+    return Mp3Stream(params, frames, bitrates.most_common(1)[0][0])
+
+
+def samples_per_frame(params: StreamParams) -> int:
+    if params.layer == 1:
+        return 384
+    return 1152 if params.version_id == 3 or params.layer == 2 else 576
+
+
+def stream_duration(stream: Mp3Stream) -> float:
+    """Playback length of a parsed stream in seconds"""
+    return len(stream.frames) * samples_per_frame(stream.params) / stream.params.sample_rate
+
+
+@lru_cache(maxsize=32)
+def silence_frames(params: StreamParams, bitrate: int, duration_ms: int) -> Optional[bytes]:
+    """
+    Pre-encoded block of silent frames matching params, lasting about duration_ms
+
+    Encoded once per parameter set with ffmpeg and reused for every pause.
+    """
+    frame_count = max(1, round(duration_ms / 1000 * params.sample_rate / samples_per_frame(params)))
+
+    # Encode a little extra so encoder delay/padding never leaves us short
+    silence = AudioSegment.silent(duration=duration_ms + 250, frame_rate=params.sample_rate)
+    silence = silence.set_channels(params.channels)
+    buffer = io.BytesIO()
+    silence.export(buffer, format='mp3', bitrate=f"{bitrate}k")
+
+    stream = parse_mp3(buffer.getvalue())
+    if stream is None or stream.params != params or len(stream.frames) < frame_count:
+        logger.warning(f"Could not encode silence matching {params}, stream copy unavailable")
+        return None
+    return b''.join(stream.frames[:frame_count])
+
+
+def concat_mp3(audio_segments: List[bytes],
+               gap_ms: int = 500,
+               progress_callback: Optional[Callable[[int, int], None]] = None,
+               leading_gap: bool = False) -> Optional[bytes]:
+    """
+    Join MP3 segments at the frame level with pre-encoded silence between them
+
+    No decoding or re-encoding happens, so this is fast and lossless. It only
+    applies when every segment shares version, layer, sample rate and channel
+    count.
+
+    Args:
+        audio_segments: MP3 data for each segment in playback order
+        gap_ms: Silence inserted between consecutive segments
+        progress_callback: Optional callback invoked as progress_callback(done, total)
+        leading_gap: Also start with a pause, for chunks that continue an earlier one
+
+    Returns:
+        bytes: The joined MP3, or None if the segments cannot be stream-copied
+    """
+    streams = []
+    for audio_bytes in audio_segments:
+        stream = parse_mp3(audio_bytes)
+        if stream is None:
+            return None
+        streams.append(stream)
+
+    if not streams:
+        return None
+    params = streams[0].params
+    if any(stream.params != params for stream in streams):
+        logger.info("MP3 segments have mixed codec parameters, stream copy unavailable")
+        return None
+
+    bitrate = Counter(stream.bitrate for stream in streams).most_common(1)[0][0]
+    needs_gap = (len(streams) > 1 or leading_gap) and gap_ms > 0
+    gap = silence_frames(params, bitrate, gap_ms) if needs_gap else b''
+    if gap is None:
+        return None
+
+    output = io.BytesIO()
+    for i, stream in enumerate(streams):
+        if i > 0 or leading_gap:
+            output.write(gap)
+        for frame in stream.frames:
+            output.write(frame)
+        if progress_callback:
+            progress_callback(i + 1, len(streams))
+
+    return output.getvalue()
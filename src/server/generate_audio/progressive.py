@@ -0,0 +1,146 @@
+import os
+import json
+import math
+import logging
+from typing import List, Optional
+from src.server.generate_audio.mp3_frames import concat_mp3, parse_mp3, stream_duration
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_NAME = 'playlist.m3u8'
+MANIFEST_NAME = 'manifest.json'
+
+
+class ChunkedPlaylist:
+    """
+    Episode published as a growing list of playable MP3 chunks
+
+    Each chunk is a stream copy of a run of consecutive segments, so listeners
+    can start on the first minutes while later segments are still being
+    synthesized. Two views of the same chunks are written next to them:
+    an HLS EVENT playlist (playlist.m3u8) for native HLS players, and a JSON
+    manifest that browsers without HLS support play chunk by chunk.
+
+    The manifest doubles as the writer's state, so successive pipeline tasks
+    can keep extending the same playlist. Only one process may append at a time.
+    """
+
+    def __init__(self, directory: str, url_prefix: str, gap_ms: int = 500):
+        self.directory = directory
+        self.url_prefix = url_prefix.rstrip('/')
+        self.gap_ms = gap_ms
+        self.manifest = self._load()
+
+    @property
+    def playlist_url(self) -> str:
+        return f"{self.url_prefix}/{PLAYLIST_NAME}"
+
+    @property
+    def manifest_url(self) -> str:
+        return f"{self.url_prefix}/{MANIFEST_NAME}"
+
+    @property
+    def next_segment(self) -> int:
+        """Index of the first segment not yet published in a chunk"""
+        return self.manifest["next_segment"]
+
+    @property
+    def available(self) -> bool:
+        """False once segments turned out not to be stream-copyable"""
+        return not self.manifest["disabled"]
+
+    def _load(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"chunks": [], "next_segment": 0, "complete": False, "disabled": False}
+
+    def status(self) -> Optional[dict]:
+        """Small summary for task progress meta, or None until a chunk is playable"""
+        if not self.manifest["chunks"] or not self.available:
+            return None
+        return {
+            "playlist_url": self.playlist_url,
+            "manifest_url": self.manifest_url,
+            "chunks": len(self.manifest["chunks"]),
+            "seconds": round(sum(chunk["duration"] for chunk in self.manifest["chunks"]), 1),
+            "complete": self.manifest["complete"],
+        }
+
+    def append(self, audio_segments: List[bytes], segment_count: int) -> bool:
+        """
+        Publish the next run of segments as one chunk
+
+        Args:
+            audio_segments: MP3 data of the run (failed segments already left out)
+            segment_count: How many transcript segments the run covers, failed ones included
+
+        Returns:
+            bool: Whether a chunk was written; False disables the playlist
+        """
+        if not self.available:
+            return False
+
+        data = concat_mp3(audio_segments, gap_ms=self.gap_ms, leading_gap=bool(self.manifest["chunks"])) \
+            if audio_segments else None
+        stream = parse_mp3(data) if data else None
+        first = self.manifest["chunks"][0]["params"] if self.manifest["chunks"] else None
+        if stream is None or (first and list(stream.params) != first):
+            if audio_segments:
+                logger.info("Segments are not stream-copyable, progressive playlist disabled")
+                self.manifest["disabled"] = True
+                self._save()
+                return False
+            # Nothing playable in this run (all failed): just skip past it
+            self.manifest["next_segment"] += segment_count
+            self._save()
+            return False
+
+        name = f"chunk_{len(self.manifest['chunks']):05d}.mp3"
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(name, data)
+        self.manifest["chunks"].append({
+            "file": name,
+            "url": f"{self.url_prefix}/{name}",
+            "duration": round(stream_duration(stream), 3),
+            "params": list(stream.params),
+        })
+        self.manifest["next_segment"] += segment_count
+        self._save()
+        logger.info(f"Published chunk {name} ({len(audio_segments)} segments) in {self.directory}")
+        return True
+
+    def finish(self):
+        """Mark the playlist as complete so players stop polling for more chunks"""
+        self.manifest["complete"] = True
+        self._save()
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(MANIFEST_NAME, json.dumps(self.manifest).encode('utf-8'))
+        if self.manifest["chunks"] and self.available:
+            self._write(PLAYLIST_NAME, self._render_playlist().encode('utf-8'))
+
+    def _render_playlist(self) -> str:
+        chunks = self.manifest["chunks"]
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{math.ceil(max(chunk['duration'] for chunk in chunks))}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for chunk in chunks:
+            lines.append(f"#EXTINF:{chunk['duration']:.3f},")
+            lines.append(chunk["file"])
+        if self.manifest["complete"]:
+            lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
+
+    def _write(self, name: str, data: bytes):
+        # Write then rename so players never fetch a partial file
+        path = os.path.join(self.directory, name)
+        with open(f"{path}.part", 'wb') as f:
+            f.write(data)
+        os.replace(f"{path}.part", path)
@@ -1,25 +1,164 @@
-import urllib.request as libreq
 import urllib.parse as libparse
 import xml.etree.ElementTree as ET
+import os
+import re
+import json
+import time
 import logging
-import ssl
+import tempfile
+from src.server.http_client import http_get
+from src.server.sqlite_cache import SQLiteLRUCache, FileLRUCache, make_cache_key
 
 logging.basicConfig(level=logging.DEBUG)
 
-# Create SSL context that ignores certificate verification
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE
+ARXIV_CACHE_DIR = os.getenv('ARXIV_CACHE_DIR', 'cache/arxiv')
+# Search responses are served from cache for this long, then revalidated
+ARXIV_SEARCH_TTL = float(os.getenv('ARXIV_SEARCH_TTL', 60 * 60))
+# Unversioned PDF URLs point at the latest version, so they are revalidated after this long;
+# versioned PDFs never change and are never re-downloaded while cached
+ARXIV_PDF_REVALIDATE = float(os.getenv('ARXIV_PDF_REVALIDATE', 24 * 60 * 60))
+# Downloads larger or slower than this are aborted
+ARXIV_PDF_MAX_MB = float(os.getenv('ARXIV_PDF_MAX_MB', 100))
+ARXIV_DOWNLOAD_TIMEOUT = float(os.getenv('ARXIV_DOWNLOAD_TIMEOUT', 120))
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# New-style (2301.01234v2) and old-style (hep-th/9901001v1) arXiv identifiers
+ARXIV_ID_PATTERN = re.compile(r'(\d{4}\.\d{4,5}(?:v\d+)?|[a-z\-]+(?:\.[A-Za-z]{2})?/\d{7}(?:v\d+)?)')
+
+def normalize_arxiv_id(paper_url: str) -> str:
+    """
+    Reduce an arXiv abs/pdf URL (http or https, with or without .pdf) to its id,
+    keeping the version suffix since different versions are different papers
+    """
+    match = ARXIV_ID_PATTERN.search(paper_url or '')
+    return match.group(1) if match else (paper_url or '').strip().lower()
+
+def is_versioned(arxiv_id: str) -> bool:
+    return re.search(r'v\d+$', arxiv_id) is not None
+
+# Shared per-process caches, created on first use
+_search_cache = None
+_pdf_cache = None
+
+def get_search_cache():
+    """
+    Return the arXiv search response cache, or None if disabled (ARXIV_SEARCH_CACHE_MAX_MB=0)
+    """
+    global _search_cache
+    max_mb = float(os.getenv('ARXIV_SEARCH_CACHE_MAX_MB', 32))
+    if max_mb <= 0:
+        return None
+    if _search_cache is None:
+        _search_cache = SQLiteLRUCache(
+            os.path.join(ARXIV_CACHE_DIR, 'search.db'),
+            table='arxiv_search',
+            max_bytes=int(max_mb * 1024 * 1024)
+        )
+    return _search_cache
+
+def get_pdf_cache():
+    """
+    Return the on-disk arXiv PDF cache, or None if disabled (ARXIV_PDF_CACHE_MAX_MB=0)
+    """
+    global _pdf_cache
+    max_mb = float(os.getenv('ARXIV_PDF_CACHE_MAX_MB', 2048))
+    if max_mb <= 0:
+        return None
+    if _pdf_cache is None:
+        _pdf_cache = FileLRUCache(
+            os.path.join(ARXIV_CACHE_DIR, 'pdfs'),
+            table='arxiv_pdfs',
+            max_bytes=int(max_mb * 1024 * 1024)
+        )
+    return _pdf_cache
+
+def _conditional_headers(validators):
+    headers = {}
+    if validators and validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators and validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def _response_validators(response):
+    return {"etag": response.headers.get('ETag'), "last_modified": response.headers.get('Last-Modified')}
+
+def _fetch(url, validators=None):
+    """
+    GET url, conditionally if validators (etag / last_modified) are given
+
+    Returns:
+        tuple: (status, body or None for 304, validators of the response)
+    """
+    response = http_get(url, headers=_conditional_headers(validators))
+    if response.status_code == 304:
+        return 304, None, {"etag": validators.get('etag'), "last_modified": validators.get('last_modified')}
+    response.raise_for_status()
+    return response.status_code, response.content, _response_validators(response)
+
+def _download(url, validators=None):
+    """
+    Stream url into a temporary file in chunks, enforcing ARXIV_PDF_MAX_MB and
+    ARXIV_DOWNLOAD_TIMEOUT so the body is never held in memory
+
+    Returns:
+        tuple: (status, temporary file path or None for 304, validators of the response)
+    """
+    max_bytes = int(ARXIV_PDF_MAX_MB * 1024 * 1024)
+    deadline = time.monotonic() + ARXIV_DOWNLOAD_TIMEOUT
+    with http_get(url, headers=_conditional_headers(validators), stream=True) as response:
+        if response.status_code == 304:
+            return 304, None, {"etag": validators.get('etag'), "last_modified": validators.get('last_modified')}
+        response.raise_for_status()
+        declared = int(response.headers.get('Content-Length') or 0)
+        if declared > max_bytes:
+            raise ValueError(f"PDF is {declared} bytes, over the {max_bytes} byte limit")
+
+        os.makedirs(ARXIV_CACHE_DIR, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.pdf.part', dir=ARXIV_CACHE_DIR)
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"PDF exceeded the {max_bytes} byte limit while downloading")
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"PDF download took longer than {ARXIV_DOWNLOAD_TIMEOUT}s")
+                    f.write(chunk)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        logging.info(f"Downloaded {size} bytes from {url}")
+        return response.status_code, temp_path, _response_validators(response)
+
+def _search(url):
+    """Search response body for url, from cache while fresh and revalidated after"""
+    cache = get_search_cache()
+    key = make_cache_key('arxiv_search', url)
+    cached = cache.get(key) if cache else None
+    entry = json.loads(cached.decode('utf-8')) if cached else None
+    if entry and time.time() - entry["fetched_at"] < ARXIV_SEARCH_TTL:
+        return entry["body"].encode('utf-8')
+
+    status, body, validators = _fetch(url, entry)
+    if status == 304:
+        logging.debug(f"Search response still valid: {url}")
+        body = entry["body"].encode('utf-8')
+    if cache:
+        cache.put(key, json.dumps({
+            "body": body.decode('utf-8'),
+            "fetched_at": time.time(),
+            **(validators or {})
+        }).encode('utf-8'))
+    return body
 
 def query(query_params):
     # Encode the query_params string to handle spaces and special characters
     encoded_params = libparse.quote(query_params, safe='=&')
-    url = f'http://export.arxiv.org/api/query?{encoded_params}'
+    url = f'https://export.arxiv.org/api/query?{encoded_params}'
     
-    # Create request with SSL context
-    req = libreq.Request(url)
-    with libreq.urlopen(req, context=ssl_context) as response:
-        r = response.read()
+    r = _search(url)
     
     logging.debug(f"Response content: {r.decode('utf-8')}")
     
@@ -45,19 +184,52 @@ def query(query_params):
     
     return papers
 
-def query_for_pdf(paper_url):
-    pdf_url = paper_url.replace('abs','pdf')
+def fetch_pdf(paper_url):
+    """
+    Path of the PDF for an arXiv paper, downloading it only if it is not cached
+
+    Versioned papers are served from the cache without contacting arXiv;
+    unversioned ones are revalidated with ETag / If-Modified-Since once they
+    are older than ARXIV_PDF_REVALIDATE.
+
+    Returns:
+        tuple: (path to the PDF, whether it is a temporary file the caller must remove)
+    """
+    pdf_url = paper_url.replace('abs','pdf').replace('http://', 'https://')
+    arxiv_id = normalize_arxiv_id(paper_url)
+    cache = get_pdf_cache()
+    key = make_cache_key('arxiv_pdf', arxiv_id)
+    entry = cache.lookup(key) if cache else None
+    
+    if entry and (is_versioned(arxiv_id) or time.time() - entry["fetched_at"] < ARXIV_PDF_REVALIDATE):
+        logging.info(f"Using cached PDF for {arxiv_id}")
+        return entry["path"], False
+    
     print(pdf_url)
+    status, temp_path, validators = _download(pdf_url, entry)
+    if status == 304:
+        logging.info(f"Cached PDF for {arxiv_id} is still current")
+        cache.update_metadata(key, fetched_at=time.time(), **validators)
+        return entry["path"], False
+    
+    if not cache:
+        return temp_path, True
+    return cache.store(key, temp_path, fetched_at=time.time(), **validators), False
+
+def query_for_pdf(paper_url):
+    """
+    Return the PDF bytes for an arXiv paper (from the local cache when possible)
+
+    Prefer fetch_pdf, which hands over a file path without loading the PDF.
+    """
     try:
-        # Create request with SSL context
-        req = libreq.Request(pdf_url)
-        with libreq.urlopen(req, context=ssl_context) as response:
-            print(response.headers)
-            # PDF files are binary, so we read them as bytes and return as string
-            # We'll let the PDF processor handle the binary data
-            pdf_content = response.read()
-            # For now, return as string - the PDF processor should handle binary data
-            return pdf_content
+        path, is_temporary = fetch_pdf(paper_url)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            if is_temporary:
+                os.remove(path)
     except Exception as e:
         raise Exception(f"Failed to retrieve the PDF: {e}")
     
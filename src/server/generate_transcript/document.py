@@ -0,0 +1,267 @@
+import re
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+from src.server.generate_transcript.long_document import CHARS_PER_TOKEN, estimate_tokens, is_heading, pack_sections
+from src.server.generate_transcript.text_cleaning import (
+    HYPHENATED_BREAK, TEXT_TOKEN_BUDGET, TRUNCATION_MARKER, clean_pages, token_savings
+)
+
+logger = logging.getLogger(__name__)
+
+FRONT_MATTER = "Front matter"
+ABSTRACT_HEADING = "Abstract"
+
+# "Abstract—We propose...", "ABSTRACT: In this paper..." (run-in abstract heading)
+RUN_IN_ABSTRACT = re.compile(r'^abstract(?:\s*[:.—–-]\s*|\s+)(\S.*)$', re.IGNORECASE)
+# "Figure 3: ...", "Fig. 2. ..." (the separator tells a caption from "Figure 3 shows" in the text)
+CAPTION = re.compile(r'^(fig(?:ure)?\.?)\s*(\d{1,3}[a-z]?)\s*[:.|—–]\s*(.*)$', re.IGNORECASE)
+NUMBERED_PREFIX = re.compile(r'^(\d{1,2}(?:\.\d{1,2})*)\.?\s')
+# Caption lines are collected until one ends a sentence, up to this many
+CAPTION_MAX_LINES = 4
+
+
+@dataclass
+class Section:
+    """A run of text under one heading, with the pages it spans (1-based)"""
+    heading: str
+    text: str
+    first_page: int
+    last_page: int
+    level: int = 1
+
+    def render(self) -> str:
+        if self.heading == FRONT_MATTER:
+            return self.text
+        return f"{self.heading}\n{self.text}" if self.text else self.heading
+
+
+@dataclass
+class Figure:
+    """
+    A figure caption from the text, bound to the image on its page when there
+    is one (page and image numbers as in extract_pdf_pages)
+    """
+    page: int
+    image: Optional[int] = None
+    label: Optional[str] = None
+    caption: Optional[str] = None
+    description: Optional[str] = None
+    source: Optional[str] = None
+
+
+@dataclass
+class Document:
+    """
+    Structured view of a paper: title, abstract, sections with their page
+    spans and figures with captions and descriptions
+
+    Built once when the PDF is parsed and stored as JSON, so later stages can
+    take the parts they need (the prompt text, per-section chunks, figure
+    context) without re-scanning the full text.
+    """
+    title: str
+    page_count: int
+    abstract: Optional[str] = None
+    sections: List[Section] = field(default_factory=list)
+    figures: List[Figure] = field(default_factory=list)
+    stats: dict = field(default_factory=dict)
+
+    def text(self) -> str:
+        """The cleaned body text, sections in document order"""
+        return "\n\n".join(section.render() for section in self.sections) + "\n"
+
+    def chunks(self, max_tokens: int = None):
+        """Sections packed into (title, text) chunks within a token budget, as for split_sections"""
+        return pack_sections([(section.heading, section.render()) for section in self.sections], max_tokens)
+
+    def attach_descriptions(self, image_descriptions: List[dict]):
+        """
+        Bind figure descriptions from describe_images to the figures
+
+        Described images on a page are paired with that page's captions in
+        order; images beyond the captions (e.g. sub-figures) share the page's
+        last caption, and captions without a described image are kept as is.
+        """
+        described = [desc for desc in image_descriptions or [] if desc.get('description')]
+        # Captions per page, also those already bound by an earlier call
+        captions, seen = {}, set()
+        for figure in self.figures:
+            key = (figure.page, figure.label, figure.caption)
+            if figure.caption is not None and key not in seen:
+                seen.add(key)
+                captions.setdefault(figure.page, []).append(
+                    Figure(page=figure.page, label=figure.label, caption=figure.caption))
+
+        figures, bound = [], set()
+        for desc in sorted(described, key=lambda desc: (desc['page'], desc['image'])):
+            page_captions = captions.get(desc['page'], [])
+            caption = None
+            if page_captions:
+                unbound = [figure for figure in page_captions if id(figure) not in bound]
+                caption = unbound[0] if unbound else page_captions[-1]
+                bound.add(id(caption))
+            figures.append(Figure(page=desc['page'], image=desc['image'],
+                                  label=caption.label if caption else None,
+                                  caption=caption.caption if caption else None,
+                                  description=desc['description'], source=desc.get('source')))
+
+        figures.extend(figure for page_captions in captions.values() for figure in page_captions
+                       if id(figure) not in bound)
+        self.figures = sorted(figures, key=lambda figure: (figure.page, figure.image or 0))
+
+    def figure_context(self) -> List[dict]:
+        """Figures with a caption or description, as entries for build_user_prompt"""
+        return [
+            {"page": figure.page, "image": figure.image, "label": figure.label,
+             "caption": figure.caption, "description": figure.description}
+            for figure in self.figures if figure.description or figure.caption
+        ]
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Document':
+        return cls(
+            title=data["title"],
+            page_count=data["page_count"],
+            abstract=data.get("abstract"),
+            sections=[Section(**section) for section in data.get("sections", [])],
+            figures=[Figure(**figure) for figure in data.get("figures", [])],
+            stats=data.get("stats", {}),
+        )
+
+
+def _heading_level(heading: str) -> int:
+    match = NUMBERED_PREFIX.match(heading)
+    return match.group(1).count('.') + 1 if match else 1
+
+
+def _read_captions(lines, page):
+    """Figure captions on a page, and the line indexes they occupy"""
+    figures, used = [], set()
+    index = 0
+    while index < len(lines):
+        match = CAPTION.match(lines[index])
+        if not match:
+            index += 1
+            continue
+        caption = [lines[index]]
+        used.add(index)
+        while not caption[-1].rstrip().endswith('.') and len(caption) < CAPTION_MAX_LINES \
+                and index + 1 < len(lines) and lines[index + 1].strip() \
+                and not is_heading(lines[index + 1]) and not CAPTION.match(lines[index + 1]):
+            index += 1
+            caption.append(lines[index])
+            used.add(index)
+        figures.append(Figure(page=page, label=f"Figure {match.group(2)}",
+                              caption=HYPHENATED_BREAK.sub(r'\1\2', "\n".join(caption)).replace("\n", " ")))
+        index += 1
+    return figures, used
+
+
+def _truncate_sections(sections: List[Section], token_budget: int) -> bool:
+    """Trim trailing sections in place so the text fits the budget"""
+    if estimate_tokens(Document(title="", page_count=0, sections=sections).text()) <= token_budget:
+        return False
+
+    # Room for the marker, and the blank line between sections
+    remaining = (token_budget - estimate_tokens(TRUNCATION_MARKER) - 1) * CHARS_PER_TOKEN
+    for position, section in enumerate(sections):
+        size = len(section.render()) + 2
+        if size <= remaining:
+            remaining -= size
+            continue
+        keep = remaining - len(section.render()) + len(section.text)
+        cut = section.text.rfind('\n', 0, keep)
+        if keep > 0:
+            section.text = section.text[:cut if cut > keep // 2 else keep]
+            del sections[position + 1:]
+        else:
+            del sections[position:]
+        if sections:
+            sections[-1].text += TRUNCATION_MARKER
+        return True
+    return False
+
+
+def build_document(page_texts: List[Optional[str]], title: str = None, token_budget: int = None) -> Document:
+    """
+    Build the structured document from the page texts of extract_pdf_pages
+
+    The pages are cleaned (see clean_pages), then split into sections at
+    heading-like lines, each remembering the pages it spans. The abstract is
+    taken from an 'Abstract' section or run-in heading, and figure captions
+    are lifted out of the text into figures (see Document.attach_descriptions).
+    Sections beyond the token budget are truncated.
+
+    Args:
+        page_texts: Text of each page, in order (None for pages without text)
+        title: Paper title, if known
+        token_budget: Maximum estimated tokens of body text (defaults to TEXT_TOKEN_BUDGET, 0 = no limit)
+
+    Returns:
+        Document
+    """
+    token_budget = TEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    cleaned, stats = clean_pages(page_texts)
+
+    sections, figures = [], []
+    heading, lines, first_page = FRONT_MATTER, [], 1
+
+    def close():
+        text = "\n".join(lines).strip()
+        # Headings are kept even when a subsection follows straight away
+        if text or heading != FRONT_MATTER:
+            sections.append(Section(heading=heading, text=text, first_page=first_page,
+                                    last_page=last_page, level=_heading_level(heading)))
+
+    last_page = 1
+    for page_number, page_text in enumerate(cleaned, 1):
+        if not page_text:
+            continue
+        page_lines = page_text.split("\n")
+        page_figures, caption_lines = _read_captions(page_lines, page_number)
+        figures.extend(page_figures)
+        for index, line in enumerate(page_lines):
+            if index in caption_lines:
+                continue
+            run_in = RUN_IN_ABSTRACT.match(line) if heading == FRONT_MATTER else None
+            if is_heading(line) or run_in:
+                close()
+                heading, lines = (ABSTRACT_HEADING if run_in else line.strip()), []
+                first_page = last_page = page_number
+                if run_in:
+                    lines.append(run_in.group(1))
+                continue
+            if lines or line.strip():
+                lines.append(line)
+                last_page = page_number
+    close()
+
+    # Words hyphenated across a page break
+    for section in sections:
+        section.text = HYPHENATED_BREAK.sub(r'\1\2', section.text)
+
+    abstract_section = next((section for section in sections
+                             if section.heading.strip(' :').lower() == 'abstract'), None)
+    abstract = abstract_section.text if abstract_section else None
+
+    raw_tokens = estimate_tokens("".join(page + "\n" for page in page_texts if page))
+    truncated = bool(token_budget) and _truncate_sections(sections, token_budget)
+
+    document = Document(title=title or "", page_count=len(page_texts), abstract=abstract,
+                        sections=sections, figures=figures)
+    document.stats = {
+        **token_savings(raw_tokens, estimate_tokens(document.text())),
+        **stats,
+        "truncated": truncated,
+        "sections": len(sections),
+        "captions": len(figures),
+    }
+    logger.info(f"Structured document: {len(sections)} sections, {len(figures)} captions, "
+                f"~{document.stats['tokens']} tokens ({document.stats['saved_percent']}% saved)")
+    if truncated:
+        logger.warning(f"Paper text exceeds the {token_budget}-token input budget and was truncated")
+    return document
@@ -0,0 +1,42 @@
+from PIL import Image
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image as a hash_size * hash_size bit integer
+
+    Each bit records whether a pixel is brighter than its right neighbour in a
+    small grayscale thumbnail, so re-encoded, rescaled or slightly retouched
+    copies of a figure hash the same or within a few bits.
+    """
+    thumbnail = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(thumbnail.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def group_near_duplicates(hashes, max_distance: int):
+    """
+    Map each hash to the index of the first earlier hash within max_distance bits
+
+    Returns:
+        list: For every input, the index of its representative (itself if unique)
+    """
+    representatives = []
+    groups = []
+    for index, value in enumerate(hashes):
+        match = next((rep for rep in representatives if hamming_distance(hashes[rep], value) <= max_distance), None)
+        if match is None:
+            representatives.append(index)
+            match = index
+        groups.append(match)
+    return groups
@@ -0,0 +1,66 @@
+import os
+import math
+from typing import Optional
+from PIL import Image
+
+# Thresholds for images worth sending to the vision model; rejections are
+# reported with their reason in image_descriptions so these can be tuned
+IMAGE_MIN_SIDE = int(os.getenv('IMAGE_MIN_SIDE', 64))
+IMAGE_MIN_AREA = int(os.getenv('IMAGE_MIN_AREA', 128 * 128))
+IMAGE_MIN_PAGE_FRACTION = float(os.getenv('IMAGE_MIN_PAGE_FRACTION', 0.02))
+IMAGE_MAX_ASPECT_RATIO = float(os.getenv('IMAGE_MAX_ASPECT_RATIO', 8))
+IMAGE_MIN_ENTROPY = float(os.getenv('IMAGE_MIN_ENTROPY', 1.0))
+# Grayscale range (0-255) at or below which an image counts as a single colour
+IMAGE_SOLID_RANGE = int(os.getenv('IMAGE_SOLID_RANGE', 8))
+
+
+def grayscale_entropy(image: Image.Image) -> float:
+    """Shannon entropy in bits of the grayscale histogram (0 for a flat image, up to 8)"""
+    histogram = image.histogram()
+    total = sum(histogram)
+    return -sum(count / total * math.log2(count / total) for count in histogram if count)
+
+
+def triage_image(img: Image.Image, bbox=None, page_size=None) -> Optional[dict]:
+    """
+    Cheap local check whether an embedded image is likely a real figure
+
+    Spacers, icons, logos, rules and blank placeholders are rejected before
+    they cost a vision request.
+
+    Args:
+        img: Decoded image
+        bbox: Optional (x0, top, x1, bottom) of the image on the page, in points
+        page_size: Optional (width, height) of the page, in points
+
+    Returns:
+        dict: {'reason': ..., plus the measurement that failed} if the image
+            should be skipped, or None if it should be described
+    """
+    width, height = img.size
+    if min(width, height) < IMAGE_MIN_SIDE:
+        return {"reason": "too_small", "size": [width, height]}
+    if width * height < IMAGE_MIN_AREA:
+        return {"reason": "small_area", "size": [width, height]}
+
+    aspect_ratio = max(width, height) / min(width, height)
+    if aspect_ratio > IMAGE_MAX_ASPECT_RATIO:
+        return {"reason": "extreme_aspect_ratio", "aspect_ratio": round(aspect_ratio, 2)}
+
+    if bbox and page_size and page_size[0] and page_size[1]:
+        placed_area = max(0.0, bbox[2] - bbox[0]) * max(0.0, bbox[3] - bbox[1])
+        page_fraction = placed_area / (page_size[0] * page_size[1])
+        if page_fraction < IMAGE_MIN_PAGE_FRACTION:
+            return {"reason": "small_on_page", "page_fraction": round(page_fraction, 4)}
+
+    # Colour statistics on a thumbnail keep this cheap for large rasters
+    gray = img.convert('L')
+    gray.thumbnail((256, 256))
+    low, high = gray.getextrema()
+    if high - low <= IMAGE_SOLID_RANGE:
+        return {"reason": "solid_color", "range": high - low}
+    entropy = grayscale_entropy(gray)
+    if entropy < IMAGE_MIN_ENTROPY:
+        return {"reason": "low_entropy", "entropy": round(entropy, 3)}
+
+    return None
@@ -0,0 +1,93 @@
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Commas the model sometimes leaves before a closing brace
+TRAILING_COMMA = re.compile(r',\s*}')
+
+
+class SegmentStreamParser:
+    """
+    Incremental parser for a JSON array of objects arriving in chunks
+
+    Text is fed as the model writes it; every top-level object in the array is
+    returned as soon as its closing brace arrives, without waiting for the rest
+    of the array. Anything before the opening '[' (e.g. a ```json fence) and
+    after the closing ']' is ignored, and an object cut off by the token limit
+    is simply never returned.
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.skipped = 0
+
+    def feed(self, text: str) -> list:
+        """
+        Consume the next chunk of model output
+
+        Returns:
+            list: Objects completed by this chunk, in order
+        """
+        completed = []
+        for char in text:
+            if self.finished:
+                break
+            if not self.started:
+                self.started = char == '['
+                continue
+
+            if self.depth > 0:
+                self.buffer.append(char)
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0:
+                    self.buffer = [char]
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0:
+                    # Closing bracket of the top-level array
+                    self.finished = char == ']'
+                    continue
+                self.depth -= 1
+                if self.depth == 0:
+                    value = self._decode(''.join(self.buffer))
+                    self.buffer = []
+                    if value is not None:
+                        completed.append(value)
+        return completed
+
+    def _decode(self, text: str):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(TRAILING_COMMA.sub('}', text))
+        except json.JSONDecodeError as e:
+            self.skipped += 1
+            logger.warning(f"Skipping malformed transcript segment: {e}")
+            print(f"Skipping malformed segment: {text[:100]}")
+            return None
+
+
+def iter_json_objects(chunks):
+    """Yield each object of a streamed JSON array as soon as it is complete"""
+    parser = SegmentStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
@@ -0,0 +1,123 @@
+import os
+import re
+from typing import List, Tuple
+
+# Rough characters per token of English prose, for budgeting prompts without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Papers whose text is estimated above this many tokens are condensed section
+# by section before the script is written
+LONG_DOC_TOKEN_THRESHOLD = int(os.getenv('LONG_DOC_TOKEN_THRESHOLD', 50000))
+# Upper bound on the text sent in each outline request
+LONG_DOC_SECTION_TOKENS = int(os.getenv('LONG_DOC_SECTION_TOKENS', 12000))
+
+# Numbered headings ("3 Method", "2.1. Setup", "IV. RESULTS") and the usual unnumbered ones
+NUMBERED_HEADING = re.compile(r'^(?:\d{1,2}(?:\.\d{1,2})*\.?|[IVX]{1,5}\.)\s+[A-Z][^\n]{0,60}[^.,;:\n]$')
+NAMED_HEADING = re.compile(
+    r'^(?:abstract|introduction|background|related work|method(?:s|ology)?|approach|experiments?'
+    r'|evaluation|results|discussion|conclusions?|limitations|references|bibliography'
+    r'|acknowledge?ments?|appendix(?: [a-z])?)\s*:?$',
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN
+
+
+def is_long_document(text: str) -> bool:
+    """Whether the paper text is too long to send to the script writer as is"""
+    return estimate_tokens(text) > LONG_DOC_TOKEN_THRESHOLD
+
+
+def is_heading(line: str) -> bool:
+    """Whether a line of extracted text looks like a section heading"""
+    line = line.strip()
+    if not line or len(line) > 80:
+        return False
+    return bool(NUMBERED_HEADING.match(line) or NAMED_HEADING.match(line))
+
+
+def _split_oversized(title: str, text: str, max_chars: int) -> List[Tuple[str, str]]:
+    """Cut a section that alone exceeds the budget at line breaks"""
+    parts, current, size = [], [], 0
+    for line in text.split('\n'):
+        while len(line) > max_chars:
+            # A single huge line (text extracted without breaks): hard cut
+            if current:
+                parts.append('\n'.join(current))
+                current, size = [], 0
+            parts.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and size + len(line) + 1 > max_chars:
+            parts.append('\n'.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        parts.append('\n'.join(current))
+
+    if len(parts) == 1:
+        return [(title, parts[0])]
+    return [(f"{title} (part {i + 1}/{len(parts)})", part) for i, part in enumerate(parts)]
+
+
+def split_sections(text: str, max_tokens: int = None) -> List[Tuple[str, str]]:
+    """
+    Split paper text into chunks of whole sections, each within a token budget
+
+    Sections start at heading-like lines and are packed with pack_sections.
+
+    Args:
+        text: Extracted paper text
+        max_tokens: Budget per chunk (defaults to LONG_DOC_SECTION_TOKENS)
+
+    Returns:
+        list: (title, text) tuples in document order
+    """
+    sections = []
+    title, lines = "Front matter", []
+    for line in text.split('\n'):
+        if is_heading(line):
+            if any(existing.strip() for existing in lines):
+                sections.append((title, '\n'.join(lines)))
+            title, lines = line.strip(), []
+        lines.append(line)
+    if any(line.strip() for line in lines):
+        sections.append((title, '\n'.join(lines)))
+
+    return pack_sections(sections, max_tokens)
+
+
+def pack_sections(sections: List[Tuple[str, str]], max_tokens: int = None) -> List[Tuple[str, str]]:
+    """
+    Group (title, text) sections into chunks within a token budget
+
+    Consecutive short sections are packed into one chunk so the number of
+    requests stays small, and a section larger than the budget is cut at
+    line breaks.
+
+    Returns:
+        list: (title, text) tuples in document order
+    """
+    max_chars = (max_tokens or LONG_DOC_SECTION_TOKENS) * CHARS_PER_TOKEN
+
+    chunks = []
+    titles, texts, size = [], [], 0
+    for title, section in sections:
+        if len(section) > max_chars:
+            if texts:
+                chunks.append((' / '.join(titles), '\n'.join(texts)))
+                titles, texts, size = [], [], 0
+            chunks.extend(_split_oversized(title, section, max_chars))
+            continue
+        if texts and size + len(section) + 1 > max_chars:
+            chunks.append((' / '.join(titles), '\n'.join(texts)))
+            titles, texts, size = [], [], 0
+        titles.append(title)
+        texts.append(section)
+        size += len(section) + 1
+    if texts:
+        chunks.append((' / '.join(titles), '\n'.join(texts)))
+
+    return chunks
@@ -0,0 +1,145 @@
+import io
+import os
+import pdfplumber
+
+# Extraction backend used when none is given explicitly: 'pdfplumber' or 'pymupdf'
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'pdfplumber')
+
+
+class PdfBackend:
+    """
+    An open PDF document that pages can be extracted from one at a time
+
+    Implementations return, for each page, its text and the embedded images
+    as dicts with 'page', 'image' (both 1-based), 'data' (image bytes) and,
+    when known, 'bbox' (x0, top, x1, bottom in points) and 'page_size'
+    (width, height in points) for judging how prominent the image is.
+    Instances are used as context managers and are not shared across processes.
+    """
+
+    name = None
+
+    @property
+    def page_count(self) -> int:
+        raise NotImplementedError
+
+    def extract_page(self, page_num: int):
+        """
+        Returns:
+            tuple: (text or None, list of image dicts) for the 0-based page_num
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def is_path(pdf_source) -> bool:
+    return isinstance(pdf_source, (str, os.PathLike))
+
+
+class PdfplumberBackend(PdfBackend):
+    """Layout-aware pure-Python extraction with pdfplumber"""
+
+    name = 'pdfplumber'
+
+    def __init__(self, pdf_source):
+        self.pdf = pdfplumber.open(pdf_source if is_path(pdf_source) else io.BytesIO(pdf_source))
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pdf.pages)
+
+    def extract_page(self, page_num: int):
+        page = self.pdf.pages[page_num]
+        page_text = page.extract_text()
+        images = []
+
+        # Collect raw image streams from page
+        for img_num, image in enumerate(page.images):
+            try:
+                images.append({
+                    'page': page_num + 1,
+                    'image': img_num + 1,
+                    'data': image['stream'].get_data(),
+                    'bbox': [float(image['x0']), float(image['top']), float(image['x1']), float(image['bottom'])],
+                    'page_size': [float(page.width), float(page.height)]
+                })
+            except Exception as e:
+                print(f"Error extracting image on page {page_num + 1}: {str(e)}")
+                continue
+
+        return page_text, images
+
+    def close(self):
+        self.pdf.close()
+
+
+class PyMuPDFBackend(PdfBackend):
+    """
+    Native extraction with PyMuPDF (fitz)
+
+    Several times faster on text, and images come back in their encoded form
+    (JPEG, PNG, ...) straight from the document instead of as raw streams.
+    """
+
+    name = 'pymupdf'
+
+    def __init__(self, pdf_source):
+        import fitz
+        if is_path(pdf_source):
+            # Opened from disk, pages are read on demand instead of copied into memory
+            self.doc = fitz.open(pdf_source, filetype='pdf')
+        else:
+            self.doc = fitz.open(stream=pdf_source, filetype='pdf')
+
+    @property
+    def page_count(self) -> int:
+        return self.doc.page_count
+
+    def extract_page(self, page_num: int):
+        page = self.doc[page_num]
+        # Blocks are (x0, y0, x1, y1, text, block_no, block_type); type 0 is text
+        blocks = [block[4].strip() for block in page.get_text('blocks', sort=True) if block[6] == 0]
+        page_text = "\n".join(block for block in blocks if block) or None
+        images = []
+
+        for img_num, info in enumerate(page.get_images(full=True)):
+            try:
+                extracted = self.doc.extract_image(info[0])
+                rects = page.get_image_rects(info[0])
+                images.append({
+                    'page': page_num + 1,
+                    'image': img_num + 1,
+                    'data': extracted['image'],
+                    'bbox': [rects[0].x0, rects[0].y0, rects[0].x1, rects[0].y1] if rects else None,
+                    'page_size': [page.rect.width, page.rect.height]
+                })
+            except Exception as e:
+                print(f"Error extracting image on page {page_num + 1}: {str(e)}")
+                continue
+
+        return page_text, images
+
+    def close(self):
+        self.doc.close()
+
+
+BACKENDS = {backend.name: backend for backend in (PdfplumberBackend, PyMuPDFBackend)}
+
+
+def open_pdf(pdf_source, backend: str = None) -> PdfBackend:
+    """
+    Open a PDF (bytes, or a path to read it from disk) with the named
+    extraction backend (defaults to PDF_BACKEND)
+    """
+    name = (backend or PDF_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](pdf_source)
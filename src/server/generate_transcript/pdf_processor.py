@@ -1,93 +1,386 @@
-import pdfplumber
 import os
+import math
+import time
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from openai import OpenAI
 import base64
+import hashlib
 from PIL import Image
 import io
+from src.server.concurrency import map_bounded, retry_after, TaskFailure
+from src.server.sqlite_cache import SQLiteLRUCache, make_cache_key
+from src.server.generate_transcript.image_hashing import dhash, group_near_duplicates
+from src.server.generate_transcript.image_triage import triage_image
+from src.server.generate_transcript.pdf_backends import open_pdf, PDF_BACKEND
+from src.server.generate_transcript.document import build_document
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
 
-def encode_image_to_base64(image):
-    """Convert PIL Image to base64 string"""
+# Initialize OpenAI client; retries are handled by describe_images so they honour
+# the concurrency limit instead of multiplying behind it
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+# Concurrent vision requests per paper and retries per figure
+VISION_MAX_IN_FLIGHT = int(os.getenv('VISION_MAX_IN_FLIGHT', 4))
+VISION_MAX_RETRIES = int(os.getenv('VISION_MAX_RETRIES', 3))
+
+GENERIC_DESCRIPTION = "This figure contains scientific data that would be discussed in the podcast."
+
+VISION_MODEL = "gpt-4o-mini"
+# Bump when the vision prompt changes so cached descriptions are not reused
+VISION_PROMPT_VERSION = 1
+# Largest image the vision model uses without downscaling it itself, and the
+# upload encoding: 'auto' (PNG for line art, JPEG otherwise), 'jpeg', 'webp' or 'png'
+VISION_MAX_EDGE = int(os.getenv('VISION_MAX_EDGE', 2048))
+VISION_MAX_SHORT_EDGE = int(os.getenv('VISION_MAX_SHORT_EDGE', 768))
+VISION_IMAGE_FORMAT = os.getenv('VISION_IMAGE_FORMAT', 'auto').lower()
+VISION_IMAGE_QUALITY = int(os.getenv('VISION_IMAGE_QUALITY', 85))
+# Figures whose difference hashes differ in at most this many bits share a description
+VISION_DEDUP_DISTANCE = int(os.getenv('VISION_DEDUP_DISTANCE', 4))
+
+# Shared per-process cache of figure descriptions, created on first use
+_vision_cache = None
+
+def get_vision_cache():
+    """
+    Return the process-wide figure description cache, or None if disabled (VISION_CACHE_MAX_MB=0)
+    """
+    global _vision_cache
+    max_mb = float(os.getenv('VISION_CACHE_MAX_MB', 64))
+    if max_mb <= 0:
+        return None
+    if _vision_cache is None:
+        _vision_cache = SQLiteLRUCache(
+            os.getenv('VISION_CACHE_PATH', 'cache/vision_descriptions.db'),
+            table='vision_descriptions',
+            max_bytes=int(max_mb * 1024 * 1024)
+        )
+    return _vision_cache
+
+# Worker processes for page extraction (1 = serial) and the page count below
+# which starting a pool costs more than it saves
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 8))
+
+def prepare_image_for_vision(image):
+    """
+    Downscale and compactly encode a figure for upload to the vision model
+    
+    The model works on images fitting VISION_MAX_EDGE x VISION_MAX_EDGE with the
+    short side at most VISION_MAX_SHORT_EDGE, so anything larger only costs
+    upload time. Line art (few colours) stays PNG, which is small and keeps
+    text crisp; photos and other continuous-tone rasters become JPEG or WebP.
+    
+    Returns:
+        tuple: (encoded bytes, mime type)
+    """
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        # Flatten transparency onto white, which is what the page shows
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, 'white')
+        image.paste(rgba, mask=rgba.split()[-1])
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    
+    width, height = image.size
+    scale = min(1.0, VISION_MAX_EDGE / max(width, height), VISION_MAX_SHORT_EDGE / min(width, height))
+    if scale < 1.0:
+        image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+    
+    image_format = VISION_IMAGE_FORMAT
+    if image_format == 'auto':
+        # getcolors returns None once there are more colours than maxcolors
+        image_format = 'png' if image.getcolors(maxcolors=256) is not None else 'jpeg'
+    
     buffered = io.BytesIO()
-    image.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode('utf-8')
+    if image_format == 'png':
+        image.save(buffered, format="PNG", optimize=True)
+    elif image_format == 'webp':
+        image.save(buffered, format="WEBP", quality=VISION_IMAGE_QUALITY, method=4)
+    else:
+        image_format = 'jpeg'
+        image.save(buffered, format="JPEG", quality=VISION_IMAGE_QUALITY, optimize=True)
+    return buffered.getvalue(), f"image/{image_format}"
 
-def analyze_image(image):
+def encode_image_to_base64(image):
     """
-    Analyze an image using OpenAI's Vision API
-    Returns a detailed description of the image content
+    Convert PIL Image to a base64 string ready for the vision API
+    
+    Returns:
+        tuple: (base64 string, mime type for the data URL)
     """
-    try:
-        # Convert image to base64
-        base64_image = encode_image_to_base64(image)
-        
-        # Use chat.completions API for vision (responses API doesn't support vision yet)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert in analyzing scientific figures, charts, and diagrams. Provide detailed descriptions that would be helpful for someone listening to a podcast about the paper."
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "Please analyze this figure from a scientific paper. Describe what it shows, its key findings, and any important patterns or relationships you notice."
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}"
-                            }
+    data, mime_type = prepare_image_for_vision(image)
+    return base64.b64encode(data).decode('utf-8'), mime_type
+
+def request_image_description(image):
+    """
+    Describe an image with OpenAI's Vision API, raising on API errors so the
+    caller can retry
+    """
+    # Downscale, encode and convert image to base64
+    start = time.perf_counter()
+    base64_image, mime_type = encode_image_to_base64(image)
+    encoded = time.perf_counter()
+    
+    # Use chat.completions API for vision (responses API doesn't support vision yet)
+    response = client.chat.completions.create(
+        model=VISION_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an expert in analyzing scientific figures, charts, and diagrams. Provide detailed descriptions that would be helpful for someone listening to a podcast about the paper."
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "Please analyze this figure from a scientific paper. Describe what it shows, its key findings, and any important patterns or relationships you notice."
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{mime_type};base64,{base64_image}"
                         }
-                    ]
-                }
-            ],
-            max_tokens=500
-        )
+                    }
+                ]
+            }
+        ],
+        max_tokens=500
+    )
+    
+    logger.info(f"Described {image.size[0]}x{image.size[1]} figure sent as {len(base64_image) * 3 // 4} bytes "
+                f"{mime_type} (encode {(encoded - start) * 1000:.0f}ms, request {time.perf_counter() - encoded:.2f}s)")
+    return response.choices[0].message.content
+
+# Document opened once per pool worker and reused for every page range it is given
+_worker_pdf = None
+
+def _init_worker(pdf_content, backend):
+    global _worker_pdf
+    _worker_pdf = open_pdf(pdf_content, backend)
+
+def _extract_page_range(start, end):
+    """Pool task: extract pages [start, end) from the worker's open document"""
+    return start, [_worker_pdf.extract_page(page_num) for page_num in range(start, end)]
+
+def _page_ranges(page_count, workers):
+    # A few ranges per worker so a slow, figure-heavy range doesn't hold up the rest
+    size = max(1, math.ceil(page_count / (workers * 4)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def _extract_parallel(pdf_content, page_count, workers, backend, progress_callback=None):
+    """
+    Extract all pages on a process pool
+
+    Returns:
+        list: (text, images) per page, in page order
+    """
+    pages = [None] * page_count
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pdf_content, backend)) as executor:
+        futures = [executor.submit(_extract_page_range, start, end) for start, end in _page_ranges(page_count, workers)]
+        for future in as_completed(futures):
+            start, results = future.result()
+            pages[start:start + len(results)] = results
+            done += len(results)
+            if progress_callback:
+                progress_callback(done, page_count)
+    return pages
+
+def extract_pdf_pages(pdf_content, progress_callback=None, workers=None, backend=None):
+    """
+    Extract the text of each page and raw embedded images from a PDF without calling the vision API
+    
+    Long documents are split into page ranges extracted on a process pool;
+    text is reassembled in page order either way.
+    
+    Args:
+        pdf_content: PDF file bytes, or a path so the PDF is read from disk as needed
+            (pool workers then open the file instead of receiving a copy of the bytes)
+        progress_callback: Optional callback invoked as progress_callback(pages_done, total_pages)
+        workers: Worker processes to use (defaults to PDF_WORKERS, 1 = serial)
+        backend: Extraction backend name (defaults to PDF_BACKEND)
+    
+    Returns:
+        tuple: (page_texts, images) where page_texts holds the text of each page
+            in order (None for pages without text) and images is a list of dicts
+            with 'page', 'image' and 'data' (encoded image bytes)
+    """
+    workers = workers or PDF_WORKERS
+    backend = backend or PDF_BACKEND
+    pages = None
+    
+    with open_pdf(pdf_content, backend) as pdf:
+        page_count = pdf.page_count
         
-        return response.choices[0].message.content
-                
-    except Exception as e:
-        print(f"Error analyzing image: {str(e)}")
-        # Return a generic description instead of failing completely
-        return "This figure contains scientific data that would be discussed in the podcast."
+        if workers > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+            try:
+                pages = _extract_parallel(pdf_content, page_count, min(workers, page_count), backend, progress_callback)
+            except Exception as e:
+                # e.g. a daemonic Celery prefork child, which may not start processes
+                logger.warning(f"Parallel PDF extraction unavailable ({e}), extracting serially")
+        
+        if pages is None:
+            pages = []
+            for page_num in range(page_count):
+                pages.append(pdf.extract_page(page_num))
+                if progress_callback:
+                    progress_callback(page_num + 1, page_count)
+    
+    page_texts = [page_text for page_text, _ in pages]
+    images = [image for _, page_images in pages for image in page_images]
+    return page_texts, images
+
+def extract_pdf_content(pdf_content, progress_callback=None, workers=None, backend=None):
+    """
+    Extract the raw text and embedded images of a PDF (see extract_pdf_pages)
+    
+    Returns:
+        tuple: (text, images) with the page texts joined in order
+    """
+    page_texts, images = extract_pdf_pages(pdf_content, progress_callback, workers, backend)
+    text = "".join(page_text + "\n" for page_text in page_texts if page_text)
+    return text, images
+
+def describe_images(images, progress_callback=None):
+    """
+    Run vision analysis on images collected by extract_pdf_content
+    
+    Decorative or tiny images are rejected by a local triage check first.
+    Identical or near-identical figures (by difference hash) are described
+    once per paper, and descriptions are reused across jobs from the vision
+    cache, which is keyed on the exact image bytes: a near-duplicate from
+    another paper is a different figure. The remaining figures are analyzed with up to VISION_MAX_IN_FLIGHT
+    requests at once; rate-limited requests are retried after the delay the
+    API asks for, and a figure that still fails gets the generic description
+    instead of failing the paper.
+    
+    Args:
+        images: Dicts with 'page', 'image' and 'data'
+        progress_callback: Optional callback invoked as progress_callback(images_done, total_images)
+    
+    Returns:
+        list: Dicts with 'page', 'image', 'description' and 'source' ('vision',
+            'cache', 'duplicate' or 'fallback'), in the order of images. Images
+            skipped by triage have source 'triage', no description and a
+            'rejected' dict with the reason and the measurement that failed
+    """
+    decoded = []
+    # Position in images -> triage result for figures not worth describing
+    rejected = {}
+    for position, image in enumerate(images):
+        try:
+            img = Image.open(io.BytesIO(image['data']))
+            triage = triage_image(img, image.get('bbox'), image.get('page_size'))
+            if triage:
+                rejected[position] = triage
+                continue
+            decoded.append((image, img, dhash(img)))
+        except Exception as e:
+            print(f"Error processing image on page {image['page']}: {str(e)}")
+            continue
+    if rejected:
+        print(f"Skipping {len(rejected)} decorative or tiny images: "
+              f"{dict(Counter(triage['reason'] for triage in rejected.values()))}")
+    
+    if progress_callback:
+        progress_callback(0, len(decoded))
+    
+    groups = group_near_duplicates([image_hash for _, _, image_hash in decoded], VISION_DEDUP_DISTANCE)
+    representatives = sorted(set(groups))
+    cache = get_vision_cache()
+    cache_keys = {
+        index: make_cache_key('vision', VISION_MODEL, VISION_PROMPT_VERSION,
+                              hashlib.sha256(decoded[index][0]['data']).hexdigest())
+        for index in representatives
+    }
+    
+    # index of a representative -> (description, source)
+    results = {}
+    for index in representatives:
+        cached = cache.get(cache_keys[index]) if cache else None
+        if cached is not None:
+            results[index] = (cached.decode('utf-8'), 'cache')
+    pending = [index for index in representatives if index not in results]
+    
+    print(f"Describing {len(pending)} of {len(decoded)} figures "
+          f"({len(decoded) - len(representatives)} duplicates, {len(results)} cached)")
+    done = len(decoded) - len(pending)
+    if progress_callback:
+        progress_callback(done, len(decoded))
+    
+    def on_done(index, description):
+        nonlocal done
+        done += 1
+        if progress_callback:
+            progress_callback(done, len(decoded))
+    
+    descriptions = map_bounded(
+        lambda index: request_image_description(decoded[index][1]),
+        pending,
+        max_in_flight=VISION_MAX_IN_FLIGHT,
+        max_retries=VISION_MAX_RETRIES,
+        retry_delay=retry_after,
+        on_done=on_done,
+        description="Vision analysis"
+    )
+    
+    for index, description in zip(pending, descriptions):
+        if isinstance(description, TaskFailure):
+            print(f"Error analyzing image on page {decoded[index][0]['page']}: {str(description.error)}")
+            # Keep the figure with a generic description instead of dropping it
+            results[index] = (GENERIC_DESCRIPTION, 'fallback')
+            continue
+        results[index] = (description, 'vision')
+        if cache:
+            cache.put(cache_keys[index], description.encode('utf-8'))
+    
+    described = {}
+    for index, ((image, _, _), representative) in enumerate(zip(decoded, groups)):
+        description, source = results[representative]
+        described[id(image)] = {
+            'page': image['page'],
+            'image': image['image'],
+            'description': description,
+            'source': source if representative == index else 'duplicate'
+        }
+    
+    image_descriptions = []
+    for position, image in enumerate(images):
+        if position in rejected:
+            # No description: reported so the triage thresholds can be tuned
+            image_descriptions.append({
+                'page': image['page'],
+                'image': image['image'],
+                'source': 'triage',
+                'rejected': rejected[position]
+            })
+        elif id(image) in described:
+            image_descriptions.append(described[id(image)])
+    
+    return image_descriptions
 
-def process_pdf(pdf_content):
+def process_pdf(pdf_content, title=None):
     """
-    Main function to process PDF and return both text and image descriptions
+    Main function to process PDF into a structured document with figure descriptions
+    
+    pdf_content may be the PDF bytes or a path to the file. The text is
+    cleaned and split into sections (see build_document), and the figure
+    descriptions are bound to their captions.
+    
+    Returns:
+        Document: Use document.text() for the flat paper text and
+            document.figure_context() for the figures
     """
     try:
-        # Extract text and images in a single PDF parsing operation
-        with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-            text = ""
-            image_descriptions = []
-            
-            for page_num, page in enumerate(pdf.pages):
-                # Extract text from page
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-                
-                # Extract and process images from page
-                for img_num, image in enumerate(page.images):
-                    try:
-                        img = Image.open(io.BytesIO(image['stream'].get_data()))
-                        description = analyze_image(img)
-                        image_descriptions.append({
-                            'page': page_num + 1,
-                            'image': img_num + 1,
-                            'description': description
-                        })
-                    except Exception as e:
-                        print(f"Error processing image on page {page_num + 1}: {str(e)}")
-                        continue
+        page_texts, images = extract_pdf_pages(pdf_content)
+        document = build_document(page_texts, title)
+        document.attach_descriptions(describe_images(images))
         
-        return text, image_descriptions
+        return document
     except Exception as e:
         print(f"Error processing PDF: {str(e)}")
         raise
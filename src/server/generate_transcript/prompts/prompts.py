@@ -1,5 +1,8 @@
 import logging
 
+# Bump when the prompts change so cached transcripts are not reused
+PROMPT_VERSION = 1
+
 transcript_example = """[
     {
         "speaker": "female_speaker_1",
@@ -66,13 +69,24 @@ def build_system_prompt():
     
     return system_prompt
 
-def build_user_prompt(paper, options, image_descriptions=None):
+def _figure_entry(desc):
+    # Figures from the structured document may carry the caption found in the text
+    if not desc.get('caption'):
+        return f"Page {desc['page']}, Image {desc['image']}: {desc['description']}"
+    entry = f"Page {desc['page']}, {desc.get('label') or 'Image ' + str(desc['image'])}: {desc['caption']}"
+    if desc.get('description'):
+        entry += f"\nDescription: {desc['description']}"
+    return entry
+
+def build_user_prompt(paper, options, image_descriptions=None, condensed=False):
 
     logging.debug(options)
 
     length_minutes = options["length_minutes"]
     listener_expertise_level = options["listener_expertise_level"]
     number_of_speakers = options["number_of_speakers"]
+    # Long papers arrive as an outline condensed from the full text
+    content_label = "Section-by-section outline (condensed from the full paper)" if condensed else "Summary"
 
     user_prompt = f"""Convert the following research paper to a podcast per systems instructions and listener specifications.
 
@@ -85,10 +99,24 @@ Paper:
 
 Title: {paper['title']}
 
-Summary: {paper['summary']}"""
+{content_label}: {paper['summary']}"""
     
-    if image_descriptions:
-        image_context = "\n\n".join([f"Page {desc['page']}, Image {desc['image']}: {desc['description']}" for desc in image_descriptions])
+    # Entries rejected by image triage carry no description
+    described = [desc for desc in image_descriptions or [] if desc.get('description') or desc.get('caption')]
+    if described:
+        image_context = "\n\n".join([_figure_entry(desc) for desc in described])
         user_prompt += f"\n\nImage Descriptions:\n{image_context}"
 
-    return user_prompt 
\ No newline at end of file
+    return user_prompt
+
+def build_outline_prompt(title, section_title, text, index, total):
+    """
+    Prompt for condensing one part of a long paper into notes for the script writer
+    """
+    return f"""You are preparing notes on part {index} of {total} of the research paper "{title}" for someone who will write a podcast about the whole paper.
+
+Condense the text below into a dense outline of at most 400 words. Keep the key claims, methods, numbers, results, definitions and any figure or table references a listener would need. Drop citations, boilerplate and formatting artifacts. Output only the outline.
+
+Section: {section_title}
+
+{text}"""
@@ -0,0 +1,171 @@
+import os
+import re
+import logging
+from collections import Counter
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Hard cap on the paper text sent on to the model (estimated tokens, see build_document); 0 disables it
+TEXT_TOKEN_BUDGET = int(os.getenv('TEXT_TOKEN_BUDGET', 150000))
+# A line among the first/last few of a page counts as a running header or footer
+# when it repeats on at least this share of the pages
+RUNNING_LINE_MIN_FRACTION = float(os.getenv('RUNNING_LINE_MIN_FRACTION', 0.5))
+RUNNING_LINE_DEPTH = 3
+
+TRUNCATION_MARKER = "\n[... remaining text omitted to fit the input budget ...]"
+
+BIBLIOGRAPHY_HEADING = re.compile(
+    r'^(?:(?:\d{1,2}|[IVX]{1,5})\.?\s+)?(?:references|bibliography|works cited|literature cited)\s*:?$',
+    re.IGNORECASE
+)
+# Material worth keeping that commonly follows the bibliography
+AFTER_BIBLIOGRAPHY_HEADING = re.compile(
+    r'^(?:appendix|appendices|supplementary material|supplemental material)\b',
+    re.IGNORECASE
+)
+PAGE_NUMBER = re.compile(r'^(?:page\s+)?\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?$', re.IGNORECASE)
+LINE_NUMBER_PREFIX = re.compile(r'^(\d{1,4})\s+(?=\S)')
+HYPHENATED_BREAK = re.compile(r'([a-z])-\n([a-z])')
+INLINE_WHITESPACE = re.compile(r'[ \t\u00a0]+')
+BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def _normalize(line: str) -> str:
+    # Running headers often differ only in the page number
+    return re.sub(r'\d+', '#', line.strip().lower())
+
+
+def _running_lines(pages: List[List[str]]) -> set:
+    """Normalized lines repeated near the top or bottom of most pages"""
+    if len(pages) < 3:
+        return set()
+    counts = Counter()
+    for lines in pages:
+        content = [line for line in lines if line.strip()]
+        edges = content[:RUNNING_LINE_DEPTH] + content[-RUNNING_LINE_DEPTH:]
+        counts.update({_normalize(line) for line in edges})
+    threshold = max(3, RUNNING_LINE_MIN_FRACTION * len(pages))
+    return {line for line, count in counts.items() if count >= threshold and line}
+
+
+def _strip_page_edges(lines: List[str], running: set) -> Tuple[List[str], int]:
+    """Drop running headers/footers and bare page numbers from the top and bottom of a page"""
+    removed = 0
+    content = [index for index, line in enumerate(lines) if line.strip()]
+    edges = set(content[:RUNNING_LINE_DEPTH] + content[-RUNNING_LINE_DEPTH:])
+    kept = []
+    for index, line in enumerate(lines):
+        if index in edges and (_normalize(line) in running or PAGE_NUMBER.match(line.strip())):
+            removed += 1
+            continue
+        kept.append(line)
+    return kept, removed
+
+
+def _strip_line_numbers(lines: List[str]) -> Tuple[List[str], int]:
+    """
+    Remove the line numbers of review copies (a numbered prefix on most lines,
+    counting up), as well as lines holding nothing but a number
+    """
+    numbers = [LINE_NUMBER_PREFIX.match(line) for line in lines]
+    values = [int(match.group(1)) for match in numbers if match]
+    content = [line for line in lines if line.strip()]
+    removed = 0
+    if content and len(values) >= 0.6 * len(content) and len(values) >= 5 \
+            and sum(b > a for a, b in zip(values, values[1:])) >= 0.8 * (len(values) - 1):
+        lines = [line[match.end():] if match else line for line, match in zip(lines, numbers)]
+        removed = len(values)
+
+    kept = []
+    for line in lines:
+        if re.fullmatch(r'\s*\d{1,4}\s*', line):
+            removed += 1
+            continue
+        kept.append(line)
+    return kept, removed
+
+
+def _drop_bibliography(pages: List[List[str]]) -> int:
+    """Remove the reference list in place, keeping any appendix that follows it"""
+    positions = [(page, index) for page, lines in enumerate(pages) for index in range(len(lines))]
+    start = None
+    # The last such heading in the second half, so a "References" mention early on is ignored
+    for position in range(len(positions) - 1, len(positions) // 2 - 1, -1):
+        page, index = positions[position]
+        if BIBLIOGRAPHY_HEADING.match(pages[page][index].strip()):
+            start = position
+            break
+    if start is None:
+        return 0
+
+    end = len(positions)
+    for position in range(start + 1, len(positions)):
+        page, index = positions[position]
+        if AFTER_BIBLIOGRAPHY_HEADING.match(pages[page][index].strip()):
+            end = position
+            break
+
+    removed = 0
+    dropped = {}
+    for page, index in positions[start:end]:
+        removed += len(pages[page][index]) + 1
+        dropped.setdefault(page, set()).add(index)
+    for page, indexes in dropped.items():
+        pages[page] = [line for index, line in enumerate(pages[page]) if index not in indexes]
+    return removed
+
+
+def _clean_whitespace(text: str) -> str:
+    text = '\n'.join(INLINE_WHITESPACE.sub(' ', line).strip() for line in text.split('\n'))
+    return BLANK_LINES.sub('\n\n', text).strip()
+
+
+def clean_pages(pages: List[str]) -> Tuple[List[str], dict]:
+    """
+    Clean extracted page texts so fewer input tokens are spent on noise
+
+    Running headers and footers, page and line numbers and the bibliography
+    are removed, words hyphenated across line breaks are rejoined and
+    whitespace is collapsed. Pages keep their positions so text can still be
+    traced back to the page it came from.
+
+    Args:
+        pages: Text of each page, in order (None for pages without text)
+
+    Returns:
+        tuple: (page_texts, stats) with one cleaned text per input page ('' when
+            nothing is left) and the counts of what each step removed
+    """
+    split_pages = [(page or '').split('\n') for page in pages]
+    running = _running_lines([lines for lines, page in zip(split_pages, pages) if page])
+    edge_lines = numbered_lines = hyphenations = 0
+    for number, lines in enumerate(split_pages):
+        lines, removed = _strip_page_edges(lines, running)
+        edge_lines += removed
+        split_pages[number], removed = _strip_line_numbers(lines)
+        numbered_lines += removed
+
+    bibliography_chars = _drop_bibliography(split_pages)
+
+    cleaned = []
+    for lines in split_pages:
+        text, count = HYPHENATED_BREAK.subn(r'\1\2', '\n'.join(lines))
+        hyphenations += count
+        cleaned.append(_clean_whitespace(text))
+
+    return cleaned, {
+        "header_footer_lines": edge_lines,
+        "line_numbers": numbered_lines,
+        "bibliography_chars": bibliography_chars,
+        "hyphenations": hyphenations,
+    }
+
+
+def token_savings(raw_tokens: int, tokens: int) -> dict:
+    return {
+        "raw_tokens": raw_tokens,
+        "tokens": tokens,
+        "saved_tokens": raw_tokens - tokens,
+        "saved_percent": round(100 * (raw_tokens - tokens) / raw_tokens, 1) if raw_tokens else 0.0,
+    }
@@ -2,7 +2,20 @@ import anthropic
 from dotenv import load_dotenv
 import os
 import json
-from src.server.generate_transcript.prompts.prompts import build_system_prompt, build_user_prompt
+import time
+import logging
+from src.server.concurrency import map_bounded, retry_after
+from src.server.sqlite_cache import SQLiteLRUCache, make_cache_key
+from src.server.timings import StageTimer
+from src.server.generate_transcript.json_stream import SegmentStreamParser
+from src.server.generate_transcript.long_document import (
+    CHARS_PER_TOKEN, LONG_DOC_SECTION_TOKENS, LONG_DOC_TOKEN_THRESHOLD, estimate_tokens, is_long_document,
+    split_sections
+)
+from src.server.generate_transcript.text_cleaning import TEXT_TOKEN_BUDGET
+from src.server.generate_transcript.prompts.prompts import (
+    PROMPT_VERSION, build_system_prompt, build_user_prompt, build_outline_prompt
+)
 from src.server.generate_transcript.paper_example import paper
 
 load_dotenv()
@@ -11,94 +24,225 @@ load_dotenv()
 api_key = os.getenv("ANTHROPIC_API_KEY")
 client = anthropic.Anthropic(api_key=api_key)
 
-def generate_transcript(paper, options, image_descriptions=None):
-    # Using the new SDK style (Anthropic class)
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_MODEL = "claude-sonnet-4-20250514"
+# Long papers are outlined section by section (in parallel) before the script is written
+OUTLINE_MODEL = os.getenv('OUTLINE_MODEL', TRANSCRIPT_MODEL)
+OUTLINE_MAX_IN_FLIGHT = int(os.getenv('OUTLINE_MAX_IN_FLIGHT', 4))
+OUTLINE_MAX_RETRIES = int(os.getenv('OUTLINE_MAX_RETRIES', 2))
+OUTLINE_MAX_TOKENS = 800
+# Raw text kept for a part whose outline request fails, so it is not lost entirely
+OUTLINE_FALLBACK_CHARS = 3000
+
+# How long a generated transcript is reused for the same paper, figures and options
+TRANSCRIPT_CACHE_TTL = float(os.getenv('TRANSCRIPT_CACHE_TTL', 30 * 86400))
+
+# Shared per-process cache of generated transcripts, created on first use
+_transcript_cache = None
+
+def get_transcript_cache():
+    """
+    Return the process-wide transcript cache, or None if disabled (TRANSCRIPT_CACHE_MAX_MB=0)
+    """
+    global _transcript_cache
+    max_mb = float(os.getenv('TRANSCRIPT_CACHE_MAX_MB', 64))
+    if max_mb <= 0:
+        return None
+    if _transcript_cache is None:
+        _transcript_cache = SQLiteLRUCache(
+            os.getenv('TRANSCRIPT_CACHE_PATH', 'cache/transcripts.db'),
+            table='transcripts',
+            max_bytes=int(max_mb * 1024 * 1024)
+        )
+    return _transcript_cache
+
+def transcript_cache_key(pdf_hash, options, image_descriptions=None):
+    """
+    Key of the transcript generated for a PDF, its figure descriptions and listener options
+
+    The models, prompt version and text budgets are part of the key, so
+    changing any of them produces new transcripts instead of stale hits.
+    """
+    return make_cache_key(
+        'transcript', TRANSCRIPT_MODEL, OUTLINE_MODEL, PROMPT_VERSION,
+        TEXT_TOKEN_BUDGET, LONG_DOC_TOKEN_THRESHOLD, LONG_DOC_SECTION_TOKENS,
+        pdf_hash, make_cache_key(image_descriptions or []), options
+    )
+
+def cached_transcript(cache_key):
+    """
+    Returns:
+        list: The cached segments for cache_key, or None
+    """
+    cache = get_transcript_cache()
+    cached = cache.get(cache_key) if cache and cache_key else None
+    if cached is None:
+        return None
+    print(f"Using cached transcript {cache_key[:12]}")
+    return json.loads(cached.decode('utf-8'))
+
+def outline_paper(paper, progress_callback=None):
+    """
+    Condense a long paper into a section-by-section outline (the map step)
+
+    The text is split into chunks of whole sections, and each chunk is
+    outlined by its own request, several at a time. The outlines are joined
+    in document order to stand in for the full text in the script prompt.
+
+    Args:
+        paper: Dict with 'title', 'summary' (the extracted paper text) and
+            optionally 'sections', (title, text) chunks from Document.chunks
+        progress_callback: Optional callback invoked as progress_callback(parts_done, total_parts)
+
+    Returns:
+        str: The joined outline
+    """
+    # Section chunks from the structured document, when the caller has one
+    sections = paper.get('sections') or split_sections(paper['summary'])
+    print(f"Long document ({estimate_tokens(paper['summary'])} estimated tokens): outlining {len(sections)} parts")
+    # Retries are handled by map_bounded so they stay within the concurrency limit
+    outline_client = client.with_options(max_retries=0)
+    done = 0
+
+    def outline(index):
+        section_title, text = sections[index]
+        response = outline_client.messages.create(
+            model=OUTLINE_MODEL,
+            max_tokens=OUTLINE_MAX_TOKENS,
+            temperature=0.2,
+            messages=[{
+                "role": "user",
+                "content": build_outline_prompt(paper['title'], section_title, text, index + 1, len(sections))
+            }]
+        )
+        return response.content[0].text.strip()
+
+    def on_done(index, result):
+        nonlocal done
+        done += 1
+        if progress_callback:
+            progress_callback(done, len(sections))
+
+    outlines = map_bounded(
+        outline,
+        range(len(sections)),
+        max_in_flight=OUTLINE_MAX_IN_FLIGHT,
+        max_retries=OUTLINE_MAX_RETRIES,
+        retry_delay=retry_after,
+        on_done=on_done,
+        description="Section outline"
+    )
+
+    parts = []
+    for (section_title, text), result in zip(sections, outlines):
+        if not result:
+            logger.warning(f"Outline of '{section_title}' failed, keeping the start of its raw text")
+            result = text[:OUTLINE_FALLBACK_CHARS]
+        parts.append(f"## {section_title}\n{result}")
+    return "\n\n".join(parts)
+
+def stream_transcript(paper, options, image_descriptions=None, token_callback=None, timer=None,
+                      outline_callback=None, cache_key=None):
+    """
+    Stream the podcast script for a paper, one segment at a time
+
+    Segments are yielded as soon as the model closes each JSON object, so
+    speech synthesis can start on the first lines while the rest of the
+    script is still being written.
+
+    Papers estimated above LONG_DOC_TOKEN_THRESHOLD tokens are first condensed
+    with outline_paper, and the script is written from the outline.
+
+    Args:
+        paper: Dict with 'title' and 'summary' (the extracted paper text)
+        options: Listener options (length_minutes, listener_expertise_level, number_of_speakers)
+        image_descriptions: Optional figure descriptions appended to the prompt
+        token_callback: Optional callback invoked with the number of output tokens generated
+        timer: Optional StageTimer receiving the 'outline' and 'script' stage windows
+        outline_callback: Optional callback invoked as outline_callback(parts_done, total_parts)
+        cache_key: Optional transcript_cache_key; a complete script is stored under it
+            (look it up with cached_transcript before calling this)
+
+    Yields:
+        dict: Segments with 'speaker' and 'text'
+    """
+    timer = timer if timer is not None else StageTimer()
+    parser = SegmentStreamParser()
+    received = 0
+    segments = []
+
+    condensed = is_long_document(paper['summary'])
+    if condensed:
+        with timer.stage('outline'):
+            paper = {**paper, 'summary': outline_paper(paper, outline_callback)}
+        print(f"Outline: {estimate_tokens(paper['summary'])} estimated tokens in {timer.duration('outline'):.1f}s")
+
+    script_start = time.time()
+    with client.messages.stream(
+        model=TRANSCRIPT_MODEL,
         max_tokens=4000,
         temperature=0.7,
         system=build_system_prompt(),
         messages=[
             {
                 "role": "user",
-                "content": build_user_prompt(paper, options, image_descriptions)
+                "content": build_user_prompt(paper, options, image_descriptions, condensed=condensed)
             }
         ]
-    )
+    ) as stream:
+        for text in stream.text_stream:
+            received += len(text)
+            for segment in parser.feed(text):
+                if not isinstance(segment, dict) or 'speaker' not in segment or 'text' not in segment:
+                    print(f"Skipping segment without 'speaker' and 'text' fields: {segment}")
+                    continue
+                segments.append(segment)
+                if token_callback:
+                    token_callback(received // CHARS_PER_TOKEN)
+                yield segment
+
+        response = stream.get_final_message()
+    timer.mark('script', script_start)
 
-    # Parse the JSON response into structured segments
-    try:
-        transcript_text = response.content[0].text.strip()
-        print(f"Raw transcript response length: {len(transcript_text)}")
-        
-        # Check if response was truncated
-        if hasattr(response, 'stop_reason') and response.stop_reason == 'max_tokens':
-            print("WARNING: Response was truncated due to max_tokens limit")
-        
-        # Remove any markdown code blocks if present
-        if transcript_text.startswith('```json'):
-            transcript_text = transcript_text[7:]
-        if transcript_text.endswith('```'):
-            transcript_text = transcript_text[:-3]
-        
-        # Try to find the JSON array boundaries
-        start_idx = transcript_text.find('[')
-        end_idx = transcript_text.rfind(']')
-        
-        if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-            transcript_text = transcript_text[start_idx:end_idx + 1]
-        
-        # Try to parse the JSON
-        try:
-            segments = json.loads(transcript_text)
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            print(f"Problematic text: {transcript_text[max(0, e.pos-50):e.pos+50]}")
-            
-            # Try to fix common JSON issues
-            # Remove any trailing commas
-            transcript_text = transcript_text.replace(',]', ']').replace(',}', '}')
-            
-            # Try to complete any unterminated strings
-            if transcript_text.count('"') % 2 != 0:
-                # Find the last quote and add a closing quote
-                last_quote = transcript_text.rfind('"')
-                if last_quote != -1:
-                    # Check if it's an unterminated string
-                    if not transcript_text[last_quote:].strip().endswith('"'):
-                        transcript_text = transcript_text[:last_quote+1] + '"' + transcript_text[last_quote+1:]
-            
-            # Try parsing again
-            segments = json.loads(transcript_text)
-        
-        # Validate the structure
-        if not isinstance(segments, list):
-            raise ValueError("Transcript must be a list of segments")
-        
-        for segment in segments:
-            if not isinstance(segment, dict) or 'speaker' not in segment or 'text' not in segment:
-                raise ValueError("Each segment must have 'speaker' and 'text' fields")
-        
+    if token_callback and getattr(response, 'usage', None):
+        token_callback(response.usage.output_tokens)
+
+    print(f"Raw transcript response length: {received}")
+    if getattr(response, 'stop_reason', None) == 'max_tokens':
+        print("WARNING: Response was truncated due to max_tokens limit")
+
+    if segments:
         print(f"Successfully parsed {len(segments)} transcript segments")
-        return segments
-        
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse transcript JSON: {e}")
-        print(f"Raw response: {response.content[0].text}")
-        
-        # Create a fallback transcript with a single speaker
-        fallback_segments = [
-            {
-                "speaker": "female_speaker_1",
-                "text": f"I'm sorry, but there was an issue generating the podcast transcript for '{paper.get('title', 'this paper')}'. The paper discusses {paper.get('summary', 'scientific research')[:200]}... Let me provide a brief overview of the key findings."
-            }
-        ]
-        print("Using fallback transcript")
-        return fallback_segments
-        
-    except Exception as e:
-        print(f"Error processing transcript: {e}")
-        raise
+        cache = get_transcript_cache()
+        # A truncated script is not worth keeping around
+        if cache and cache_key and getattr(response, 'stop_reason', None) != 'max_tokens':
+            cache.put(cache_key, json.dumps(segments).encode('utf-8'), ttl=TRANSCRIPT_CACHE_TTL)
+        return
+
+    print(f"Failed to parse any transcript segments from: {response.content[0].text if response.content else ''}")
+    # Create a fallback transcript with a single speaker
+    print("Using fallback transcript")
+    yield {
+        "speaker": "female_speaker_1",
+        "text": f"I'm sorry, but there was an issue generating the podcast transcript for '{paper.get('title', 'this paper')}'. The paper discusses {paper.get('summary', 'scientific research')[:200]}... Let me provide a brief overview of the key findings."
+    }
+
+def generate_transcript(paper, options, image_descriptions=None, token_callback=None, timer=None):
+    """
+    Generate the full podcast script for a paper
+
+    Args:
+        paper: Dict with 'title' and 'summary' (the extracted paper text)
+        options: Listener options (length_minutes, listener_expertise_level, number_of_speakers)
+        image_descriptions: Optional figure descriptions appended to the prompt
+        token_callback: Optional callback invoked with the number of output tokens generated
+        timer: Optional StageTimer receiving the 'outline' and 'script' stage windows
+
+    Returns:
+        list: Segments with 'speaker' and 'text'
+    """
+    return list(stream_transcript(paper, options, image_descriptions, token_callback, timer))
 
 ### FOR TESTING LOCALLY
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.server.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 60))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+# arXiv asks API clients to wait 3 seconds between requests
+ARXIV_MIN_INTERVAL = float(os.getenv('ARXIV_MIN_INTERVAL', 3))
+RATE_LIMITED_HOSTS = {'export.arxiv.org'}
+
+# Each process publishes its pool stats at most this often, under its own key
+# that expires once the process has been idle (or gone) for HTTP_STATS_TTL
+HTTP_STATS_PUBLISH_SECONDS = float(os.getenv('HTTP_STATS_PUBLISH_SECONDS', 10))
+HTTP_STATS_TTL = int(os.getenv('HTTP_STATS_TTL', 5 * 60))
+STATS_PREFIX = 'http:workers:'
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_published_at = None
+_publish_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide pooled HTTP session with keep-alive, retries and gzip
+
+    Connections are reused across calls; a forked child (e.g. a Celery
+    worker) gets its own session instead of sharing the parent's sockets.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            retry = Retry(
+                total=HTTP_MAX_RETRIES,
+                backoff_factor=ARXIV_MIN_INTERVAL,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'Accept-Encoding': 'gzip, deflate',
+                'User-Agent': 'whitepaper_pod (+https://github.com/beddo018/whitepaper_pod)',
+            })
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+class _HostThrottle:
+    """Space out requests to rate-limited hosts, across threads of this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_allowed = {}
+
+    def wait(self, host: str, interval: float):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_allowed.get(host, now))
+            self.next_allowed[host] = start + interval
+        if start > now:
+            time.sleep(start - now)
+
+
+_throttle = _HostThrottle()
+
+
+def http_get(url: str, headers=None, stream: bool = False, timeout=None) -> requests.Response:
+    """
+    GET through the shared session, honouring arXiv's request spacing
+
+    Args:
+        url: URL to fetch
+        headers: Extra request headers (e.g. conditional request validators)
+        stream: Leave the body unread so it can be consumed in chunks
+        timeout: (connect, read) timeout, defaulting to HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT
+
+    Returns:
+        requests.Response (any status; callers decide what is an error)
+    """
+    host = urlsplit(url).hostname
+    if host in RATE_LIMITED_HOSTS:
+        _throttle.wait(host, ARXIV_MIN_INTERVAL)
+    response = get_session().get(url, headers=headers, stream=stream,
+                                 timeout=timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    _publish_connection_stats()
+    return response
+
+
+def connection_stats() -> dict:
+    """
+    Requests sent and connections opened by this process's session
+
+    A reuse ratio near 1 means almost every request rode an existing
+    keep-alive connection.
+    """
+    requests_sent = connections = 0
+    session = _session if _session_pid == os.getpid() else None
+    if session is not None:
+        # The same adapter is mounted for http:// and https://; count its pools once
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    requests_sent += pool.num_requests
+                    connections += pool.num_connections
+    return {
+        "requests": requests_sent,
+        "connections": connections,
+        "reuse_ratio": round(1 - connections / requests_sent, 3) if requests_sent else 0.0,
+    }
+
+
+def _publish_connection_stats():
+    # Shared through Redis so the web process can report every worker's pool
+    global _published_at
+    now = time.monotonic()
+    with _publish_lock:
+        if _published_at is not None and now - _published_at < HTTP_STATS_PUBLISH_SECONDS:
+            return
+        _published_at = now
+    try:
+        get_redis().set(f"{STATS_PREFIX}{socket.gethostname()}:{os.getpid()}",
+                        json.dumps({**connection_stats(), "updated_at": time.time()}), ex=HTTP_STATS_TTL)
+    except Exception as e:
+        logger.debug(f"Could not publish HTTP connection stats: {e}")
+
+
+def worker_connection_stats() -> dict:
+    """Connection reuse of every process that made requests recently, keyed by host:pid"""
+    redis_client = get_redis()
+    keys = list(redis_client.scan_iter(match=f"{STATS_PREFIX}*"))
+    values = redis_client.mget(keys) if keys else []
+    return {
+        key.decode()[len(STATS_PREFIX):]: json.loads(value)
+        for key, value in zip(keys, values) if value is not None
+    }
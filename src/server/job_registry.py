@@ -0,0 +1,81 @@
+import os
+import json
+import logging
+from typing import Optional
+from src.server.redis_client import get_redis
+from src.server.sqlite_cache import make_cache_key
+from src.server.generate_transcript.arxiv import normalize_arxiv_id
+
+logger = logging.getLogger(__name__)
+
+
+def job_fingerprint(paper_url: str, options: dict, voice_mapping: dict) -> str:
+    """
+    Key identifying podcast jobs that would produce the same episode
+    """
+    return make_cache_key(
+        normalize_arxiv_id(paper_url),
+        options["length_minutes"],
+        str(options["listener_expertise_level"]).lower(),
+        options["number_of_speakers"],
+        voice_mapping,
+    )
+
+
+class JobRegistry:
+    """
+    Redis registry mapping job fingerprints to the task producing them
+
+    A fingerprint is claimed atomically when a job starts, so concurrent
+    requests for the same episode attach to one pipeline run. Completed
+    entries live as long as Celery keeps the result.
+    """
+
+    PREFIX = 'jobs:fingerprint:'
+    STATS_KEY = 'jobs:stats'
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or get_redis()
+        self.running_ttl = int(os.getenv('JOB_RUNNING_TTL', 2 * 60 * 60))
+        self.completed_ttl = int(os.getenv('JOB_RESULT_TTL', 24 * 60 * 60))
+
+    def get(self, fingerprint: str) -> Optional[dict]:
+        """Registry entry for a fingerprint: {'job_id', 'state'} or None"""
+        value = self.redis.get(self.PREFIX + fingerprint)
+        return json.loads(value) if value else None
+
+    def claim(self, fingerprint: str, job_id: str) -> bool:
+        """Register job_id as the run for fingerprint unless another job holds it"""
+        value = json.dumps({"job_id": job_id, "state": "running"})
+        return bool(self.redis.set(self.PREFIX + fingerprint, value, nx=True, ex=self.running_ttl))
+
+    def complete(self, fingerprint: str, job_id: str):
+        """Mark a job's result as reusable by later identical requests"""
+        value = json.dumps({"job_id": job_id, "state": "completed"})
+        self.redis.set(self.PREFIX + fingerprint, value, ex=self.completed_ttl)
+
+    def release(self, fingerprint: str, job_id: str):
+        """Forget a failed job so the next request starts a fresh run"""
+        entry = self.get(fingerprint)
+        if entry and entry["job_id"] == job_id:
+            self.redis.delete(self.PREFIX + fingerprint)
+
+    def record(self, outcome: str):
+        """Count a lookup outcome: 'in_flight', 'completed' or 'miss'"""
+        try:
+            self.redis.hincrby(self.STATS_KEY, outcome, 1)
+        except Exception as e:
+            logger.warning(f"Could not record job registry outcome {outcome}: {e}")
+
+    def stats(self) -> dict:
+        counters = {key.decode(): int(value) for key, value in self.redis.hgetall(self.STATS_KEY).items()}
+        in_flight = counters.get('in_flight', 0)
+        completed = counters.get('completed', 0)
+        misses = counters.get('miss', 0)
+        requests = in_flight + completed + misses
+        return {
+            "in_flight_hits": in_flight,
+            "completed_hits": completed,
+            "misses": misses,
+            "hit_rate": round((in_flight + completed) / requests, 3) if requests else 0.0,
+        }
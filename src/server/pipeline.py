@@ -0,0 +1,480 @@
+import os
+import time
+import logging
+from celery import shared_task, chain, current_app, uuid, states
+from celery.exceptions import Ignore
+from src.server.artifacts import ArtifactStore
+from src.server.redis_client import get_redis, RedisSemaphore
+from src.server.concurrency import retry_after
+from src.server.timings import StageTimer
+from src.server.job_registry import JobRegistry, job_fingerprint
+from src.server.progress import report_progress, stage_reporter, publish_event, get_status
+from src.server.generate_transcript.arxiv import fetch_pdf
+from src.server.generate_transcript.pdf_processor import extract_pdf_pages, describe_images
+from src.server.generate_transcript.document import Document, build_document
+from src.server.generate_transcript.transcript_generator import (
+    cached_transcript, stream_transcript, transcript_cache_key
+)
+from src.server.generate_audio.audio_generator import TTSMiddleware, filter_valid_segments, DEFAULT_VOICE_MAPPING
+from src.server.generate_audio.mp3_frames import parse_mp3, stream_duration
+from src.server.generate_audio.progressive import ChunkedPlaylist
+
+logger = logging.getLogger(__name__)
+
+artifacts = ArtifactStore()
+
+# One queue per stage so each worker pool can be sized independently, e.g.
+#   celery -A src.app worker -Q tts --concurrency 32
+QUEUES = ['download', 'parse', 'vision', 'transcript', 'tts', 'mux']
+
+TASK_ROUTES = {
+    'whitepaper_pod.download_pdf': {'queue': 'download'},
+    'whitepaper_pod.parse_pdf': {'queue': 'parse'},
+    'whitepaper_pod.analyze_figures': {'queue': 'vision'},
+    'whitepaper_pod.write_transcript': {'queue': 'transcript'},
+    'whitepaper_pod.synthesize_segment': {'queue': 'tts'},
+    'whitepaper_pod.mux_audio': {'queue': 'mux'},
+    'whitepaper_pod.tts_timeout': {'queue': 'mux'},
+}
+
+TTS_TASK_RETRIES = int(os.getenv('TTS_MAX_RETRIES', 2))
+# ElevenLabs requests in flight across every tts worker, however large their
+# pools, and how long a segment waits for a free slot before it fails
+TTS_MAX_CONCURRENT = int(os.getenv('TTS_MAX_CONCURRENT', 8))
+TTS_SLOT_TIMEOUT = float(os.getenv('TTS_SLOT_TIMEOUT', 5 * 60))
+# How long after the transcript is done the last segment may take before the job fails
+TTS_STAGE_TIMEOUT = float(os.getenv('TTS_STAGE_TIMEOUT', 30 * 60))
+# Lifetime of a job's Redis bookkeeping (finished-segment counter), refreshed on each update
+JOB_KEY_TTL = int(TTS_STAGE_TIMEOUT) + 60 * 60
+# Upper bound on one chunk-publishing pass, after which its playlist lock expires
+PLAYLIST_LOCK_SECONDS = 60
+
+AUDIO_DIR = 'src/client/static/audio'
+# Minimum length of each early-playback chunk; PROGRESSIVE_AUDIO=0 turns chunks off
+PROGRESSIVE_CHUNK_SECONDS = float(os.getenv('PROGRESSIVE_CHUNK_SECONDS', 30))
+
+# One middleware per worker process, reused for every segment: building one
+# checks the audio database schema and sets up its clients
+_tts = None
+
+
+def get_tts() -> TTSMiddleware:
+    global _tts
+    if _tts is None:
+        slots = RedisSemaphore('tts', TTS_MAX_CONCURRENT)
+        _tts = TTSMiddleware(request_slot=lambda: slots.slot(TTS_SLOT_TIMEOUT))
+    return _tts
+
+
+def build_options(podcast_settings=None):
+    """
+    Map podcast settings from the frontend to transcript options, with defaults
+    """
+    if podcast_settings:
+        options = {
+            "length_minutes": podcast_settings.get("length", 5),
+            "listener_expertise_level": podcast_settings.get("expertise", "Intermediate"),
+            "number_of_speakers": podcast_settings.get("speakers", 3)
+        }
+        print(f"Using frontend settings: {options}")
+    else:
+        options = {
+            "length_minutes": 5,
+            "listener_expertise_level": "Intermediate",
+            "number_of_speakers": 3
+        }
+        print(f"Using default settings: {options}")
+    return options
+
+
+def submit_podcast_job(paper_url, paper_title, podcast_settings=None) -> dict:
+    """
+    Start a podcast job, or attach to an identical one that is running or done
+
+    Jobs are deduplicated on the normalized arXiv id, listener options and
+    voice mapping, so concurrent requests for the same episode share one run
+    and repeat requests get the stored result immediately. With
+    podcast_settings['regenerate'] a finished episode is not reused and the
+    new run writes a fresh transcript instead of taking a cached one.
+
+    Returns:
+        dict: 'task_id', 'deduplicated' ('in_flight', 'completed' or None)
+            and, for completed jobs, the stored 'result'
+    """
+    options = build_options(podcast_settings)
+    voice_mapping = {**DEFAULT_VOICE_MAPPING, **((podcast_settings or {}).get("voice_mapping") or {})}
+    fingerprint = job_fingerprint(paper_url, options, voice_mapping)
+    regenerate = bool((podcast_settings or {}).get("regenerate"))
+    registry = JobRegistry()
+
+    # Retry a few times in case another request claims the fingerprint in between
+    for _ in range(3):
+        entry = registry.get(fingerprint)
+        if entry:
+            meta = get_status(entry["job_id"])
+            if meta["status"] == states.SUCCESS and not regenerate:
+                registry.record('completed')
+                logger.info(f"Reusing completed job {entry['job_id']} for {paper_url}")
+                return {"task_id": entry["job_id"], "deduplicated": "completed", "result": meta["result"]}
+            if meta["status"] in states.PROPAGATE_STATES or meta["status"] == states.SUCCESS \
+                    or entry["state"] == "completed":
+                # Failed run, regenerate requested, or its result has expired from the backend: start over
+                registry.release(fingerprint, entry["job_id"])
+            else:
+                registry.record('in_flight')
+                logger.info(f"Attaching to in-flight job {entry['job_id']} for {paper_url}")
+                return {"task_id": entry["job_id"], "deduplicated": "in_flight"}
+
+        job_id = uuid()
+        if registry.claim(fingerprint, job_id):
+            registry.record('miss')
+            start_paper_pipeline(job_id, paper_url, paper_title, options, voice_mapping, fingerprint, regenerate)
+            return {"task_id": job_id, "deduplicated": None}
+
+    raise RuntimeError(f"Could not register podcast job for {paper_url}")
+
+
+def start_paper_pipeline(job_id, paper_url, paper_title, options, voice_mapping=None, fingerprint=None,
+                         regenerate=False) -> str:
+    """
+    Launch the podcast pipeline for a paper
+
+    download -> parse -> vision -> transcript, which streams one TTS task per
+    segment as the model writes it -> mux, started by whichever of those
+    tasks finishes last (see _mark_finished). Stages hand each other a small job dict holding artifact
+    references; the PDF, images and audio never pass through Redis.
+    With regenerate, a new transcript is written even if one is cached.
+
+    Returns:
+        str: Job id, which is also the id of the task that ends up holding the
+            final result, so it can be polled through /api/task_status
+    """
+    job = {
+        "job_id": job_id,
+        "paper_url": paper_url,
+        "paper_title": paper_title,
+        "options": options,
+        "voice_mapping": voice_mapping,
+        "fingerprint": fingerprint,
+        "regenerate": regenerate,
+    }
+
+    workflow = chain(
+        download_pdf.s(job),
+        parse_pdf.s(),
+        analyze_figures.s(),
+        write_transcript.s(),
+    )
+    workflow.on_error(pipeline_failed.s(job_id, fingerprint))
+    workflow.apply_async()
+
+    logger.info(f"Started pipeline {job_id} for {paper_url}")
+    return job_id
+
+
+@shared_task(name='whitepaper_pod.download_pdf')
+def download_pdf(job):
+    report_progress(job["job_id"], 'downloading')
+    try:
+        pdf_path, is_temporary = fetch_pdf(job["paper_url"])
+    except Exception as e:
+        raise Exception(f"Failed to retrieve the PDF: {e}")
+
+    # Streamed to disk by fetch_pdf; the parser reads it from there by path
+    job["pdf_ref"] = artifacts.put_file(job["job_id"], "paper.pdf", pdf_path, move=is_temporary)
+    # Identifies the paper content for the transcript cache, whatever URL it came from
+    job["pdf_sha256"] = artifacts.sha256(job["pdf_ref"])
+    return job
+
+
+@shared_task(name='whitepaper_pod.parse_pdf')
+def parse_pdf(job):
+    report_progress(job["job_id"], 'parsing')
+    page_texts, images = extract_pdf_pages(artifacts.path(job["pdf_ref"]),
+                                           progress_callback=stage_reporter(job["job_id"], 'parsing'))
+    # Cleaned of headers, page and line numbers and the bibliography, which would only cost input tokens
+    document = build_document(page_texts, job["paper_title"])
+    job["text_stats"] = document.stats
+
+    manifest = []
+    for image in images:
+        ref = artifacts.put_bytes(job["job_id"], f"images/p{image['page']:03d}_i{image['image']:03d}", image['data'])
+        manifest.append({"page": image["page"], "image": image["image"], "ref": ref,
+                         "bbox": image.get("bbox"), "page_size": image.get("page_size")})
+
+    job["document_ref"] = artifacts.put_json(job["job_id"], "document.json", document.to_dict())
+    job["images_ref"] = artifacts.put_json(job["job_id"], "images.json", manifest)
+    return job
+
+
+@shared_task(name='whitepaper_pod.analyze_figures')
+def analyze_figures(job):
+    images = [
+        {"page": entry["page"], "image": entry["image"], "data": artifacts.get_bytes(entry["ref"]),
+         "bbox": entry.get("bbox"), "page_size": entry.get("page_size")}
+        for entry in artifacts.get_json(job["images_ref"])
+    ]
+    image_descriptions = describe_images(images, progress_callback=stage_reporter(job["job_id"], 'analyzing'))
+
+    job["descriptions_ref"] = artifacts.put_json(job["job_id"], "image_descriptions.json", image_descriptions)
+    return job
+
+
+# Its outcome is mux_audio's to store: the mux task is the one holding the job id
+@shared_task(name='whitepaper_pod.write_transcript', ignore_result=True)
+def write_transcript(job):
+    document = Document.from_dict(artifacts.get_json(job["document_ref"]))
+    document.attach_descriptions(artifacts.get_json(job["descriptions_ref"]))
+
+    report_progress(job["job_id"], 'scripting', tokens=0)
+    timer = StageTimer()
+    transcript = []
+    segment_count = 0
+    # Known up front so early chunks and the final episode share a name
+    job["filename"] = f"{job['paper_title'].replace(' ', '_')}_{int(time.time())}".replace('/', '_').replace('\\', '_')
+
+    def report_tokens(tokens):
+        segments_done = len(artifacts.list(job["job_id"], "segments/"))
+        report_progress(job["job_id"], 'scripting', tokens=tokens, segments_done=segments_done,
+                        progressive=_publish_chunks(job))
+
+    # Same paper, figures and options as an earlier job (e.g. new voices, or a
+    # retry after a TTS failure): reuse its transcript unless asked to regenerate
+    figure_context = document.figure_context()
+    cache_key = transcript_cache_key(job.get("pdf_sha256"), job["options"], figure_context) \
+        if job.get("pdf_sha256") else None
+    segments = None if job.get("regenerate") else cached_transcript(cache_key)
+    job["transcript_source"] = 'cache' if segments is not None else 'model'
+    if segments is None:
+        segments = stream_transcript({
+            "title": job["paper_title"],
+            "summary": document.text(),
+            "sections": document.chunks()
+        }, job["options"], figure_context, token_callback=report_tokens, timer=timer,
+            outline_callback=lambda done, total: report_progress(job["job_id"], 'scripting', tokens=0,
+                                                                 outline_done=done, outline_total=total),
+            cache_key=cache_key)
+
+    # Dispatch one TTS task per segment as soon as the model finishes writing it,
+    # so speech synthesis overlaps the rest of the transcript generation
+    with timer.stage('transcript'):
+        for segment in segments:
+            transcript.append(segment)
+            if filter_valid_segments([segment]):
+                synthesize_segment.apply_async((job, segment_count, segment))
+                segment_count += 1
+
+    job["transcript_ref"] = artifacts.put_json(job["job_id"], "transcript.json", transcript)
+    if not segment_count:
+        raise ValueError("No segments found in transcript")
+
+    job["segment_count"] = segment_count
+    job["timings"] = timer.windows
+    # Segment tasks dispatched earlier read the final count from here, and the
+    # last of them to finish hands this job to mux
+    artifacts.put_json(job["job_id"], "job.json", job)
+    _report_segments_done(job)
+    tts_timeout.apply_async((job["job_id"], segment_count, job.get("fingerprint")), countdown=TTS_STAGE_TIMEOUT)
+    _mark_finished(job["job_id"])
+
+
+@shared_task(bind=True, name='whitepaper_pod.synthesize_segment', max_retries=TTS_TASK_RETRIES)
+def synthesize_segment(self, job, index, segment):
+    start = time.time()
+    try:
+        audio_bytes = get_tts().synthesize_segment(segment, voice_mapping=job.get("voice_mapping"))
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            # Wait as long as a 429 asks, so a burst doesn't use up every retry within seconds
+            delay = retry_after(e, self.request.retries)
+            raise self.retry(exc=e, countdown=delay if delay is not None else 2 ** self.request.retries)
+        # Continue with the other segments instead of failing the whole episode
+        logger.error(f"Failed to generate speech for segment {index}: {str(e)}")
+        artifacts.put_bytes(job["job_id"], f"segments/{index:05d}.failed", str(e).encode('utf-8'))
+        _report_segments_done(job)
+        _mark_finished(job["job_id"])
+        return {"index": index, "ref": None}
+
+    artifacts.put_json(job["job_id"], f"timings/tts_{index:05d}.json", [start, time.time()])
+    ref = artifacts.put_bytes(job["job_id"], f"segments/{index:05d}.mp3", audio_bytes)
+    _report_segments_done(job)
+    _mark_finished(job["job_id"])
+    return {"index": index, "ref": ref}
+
+
+def _finished_key(job_id):
+    return f"job:{job_id}:finished"
+
+
+def _mark_finished(job_id):
+    """
+    Count one finished part of the TTS stage and start mux after the last
+
+    Each segment task counts itself once its outcome is final (audio, or a
+    failure after retries), and write_transcript counts itself once the job
+    with its segment count is stored. The Redis INCR is atomic, so exactly
+    one caller sees segment_count + 1 and dispatches mux, under the job id
+    the client follows.
+    """
+    redis_client = get_redis()
+    key = _finished_key(job_id)
+    finished = redis_client.incr(key)
+    redis_client.expire(key, JOB_KEY_TTL)
+
+    job_ref = os.path.join(job_id, "job.json")
+    if not artifacts.exists(job_ref):
+        # Transcript still streaming, so this cannot be the last
+        return
+    job = artifacts.get_json(job_ref)
+    if finished == job["segment_count"] + 1:
+        mux_audio.apply_async((job,), task_id=job_id,
+                              link_error=pipeline_failed.s(job_id, job.get("fingerprint")))
+
+
+def _report_segments_done(job):
+    # Segment tasks run on many workers; the artifact directory is the shared tally
+    job_ref = os.path.join(job["job_id"], "job.json")
+    if not artifacts.exists(job_ref):
+        # Transcript still streaming: write_transcript reports progress until then
+        return
+    segment_count = artifacts.get_json(job_ref)["segment_count"]
+    refs = artifacts.list(job["job_id"], "segments/")
+    failed = len([ref for ref in refs if ref.endswith('.failed')])
+    report_progress(job["job_id"], 'synthesizing', len(refs), segment_count, failed=failed,
+                    progressive=_publish_chunks(job, segment_count))
+
+
+def _playlist(job) -> ChunkedPlaylist:
+    return ChunkedPlaylist(os.path.join(AUDIO_DIR, job["filename"]), f"/static/audio/{job['filename']}")
+
+
+def _publish_chunks(job, segment_count=None, final=False):
+    """
+    Publish each finished run of consecutive segments as a playable chunk
+
+    Called by write_transcript while it streams, by each segment task once
+    the transcript is done, and by mux_audio. A Redis lock keeps the playlist
+    to a single writer: while it is held other callers skip their pass, since
+    the holder or a later caller picks up their segments. A run becomes a
+    chunk once it holds PROGRESSIVE_CHUNK_SECONDS of audio; with final=True
+    the pass waits for the lock, the remainder is flushed and the playlist
+    marked complete.
+
+    Returns:
+        dict: Playlist status for the progress meta, or None if unavailable
+    """
+    if os.getenv('PROGRESSIVE_AUDIO', '1') == '0':
+        return None
+
+    try:
+        lock = get_redis().lock(f"job:{job['job_id']}:playlist", timeout=PLAYLIST_LOCK_SECONDS)
+        if not lock.acquire(blocking=final):
+            return _playlist(job).status()
+        try:
+            return _extend_playlist(job, segment_count, final)
+        finally:
+            lock.release()
+    except Exception as e:
+        # Early playback is best effort; the full episode is still produced
+        logger.warning(f"Could not publish audio chunks for job {job['job_id']}: {e}")
+        return None
+
+
+def _extend_playlist(job, segment_count, final):
+    playlist = _playlist(job)
+    while playlist.available:
+        start = playlist.next_segment
+        run, covered, seconds = [], 0, 0.0
+        while (segment_count is None or start + covered < segment_count) and seconds < PROGRESSIVE_CHUNK_SECONDS:
+            ref = os.path.join(job["job_id"], f"segments/{start + covered:05d}")
+            if artifacts.exists(f"{ref}.mp3"):
+                audio_bytes = artifacts.get_bytes(f"{ref}.mp3")
+                stream = parse_mp3(audio_bytes)
+                seconds += stream_duration(stream) if stream else 0.0
+                run.append(audio_bytes)
+            elif not artifacts.exists(f"{ref}.failed"):
+                break  # next segment still being synthesized
+            covered += 1
+
+        reached_end = segment_count is not None and start + covered >= segment_count
+        if not covered or (seconds < PROGRESSIVE_CHUNK_SECONDS and not (final and reached_end)):
+            break
+        playlist.append(run, covered)
+
+    if final and playlist.available:
+        playlist.finish()
+    return playlist.status()
+
+
+@shared_task(name='whitepaper_pod.mux_audio')
+def mux_audio(job):
+    if get_status(job["job_id"])["status"] in states.READY_STATES:
+        # Already failed by tts_timeout; leave that result in place
+        raise Ignore()
+
+    refs = [ref for ref in artifacts.list(job["job_id"], "segments/") if ref.endswith('.mp3')]
+    if not refs:
+        raise ValueError("No audio segments were generated successfully")
+
+    timer = StageTimer(job["timings"])
+    for ref in artifacts.list(job["job_id"], "timings/"):
+        timer.mark('tts', *artifacts.get_json(ref))
+
+    transcript = artifacts.get_json(job["transcript_ref"])
+    progressive = _publish_chunks(job, job["segment_count"], final=True)
+    report_progress(job["job_id"], 'finalizing', 0, len(refs), progressive=progressive)
+    with timer.stage('mux'):
+        audio_path = get_tts().finalize_audio([artifacts.get_bytes(ref) for ref in refs], job["filename"], transcript,
+                                                    progress_callback=stage_reporter(job["job_id"], 'finalizing',
+                                                                                     progressive=progressive))
+
+    if os.getenv('KEEP_ARTIFACTS') != '1':
+        artifacts.delete_job(job["job_id"])
+
+    timings = timer.summary(('transcript', 'tts'), ('script', 'tts'))
+    logger.info(f"Stage timings for job {job['job_id']}: {timings}")
+    result = {
+        "title": job["paper_title"],
+        "transcript": transcript,
+        "audio_url": f"/static/audio/{os.path.basename(audio_path)}",
+        "audio_path": audio_path,
+        "progressive": progressive,
+        "timings": timings,
+        "text_stats": job.get("text_stats"),
+        "transcript_source": job.get("transcript_source")
+    }
+    if job.get("fingerprint"):
+        JobRegistry().complete(job["fingerprint"], job["job_id"])
+    publish_event(job["job_id"], 'done', result)
+    return result
+
+
+@shared_task(name='whitepaper_pod.tts_timeout')
+def tts_timeout(job_id, segment_count, fingerprint=None):
+    """
+    Fail a job whose segments have not all finished TTS_STAGE_TIMEOUT seconds
+    after its transcript (e.g. a worker died mid-segment)
+    """
+    finished = int(get_redis().get(_finished_key(job_id)) or 0)
+    # The count includes write_transcript itself; above segment_count mux has started
+    if finished > segment_count or get_status(job_id)["status"] in states.READY_STATES:
+        return
+    exc = TimeoutError(f"Only {finished - 1}/{segment_count} segments finished after {int(TTS_STAGE_TIMEOUT)}s")
+    logger.error(f"Pipeline {job_id} timed out in TTS: {exc}")
+    _fail_job(job_id, exc, fingerprint=fingerprint)
+
+
+@shared_task(name='whitepaper_pod.pipeline_failed')
+def pipeline_failed(request, exc, traceback, job_id, fingerprint=None):
+    """
+    Error callback: record a stage failure under the job id the client polls
+    """
+    logger.error(f"Pipeline {job_id} failed in {request.task}: {exc}")
+    _fail_job(job_id, exc, traceback, fingerprint)
+
+
+def _fail_job(job_id, exc, traceback=None, fingerprint=None):
+    current_app.backend.mark_as_failure(job_id, exc, traceback=traceback)
+    if fingerprint:
+        JobRegistry().release(fingerprint, job_id)
+    publish_event(job_id, 'failed', {"error": str(exc)})
@@ -0,0 +1,146 @@
+import os
+import json
+import logging
+from celery import current_app
+from celery import states
+from src.server.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PROGRESS = 'PROGRESS'
+# Progress meta outlives any job still running (see JOB_RUNNING_TTL)
+PROGRESS_TTL = int(os.getenv('JOB_RUNNING_TTL', 2 * 60 * 60))
+
+# Pipeline stages in order, with the slice of the overall progress bar each one covers
+STAGES = {
+    'downloading': (0, 5, "Downloading paper..."),
+    'parsing': (5, 20, "Parsing document content..."),
+    'analyzing': (20, 35, "Analyzing figures..."),
+    'scripting': (35, 60, "Creating podcast script..."),
+    'synthesizing': (60, 95, "Generating audio..."),
+    'finalizing': (95, 100, "Finalizing podcast..."),
+}
+
+
+def overall_progress(stage: str, done=None, total=None) -> int:
+    """Map progress within a stage onto the 0-100 range of the whole pipeline"""
+    start, end, _ = STAGES[stage]
+    if not total:
+        return start
+    fraction = min(max(done / total, 0.0), 1.0)
+    return int(start + (end - start) * fraction)
+
+
+def progress_key(job_id: str) -> str:
+    return f"job:{job_id}:progress"
+
+
+def report_progress(job_id: str, stage: str, done=None, total=None, **details):
+    """
+    Publish progress for a job
+
+    Progress lives in its own Redis key next to the Celery result, which
+    get_status merges in while the job is running. Writing it never touches
+    the result, so a late update from a straggling task can't overwrite a
+    job that has meanwhile succeeded or failed. The meta stays small (a few
+    counters) so /api/task_status stays cheap.
+
+    Args:
+        job_id: Id the client polls (the pipeline's final task id)
+        stage: One of STAGES
+        done: Units finished within the stage (pages, images, segments...)
+        total: Total units in the stage, if known
+        details: Extra stage-specific counters, e.g. tokens=1200
+    """
+    if not job_id:
+        return
+
+    meta = {
+        "stage": stage,
+        "current_step": STAGES[stage][2],
+        "progress": overall_progress(stage, done, total),
+        "done": done,
+        "total": total,
+        **details,
+    }
+    try:
+        get_redis().set(progress_key(job_id), json.dumps(meta), ex=PROGRESS_TTL)
+        publish_event(job_id, 'progress', {"status": "processing", **meta})
+    except Exception as e:
+        # Progress is best effort and must never fail a pipeline stage
+        logger.warning(f"Could not report progress for job {job_id}: {e}")
+
+
+def stage_reporter(job_id: str, stage: str, **details):
+    """Return a (done, total) callback reporting progress for one stage"""
+    return lambda done, total: report_progress(job_id, stage, done, total, **details)
+
+
+def get_status(job_id: str) -> dict:
+    """
+    Read a job's state and meta
+
+    A final result (SUCCESS or a failure) always wins; until there is one,
+    the latest progress from report_progress is returned as a PROGRESS state.
+
+    Returns:
+        dict: Celery task meta with 'status' and 'result' keys
+    """
+    meta = current_app.backend.get_task_meta(job_id)
+    if meta['status'] in states.READY_STATES:
+        return meta
+    try:
+        progress = get_redis().get(progress_key(job_id))
+    except Exception as e:
+        logger.warning(f"Could not read progress for job {job_id}: {e}")
+        progress = None
+    if progress:
+        return {**meta, 'status': PROGRESS, 'result': json.loads(progress)}
+    return meta
+
+
+def event_channel(job_id: str) -> str:
+    return f"job_events:{job_id}"
+
+
+def publish_event(job_id: str, event: str, payload: dict):
+    """
+    Push a job event to subscribers of /api/task_events
+
+    Events are 'progress', 'done' (payload is the final result) and 'failed'.
+    """
+    try:
+        get_redis().publish(event_channel(job_id), json.dumps({"event": event, "data": payload}))
+    except Exception as e:
+        logger.warning(f"Could not publish {event} event for job {job_id}: {e}")
+
+
+def subscribe_events(job_id: str):
+    """Return a Redis pub/sub handle subscribed to a job's events"""
+    pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(event_channel(job_id))
+    return pubsub
+
+
+def status_event(meta: dict):
+    """
+    Translate Celery task meta into the (event, payload) pair sent to clients
+
+    The payloads match what /api/task_status returns for the same state.
+    """
+    state = meta['status']
+    if state == states.SUCCESS:
+        return 'done', meta['result']
+    if state in states.PROPAGATE_STATES:
+        return 'failed', {"error": str(meta['result'])}
+    if state == PROGRESS:
+        return 'progress', {"status": "processing", **meta['result']}
+    if state in (states.RETRY, states.STARTED):
+        # Running, but the meta holds no progress: clients keep their last figure
+        return 'progress', {"status": "processing", "stage": "running", "current_step": "Processing..."}
+    return 'progress', {
+        "status": "processing",
+        "stage": "queued",
+        "current_step": "Waiting for a worker...",
+        "progress": 0
+    }
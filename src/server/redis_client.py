@@ -0,0 +1,79 @@
+import os
+import time
+import uuid
+from contextlib import contextmanager
+import redis
+
+_client = None
+
+
+def get_redis():
+    """
+    Shared Redis connection (pooled) for pub/sub and bookkeeping outside of Celery
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    return _client
+
+
+class RedisSemaphore:
+    """
+    Counting semaphore shared by every process using the same Redis
+
+    Holders are members of a sorted set scored by when they acquired a slot;
+    a slot held for longer than lease_seconds (e.g. by a worker that died) is
+    reclaimed, so the lease must outlast the work done under it.
+    """
+
+    # Reclaim expired leases, then take a slot if one is free, in one atomic step
+    ACQUIRE_SCRIPT = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[3]))
+    if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+        redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, name: str, limit: int, lease_seconds: int = 120, redis_client=None):
+        self.key = f"semaphore:{name}"
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+        self.redis = redis_client or get_redis()
+        self._acquire = self.redis.register_script(self.ACQUIRE_SCRIPT)
+
+    def acquire(self, timeout: float = None, poll_interval: float = 0.2):
+        """
+        Wait for a free slot
+
+        Args:
+            timeout: Seconds to wait before giving up (None = wait indefinitely)
+            poll_interval: Seconds between attempts while all slots are taken
+
+        Returns:
+            str: Token to pass to release, or None if the timeout expired
+        """
+        token = uuid.uuid4().hex
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._acquire(keys=[self.key], args=[time.time(), self.limit, self.lease_seconds, token]):
+                return token
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def release(self, token: str):
+        self.redis.zrem(self.key, token)
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        """Hold a slot for the duration of the block; raises TimeoutError if none frees up in time"""
+        token = self.acquire(timeout)
+        if token is None:
+            raise TimeoutError(f"No free {self.key} slot after {timeout}s")
+        try:
+            yield
+        finally:
+            self.release(token)
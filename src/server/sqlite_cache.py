@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts) -> str:
+    """
+    Build a content-addressed cache key from JSON-serializable parts
+
+    Dicts are serialized with sorted keys so logically equal inputs hash the same.
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class SQLiteLRUCache:
+    """
+    Persistent key/value cache stored in SQLite
+
+    Entries are evicted least-recently-used first once the total size exceeds
+    max_bytes (or the entry count exceeds max_entries). Entries may carry an
+    optional TTL. Hit/miss/eviction counters are stored alongside the entries
+    so stats() reports totals across every process sharing the database.
+    """
+
+    def __init__(self, db_path: str, table: str = 'cache_entries',
+                 max_bytes: Optional[int] = None, max_entries: Optional[int] = None):
+        self.db_path = db_path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _init_database(self):
+        """Create the cache table if it doesn't exist"""
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._connect()
+        try:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    value BLOB,
+                    size INTEGER,
+                    created_at REAL,
+                    last_access REAL,
+                    expires_at REAL
+                )
+            ''')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_last_access ON {self.table} (last_access)')
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table}_stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER
+                )
+            ''')
+            conn.execute(f"INSERT OR IGNORE INTO {self.table}_stats (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(f'SELECT value, expires_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                if row is not None:
+                    conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                self._bump(conn, 'misses')
+                conn.commit()
+                return None
+
+            conn.execute(f'UPDATE {self.table} SET last_access = ? WHERE key = ?', (now, key))
+            self._bump(conn, 'hits')
+            conn.commit()
+        finally:
+            conn.close()
+
+        return bytes(row[0])
+
+    def put(self, key: str, value: bytes, ttl: Optional[float] = None, size: Optional[int] = None):
+        """
+        Store value under key, then evict old entries if over budget
+
+        size overrides the bytes counted against max_bytes, for values that
+        describe data stored elsewhere (see FileLRUCache)
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, last_access, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (key, sqlite3.Binary(value), len(value) if size is None else size, now, now, expires_at))
+                self._evict(conn)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def delete(self, key: str):
+        """Remove key from the cache if present"""
+        conn = self._connect()
+        try:
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _bump(self, conn, name: str, amount: int = 1):
+        conn.execute(f'UPDATE {self.table}_stats SET value = value + ? WHERE name = ?', (amount, name))
+
+    def _evict(self, conn):
+        """Drop expired entries, then least-recently-used ones until within limits"""
+        expired = [row[0] for row in conn.execute(
+            f'SELECT key FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at < ?', (time.time(),))]
+        if expired:
+            conn.executemany(f'DELETE FROM {self.table} WHERE key = ?', [(key,) for key in expired])
+            self._on_evict(expired)
+
+        count, total = conn.execute(f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}').fetchone()
+        over_bytes = self.max_bytes is not None and total > self.max_bytes
+        over_count = self.max_entries is not None and count > self.max_entries
+        if not (over_bytes or over_count):
+            return
+
+        rows = conn.execute(f'SELECT key, size FROM {self.table} ORDER BY last_access ASC').fetchall()
+        evicted = []
+        for key, size in rows:
+            if not ((self.max_bytes is not None and total > self.max_bytes) or
+                    (self.max_entries is not None and count > self.max_entries)):
+                break
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            total -= size
+            count -= 1
+            evicted.append(key)
+        self._bump(conn, 'evictions', len(evicted))
+        self._on_evict(evicted)
+        logger.debug(f"Evicted {len(evicted)} entries from {self.table}")
+
+    def _on_evict(self, keys):
+        """Hook for subclasses holding data outside the table"""
+        pass
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current cache size"""
+        conn = self._connect()
+        try:
+            count, total = conn.execute(f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}').fetchone()
+            counters = dict(conn.execute(f'SELECT name, value FROM {self.table}_stats').fetchall())
+        finally:
+            conn.close()
+
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'evictions': counters.get('evictions', 0),
+            'entries': count,
+            'size_bytes': total,
+            'max_bytes': self.max_bytes,
+        }
+
+
+class FileLRUCache(SQLiteLRUCache):
+    """
+    Cache of large files kept on disk, indexed and size-bounded through SQLite
+
+    The index row for each key holds small JSON metadata (e.g. HTTP
+    validators) and the file size; evicting a row deletes its file.
+    """
+
+    def __init__(self, directory: str, table: str = 'files', max_bytes: Optional[int] = None):
+        self.directory = directory
+        super().__init__(os.path.join(directory, 'index.db'), table=table, max_bytes=max_bytes)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """Metadata of a cached file with its 'path' added, or None on a miss"""
+        value = self.get(key)
+        if value is None:
+            return None
+        path = self.path(key)
+        if not os.path.exists(path):
+            # File removed behind our back: treat as a miss
+            self.delete(key)
+            return None
+        return {**json.loads(value.decode('utf-8')), 'path': path}
+
+    def store(self, key: str, source_path: str, **metadata) -> str:
+        """
+        Move source_path into the cache under key and record metadata
+
+        Returns:
+            str: Path of the cached file
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+        self.put(key, json.dumps(metadata).encode('utf-8'), size=os.path.getsize(path))
+        return path
+
+    def update_metadata(self, key: str, **metadata):
+        """Replace the metadata of a cached file, e.g. after revalidating it"""
+        path = self.path(key)
+        if os.path.exists(path):
+            self.put(key, json.dumps(metadata).encode('utf-8'), size=os.path.getsize(path))
+
+    def _on_evict(self, keys):
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
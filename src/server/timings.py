@@ -0,0 +1,71 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Wall-clock windows of pipeline stages, to see where time goes and how
+    much concurrent stages overlap
+
+    Windows are epoch timestamps so marks recorded by different processes
+    (e.g. Celery workers) can be merged into one timer.
+    """
+
+    def __init__(self, windows=None):
+        self.windows = {stage: list(window) for stage, window in (windows or {}).items()}
+        self._lock = threading.Lock()
+
+    def mark(self, stage: str, start: float, end: float = None):
+        """Widen a stage's window to include [start, end]"""
+        end = end if end is not None else time.time()
+        with self._lock:
+            window = self.windows.get(stage)
+            if window:
+                window[0] = min(window[0], start)
+                window[1] = max(window[1], end)
+            else:
+                self.windows[stage] = [start, end]
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.mark(stage, start)
+
+    def duration(self, stage: str) -> float:
+        start, end = self.windows.get(stage, (0.0, 0.0))
+        return end - start
+
+    def overlap(self, first: str, second: str) -> float:
+        """Seconds during which both stages were running"""
+        if first not in self.windows or second not in self.windows:
+            return 0.0
+        start = max(self.windows[first][0], self.windows[second][0])
+        end = min(self.windows[first][1], self.windows[second][1])
+        return max(0.0, end - start)
+
+    def summary(self, *pairs) -> dict:
+        """
+        Durations per stage, the total elapsed time, and the overlap of each
+        (first, second) stage pair given
+        """
+        if not self.windows:
+            return {}
+        origin = min(start for start, _ in self.windows.values())
+        summary = {
+            "stages": {
+                stage: {
+                    "start": round(start - origin, 3),
+                    "seconds": round(end - start, 3),
+                }
+                for stage, (start, end) in sorted(self.windows.items(), key=lambda item: item[1][0])
+            },
+            "total_seconds": round(max(end for _, end in self.windows.values()) - origin, 3),
+        }
+        if pairs:
+            summary["overlap_seconds"] = {f"{first}/{second}": round(self.overlap(first, second), 3)
+                                          for first, second in pairs}
+        return summary
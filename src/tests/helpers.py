@@ -0,0 +1,12 @@
+from PIL import Image, ImageDraw
+
+
+def make_figure(size=(400, 300), bars=(3, 7, 5, 9)):
+    """A bar chart-like figure"""
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    width = size[0] // (len(bars) * 2)
+    for i, height in enumerate(bars):
+        left = width * (2 * i + 1)
+        draw.rectangle([left, size[1] - height * size[1] // 10, left + width, size[1]], fill='navy')
+    return image
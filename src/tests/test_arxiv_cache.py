@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from src.server.generate_transcript import arxiv
+
+
+def fake_download(body, validators):
+    """Stand-in for arxiv._download writing body to a temporary file"""
+    def download(url, cached=None):
+        fd, path = tempfile.mkstemp(dir=arxiv.ARXIV_CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        return 200, path, validators
+    return download
+
+
+class TestArxivPdfCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patches = [
+            mock.patch.object(arxiv, 'ARXIV_CACHE_DIR', self.directory),
+            mock.patch.object(arxiv, '_pdf_cache', None),
+            mock.patch.object(arxiv, '_search_cache', None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_versioned_pdf_is_downloaded_once(self):
+        with mock.patch.object(arxiv, '_download', side_effect=fake_download(b'%PDF-1.4 v1', {"etag": '"a"'})) as fetch:
+            self.assertEqual(arxiv.query_for_pdf('http://arxiv.org/abs/1911.06612v1'), b'%PDF-1.4 v1')
+            self.assertEqual(arxiv.query_for_pdf('https://arxiv.org/pdf/1911.06612v1'), b'%PDF-1.4 v1')
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(arxiv.get_pdf_cache().stats()['hits'], 1)
+
+    def test_unversioned_pdf_is_revalidated(self):
+        with mock.patch.object(arxiv, '_download', side_effect=fake_download(b'%PDF-1.4 latest', {"etag": '"a"'})):
+            arxiv.query_for_pdf('http://arxiv.org/abs/1911.06612')
+
+        with mock.patch.object(arxiv, 'ARXIV_PDF_REVALIDATE', 0), \
+                mock.patch.object(arxiv, '_download', return_value=(304, None, {"etag": '"a"'})) as fetch:
+            self.assertEqual(arxiv.query_for_pdf('http://arxiv.org/abs/1911.06612'), b'%PDF-1.4 latest')
+        self.assertEqual(fetch.call_args[0][1]['etag'], '"a"')
+
+    def test_search_response_is_cached_within_ttl(self):
+        feed = b'<feed xmlns="http://www.w3.org/2005/Atom"></feed>'
+        with mock.patch.object(arxiv, '_fetch', return_value=(200, feed, {})) as fetch:
+            arxiv.query('search_query=all:attention&max_results=5')
+            arxiv.query('search_query=all:attention&max_results=5')
+        self.assertEqual(fetch.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
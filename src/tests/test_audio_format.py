@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+
+from src.server.generate_audio import audio_format
+from src.server.generate_audio.audio_format import decode_audio_bytes, detect_audio_format
+
+
+class TestDetectAudioFormat(unittest.TestCase):
+
+    def test_headers(self):
+        cases = [
+            ("id3 tagged mp3", b'ID3\x04\x00\x00\x00\x00\x00\x21' + b'\x00' * 40, 'mp3'),
+            ("bare mpeg-1 layer iii frame sync", b'\xff\xfb\x90\x64' + b'\x00' * 40, 'mp3'),
+            ("bare mpeg-2 layer iii frame sync", b'\xff\xf3\x84\x64' + b'\x00' * 40, 'mp3'),
+            ("adts aac", b'\xff\xf1\x50\x80' + b'\x00' * 40, 'aac'),
+            ("riff wave", b'RIFF\x24\x08\x00\x00WAVEfmt ' + b'\x00' * 32, 'wav'),
+            ("riff that is not wave", b'RIFF\x24\x08\x00\x00AVI LIST' + b'\x00' * 32, None),
+            ("mp4", b'\x00\x00\x00\x20ftypisom' + b'\x00' * 32, 'mp4'),
+            ("ogg", b'OggS\x00\x02' + b'\x00' * 32, 'ogg'),
+            ("flac", b'fLaC\x00\x00\x00\x22' + b'\x00' * 32, 'flac'),
+            ("unknown bytes", b'hello, this is not audio', None),
+            ("too short", b'\xff\xfb', None),
+            ("empty", b'', None),
+        ]
+        for name, data, expected in cases:
+            with self.subTest(name):
+                self.assertEqual(detect_audio_format(data), expected)
+
+    def test_unknown_header_falls_back_to_ffmpeg_probe(self):
+        with mock.patch.object(audio_format, 'AudioSegment') as segment:
+            decode_audio_bytes(b'hello, this is not audio')
+        segment.from_file.assert_called_once()
+        self.assertNotIn('format', segment.from_file.call_args.kwargs)
+
+    def test_known_header_is_decoded_with_its_format(self):
+        with mock.patch.object(audio_format, 'AudioSegment') as segment:
+            decode_audio_bytes(b'OggS\x00\x02' + b'\x00' * 32)
+        self.assertEqual(segment.from_file.call_args.kwargs['format'], 'ogg')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import threading
+import time
+from src.server.concurrency import map_bounded, retry_after, TaskFailure
+
+
+class MapBoundedTest(unittest.TestCase):
+
+    def test_results_keep_input_order(self):
+        # Later items finish first, results must still line up with the input
+        results = map_bounded(lambda n: (time.sleep(0.01 * (5 - n)), n * 2)[1], range(5), max_in_flight=5)
+        self.assertEqual(results, [0, 2, 4, 6, 8])
+
+    def test_respects_max_in_flight(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def work(item):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+            return item
+
+        map_bounded(work, range(12), max_in_flight=3)
+        self.assertLessEqual(state['peak'], 3)
+
+    def test_retries_then_succeeds(self):
+        attempts = {}
+
+        def flaky(item):
+            attempts[item] = attempts.get(item, 0) + 1
+            if attempts[item] < 3:
+                raise RuntimeError("transient")
+            return item
+
+        results = map_bounded(flaky, ['a', 'b'], max_retries=2, backoff=0)
+        self.assertEqual(results, ['a', 'b'])
+        self.assertEqual(attempts, {'a': 3, 'b': 3})
+
+    def test_exhausted_retries_return_failure(self):
+        def fail_odd(item):
+            if item % 2:
+                raise ValueError("bad segment")
+            return item
+
+        results = map_bounded(fail_odd, range(4), max_retries=1, backoff=0)
+        self.assertEqual(results[0], 0)
+        self.assertIsInstance(results[1], TaskFailure)
+        self.assertEqual(results[1].attempts, 2)
+        self.assertFalse(results[3])
+
+    def test_retry_after_header_sets_delay(self):
+        class RateLimited(Exception):
+            def __init__(self, headers):
+                self.response = type('Response', (), {'headers': headers})()
+
+        self.assertEqual(retry_after(RateLimited({'retry-after': '1.5'}), 0), 1.5)
+        self.assertEqual(retry_after(RateLimited({'retry-after-ms': '250'}), 0), 0.25)
+        self.assertIsNone(retry_after(RateLimited({}), 0))
+        self.assertIsNone(retry_after(ValueError("no response"), 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import unittest
+
+from src.server.generate_transcript.document import Document, build_document
+
+PAGES = [
+    "A Study of Examples\nJane Doe\nAbstract—We study exam-\nples of papers.\n1 Introduction\nExamples matter.",
+    "2 Method\n2.1 Setup\nWe train a model.\nFigure 1: Overview of the\nmodel architecture.\nFigure 1 shows the model.",
+    "3 Results\nIt works.\nFig. 2. Accuracy per epoch.\nFig. 3. Loss per epoch.",
+]
+
+
+class TestBuildDocument(unittest.TestCase):
+
+    def setUp(self):
+        self.document = build_document(PAGES, "A Study of Examples", token_budget=0)
+
+    def test_sections_and_page_spans(self):
+        sections = [(s.heading, s.first_page, s.last_page, s.level) for s in self.document.sections]
+        self.assertEqual(sections, [
+            ("Front matter", 1, 1, 1),
+            ("Abstract", 1, 1, 1),
+            ("1 Introduction", 1, 1, 1),
+            ("2 Method", 2, 2, 1),
+            ("2.1 Setup", 2, 2, 2),
+            ("3 Results", 3, 3, 1),
+        ])
+        self.assertEqual(self.document.abstract, "We study examples of papers.")
+        # Captions are lifted out of the body text, references to figures stay
+        self.assertIn("We train a model.\nFigure 1 shows the model.", self.document.text())
+        self.assertNotIn("Overview", self.document.text())
+
+    def test_captions_bind_to_described_images(self):
+        self.document.attach_descriptions([
+            {"page": 2, "image": 1, "description": "A block diagram.", "source": "vision"},
+            {"page": 3, "image": 1, "description": "A rising curve.", "source": "vision"},
+            {"page": 3, "image": 2, "description": None, "source": "triage"},
+        ])
+        figures = [(f.page, f.image, f.label, f.caption, f.description) for f in self.document.figures]
+        self.assertEqual(figures, [
+            (2, 1, "Figure 1", "Figure 1: Overview of the model architecture.", "A block diagram."),
+            (3, None, "Figure 3", "Fig. 3. Loss per epoch.", None),
+            (3, 1, "Figure 2", "Fig. 2. Accuracy per epoch.", "A rising curve."),
+        ])
+        self.assertEqual(len(self.document.figure_context()), 3)
+
+    def test_round_trips_through_json(self):
+        data = json.loads(json.dumps(self.document.to_dict()))
+        self.assertEqual(Document.from_dict(data), self.document)
+
+    def test_budget_truncates_trailing_sections(self):
+        document = build_document(PAGES, token_budget=20)
+        self.assertTrue(document.stats["truncated"])
+        self.assertLess(len(document.sections), len(self.document.sections))
+        self.assertLessEqual(document.stats["tokens"], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
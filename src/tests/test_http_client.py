@@ -0,0 +1,66 @@
+import os
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from src.server import http_client
+
+
+def fake_session(num_requests, num_connections):
+    pool = SimpleNamespace(num_requests=num_requests, num_connections=num_connections)
+    adapter = SimpleNamespace(poolmanager=SimpleNamespace(pools={('https', 'export.arxiv.org', 443): pool}))
+    # Mounted for both schemes, as get_session does
+    return SimpleNamespace(adapters={'https://': adapter, 'http://': adapter})
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def set(self, key, value, ex=None):
+        self.data[key.encode()] = value.encode()
+        self.expiry[key] = ex
+
+    def scan_iter(self, match):
+        return [key for key in self.data if key.decode().startswith(match.rstrip('*'))]
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+
+class TestConnectionStats(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patches = [
+            mock.patch.object(http_client, '_session', fake_session(10, 2)),
+            mock.patch.object(http_client, '_session_pid', os.getpid()),
+            mock.patch.object(http_client, '_published_at', None),
+            mock.patch.object(http_client, 'get_redis', return_value=self.redis),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_adapter_mounted_twice_is_counted_once(self):
+        self.assertEqual(http_client.connection_stats(), {"requests": 10, "connections": 2, "reuse_ratio": 0.8})
+
+    def test_publishing_is_throttled_and_expires(self):
+        with mock.patch.object(http_client.time, 'monotonic', side_effect=[100.0, 105.0, 111.0]), \
+                mock.patch.object(http_client, 'connection_stats', side_effect=[{"requests": 1}, {"requests": 3}]):
+            for _ in range(3):
+                http_client._publish_connection_stats()
+
+        [(key, expiry)] = self.redis.expiry.items()
+        self.assertTrue(key.startswith(http_client.STATS_PREFIX))
+        self.assertEqual(expiry, http_client.HTTP_STATS_TTL)
+        # The second call fell inside the interval; the third published the latest counters
+        [stats] = http_client.worker_connection_stats().values()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(json.loads(self.redis.data[key.encode()])["requests"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
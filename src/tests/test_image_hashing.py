@@ -0,0 +1,23 @@
+import unittest
+
+from src.server.generate_transcript.image_hashing import dhash, hamming_distance, group_near_duplicates
+from src.tests.helpers import make_figure
+
+
+class TestImageHashing(unittest.TestCase):
+
+    def test_rescaled_copy_is_near_duplicate(self):
+        original = make_figure()
+        rescaled = original.resize((200, 150))
+        self.assertLessEqual(hamming_distance(dhash(original), dhash(rescaled)), 4)
+
+    def test_different_figures_are_far_apart(self):
+        self.assertGreater(hamming_distance(dhash(make_figure(bars=(3, 7, 5, 9))),
+                                            dhash(make_figure(bars=(9, 2, 8, 1)))), 4)
+
+    def test_group_near_duplicates_points_at_first_occurrence(self):
+        self.assertEqual(group_near_duplicates([0b1111, 0b0000, 0b1110, 0b0001], 1), [0, 1, 0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
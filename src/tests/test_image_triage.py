@@ -0,0 +1,36 @@
+import unittest
+
+from PIL import Image, ImageDraw
+
+from src.server.generate_transcript.image_triage import triage_image
+
+
+def make_plot(size=(600, 400)):
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    for x in range(0, size[0], 10):
+        draw.line([x, size[1] - (x * 7919) % size[1], x + 10, size[1]], fill='black', width=2)
+    return image
+
+
+class TestImageTriage(unittest.TestCase):
+
+    def test_real_figure_passes(self):
+        self.assertIsNone(triage_image(make_plot(), bbox=[72, 72, 540, 400], page_size=[612, 792]))
+
+    def test_spacer_is_too_small(self):
+        self.assertEqual(triage_image(Image.new('RGB', (1, 1)))['reason'], 'too_small')
+
+    def test_rule_has_extreme_aspect_ratio(self):
+        self.assertEqual(triage_image(make_plot((1200, 100)))['reason'], 'extreme_aspect_ratio')
+
+    def test_icon_is_small_on_page(self):
+        triage = triage_image(make_plot(), bbox=[10, 10, 30, 30], page_size=[612, 792])
+        self.assertEqual(triage['reason'], 'small_on_page')
+
+    def test_blank_placeholder_is_solid_color(self):
+        self.assertEqual(triage_image(Image.new('RGB', (300, 300), 'white'))['reason'], 'solid_color')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+from unittest import mock
+
+from src.server import pipeline
+from src.server.job_registry import JobRegistry, job_fingerprint
+
+OPTIONS = {"length_minutes": 5, "listener_expertise_level": "Intermediate", "number_of_speakers": 3}
+
+
+class FakeRedis:
+    """The few Redis commands JobRegistry uses, on a dict (expiry is not simulated)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def hincrby(self, key, field, amount):
+        counters = self.data.setdefault(key, {})
+        counters[field.encode()] = counters.get(field.encode(), 0) + amount
+
+    def hgetall(self, key):
+        return self.data.get(key, {})
+
+
+class TestJobRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = JobRegistry(FakeRedis())
+
+    def test_claim_is_exclusive(self):
+        self.assertTrue(self.registry.claim('fp', 'job-1'))
+        self.assertFalse(self.registry.claim('fp', 'job-2'))
+        self.assertEqual(self.registry.get('fp'), {"job_id": "job-1", "state": "running"})
+
+    def test_complete_and_release(self):
+        self.registry.claim('fp', 'job-1')
+        self.registry.complete('fp', 'job-1')
+        self.assertEqual(self.registry.get('fp')["state"], "completed")
+
+        # Only the job holding the fingerprint can release it
+        self.registry.release('fp', 'job-2')
+        self.assertIsNotNone(self.registry.get('fp'))
+        self.registry.release('fp', 'job-1')
+        self.assertIsNone(self.registry.get('fp'))
+        self.assertTrue(self.registry.claim('fp', 'job-3'))
+
+    def test_stats(self):
+        for outcome in ('miss', 'in_flight', 'completed', 'completed'):
+            self.registry.record(outcome)
+        self.assertEqual(self.registry.stats(), {
+            "in_flight_hits": 1, "completed_hits": 2, "misses": 1, "hit_rate": 0.75
+        })
+
+    def test_fingerprint_normalizes_url_and_options(self):
+        voices = {"host": "voice-a"}
+        self.assertEqual(
+            job_fingerprint('https://arxiv.org/pdf/1911.06612v1.pdf', OPTIONS, voices),
+            job_fingerprint('http://arxiv.org/abs/1911.06612v1',
+                            {**OPTIONS, "listener_expertise_level": "intermediate"}, voices))
+        self.assertNotEqual(
+            job_fingerprint('http://arxiv.org/abs/1911.06612v1', OPTIONS, voices),
+            job_fingerprint('http://arxiv.org/abs/1911.06612v1', OPTIONS, {"host": "voice-b"}))
+
+
+class TestSubmitPodcastJob(unittest.TestCase):
+
+    URL = 'http://arxiv.org/abs/1911.06612v1'
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.statuses = {}
+        self.job_ids = iter(f"job-{n}" for n in range(1, 10))
+        patches = [
+            mock.patch.object(pipeline, 'JobRegistry', lambda: JobRegistry(self.redis)),
+            mock.patch.object(pipeline, 'get_status',
+                              lambda job_id: self.statuses.get(job_id, {"status": "PENDING", "result": None})),
+            mock.patch.object(pipeline, 'uuid', lambda: next(self.job_ids)),
+            mock.patch.object(pipeline, 'start_paper_pipeline'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.start = pipeline.start_paper_pipeline
+
+    def submit(self, **settings):
+        return pipeline.submit_podcast_job(self.URL, "A Paper", settings or None)
+
+    def test_duplicate_submit_attaches_to_in_flight_job(self):
+        first = self.submit()
+        self.statuses[first["task_id"]] = {"status": "PROGRESS", "result": {"stage": "parsing"}}
+
+        self.assertEqual(self.submit(), {"task_id": first["task_id"], "deduplicated": "in_flight"})
+        self.assertEqual(self.start.call_count, 1)
+
+    def test_finished_job_is_reused(self):
+        first = self.submit()
+        result = {"audio_url": "/static/audio/A_Paper.mp3"}
+        self.statuses[first["task_id"]] = {"status": "SUCCESS", "result": result}
+        JobRegistry(self.redis).complete(self.start.call_args.args[5], first["task_id"])
+
+        self.assertEqual(self.submit(), {"task_id": first["task_id"], "deduplicated": "completed", "result": result})
+        self.assertEqual(self.start.call_count, 1)
+
+        # Unless a new transcript is requested
+        regenerated = self.submit(regenerate=True)
+        self.assertNotEqual(regenerated["task_id"], first["task_id"])
+        self.assertTrue(self.start.call_args.args[6])
+
+    def test_failed_job_is_resubmitted(self):
+        first = self.submit()
+        self.statuses[first["task_id"]] = {"status": "FAILURE", "result": RuntimeError("TTS quota exceeded")}
+
+        second = self.submit()
+        self.assertEqual(second["deduplicated"], None)
+        self.assertNotEqual(second["task_id"], first["task_id"])
+        self.assertEqual(self.start.call_count, 2)
+
+    def test_different_voices_are_separate_jobs(self):
+        first = self.submit()
+        second = self.submit(voice_mapping={"female_speaker_1": "another-voice"})
+        self.assertNotEqual(second["task_id"], first["task_id"])
+        self.assertEqual(self.start.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
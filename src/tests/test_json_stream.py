@@ -0,0 +1,44 @@
+import json
+import unittest
+
+from src.server.generate_transcript.json_stream import SegmentStreamParser, iter_json_objects
+
+SEGMENTS = [
+    {"speaker": "female_speaker_1", "text": "Welcome! Today: \"attention\" {really} [is] all you need."},
+    {"speaker": "male_speaker_1", "text": "Backslashes \\ and unicode é survive."},
+    {"speaker": "female_speaker_1", "text": "Thanks for listening."},
+]
+
+
+class TestSegmentStreamParser(unittest.TestCase):
+
+    def test_yields_each_object_as_soon_as_it_closes(self):
+        text = json.dumps(SEGMENTS)
+        parser = SegmentStreamParser()
+        first_close = len(json.dumps(SEGMENTS[0])) + 1
+
+        self.assertEqual(parser.feed(text[:first_close - 1]), [])
+        self.assertEqual(parser.feed(text[first_close - 1:first_close]), SEGMENTS[:1])
+        self.assertEqual(parser.feed(text[first_close:]), SEGMENTS[1:])
+
+    def test_single_character_chunks(self):
+        text = "```json\n" + json.dumps(SEGMENTS, indent=2) + "\n```"
+        self.assertEqual(list(iter_json_objects(text)), SEGMENTS)
+
+    def test_truncated_object_is_dropped(self):
+        text = json.dumps(SEGMENTS)
+        cut = text.rindex('Thanks')
+        self.assertEqual(list(iter_json_objects([text[:cut]])), SEGMENTS[:2])
+
+    def test_trailing_comma_is_repaired(self):
+        text = '[{"speaker": "a", "text": "b",}, {"speaker": "c", "text": "d"}]'
+        self.assertEqual(list(iter_json_objects([text])),
+                         [{"speaker": "a", "text": "b"}, {"speaker": "c", "text": "d"}])
+
+    def test_text_after_array_is_ignored(self):
+        text = json.dumps(SEGMENTS[:1]) + ' Note: {"speaker": "x", "text": "y"}'
+        self.assertEqual(list(iter_json_objects([text])), SEGMENTS[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()
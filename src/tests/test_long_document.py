@@ -0,0 +1,42 @@
+import unittest
+
+from src.server.generate_transcript.long_document import CHARS_PER_TOKEN, estimate_tokens, split_sections
+
+
+def section(heading, lines, width=60):
+    return "\n".join([heading] + [f"body text {i} ".ljust(width, 'x') + "." for i in range(lines)])
+
+
+class TestSplitSections(unittest.TestCase):
+
+    def test_short_sections_are_packed_together(self):
+        text = "\n".join([section("Abstract", 2), section("1 Introduction", 2), section("2 Method", 2)])
+        chunks = split_sections(text, max_tokens=10000)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0][0], "Abstract / 1 Introduction / 2 Method")
+        self.assertEqual(chunks[0][1], text)
+
+    def test_chunks_respect_budget_and_keep_order(self):
+        text = "\n".join(section(f"{i} Section {i}", 20) for i in range(1, 7))
+        max_tokens = 800
+        chunks = split_sections(text, max_tokens=max_tokens)
+        self.assertGreater(len(chunks), 1)
+        for _, chunk in chunks:
+            self.assertLessEqual(len(chunk), max_tokens * CHARS_PER_TOKEN)
+        self.assertEqual("\n".join(chunk for _, chunk in chunks), text)
+
+    def test_oversized_section_is_cut_at_line_breaks(self):
+        text = section("3 Experiments", 200)
+        chunks = split_sections(text, max_tokens=500)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(chunks[0][0].startswith("3 Experiments (part 1/"))
+        self.assertEqual("\n".join(chunk for _, chunk in chunks), text)
+
+    def test_text_without_headings(self):
+        text = "a" * 100
+        self.assertEqual(split_sections(text), [("Front matter", text)])
+        self.assertEqual(estimate_tokens(text), 100 // CHARS_PER_TOKEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+from unittest import mock
+
+from src.server.generate_audio import mp3_frames
+from src.server.generate_audio.mp3_frames import concat_mp3, parse_frame_header, parse_mp3, stream_duration
+
+MPEG1, MPEG2 = 3, 2
+STEREO, MONO = 0, 3
+
+
+def frame(version_id=MPEG1, bitrate_index=9, rate_index=0, padding=0, channel_mode=STEREO, fill=0x11, body=b''):
+    """A Layer III frame without CRC, padded out to its declared length"""
+    header = bytes([
+        0xFF,
+        0xE0 | (version_id << 3) | (0b01 << 1) | 0x01,
+        (bitrate_index << 4) | (rate_index << 2) | (padding << 1),
+        channel_mode << 6,
+    ])
+    length = parse_frame_header(header, 0).length
+    data = header + body
+    return data + bytes([fill]) * (length - len(data))
+
+
+def id3_tag(payload_size=20):
+    size = bytes([(payload_size >> shift) & 0x7F for shift in (21, 14, 7, 0)])
+    return b'ID3\x04\x00\x00' + size + b'\x00' * payload_size
+
+
+class TestFrameHeader(unittest.TestCase):
+
+    def test_frame_lengths(self):
+        cases = [
+            # MPEG-1 Layer III, 128 kbps, 44.1 kHz: 144 * 128000 / 44100
+            ("mpeg-1", MPEG1, 9, 0, 0, 417, 1152, 44100),
+            ("mpeg-1 padded", MPEG1, 9, 0, 1, 418, 1152, 44100),
+            # MPEG-2 Layer III, 64 kbps, 22.05 kHz: 72 * 64000 / 22050
+            ("mpeg-2", MPEG2, 8, 0, 0, 208, 576, 22050),
+            ("mpeg-2 padded", MPEG2, 8, 0, 1, 209, 576, 22050),
+            # MPEG-1 Layer III, 320 kbps, 48 kHz
+            ("mpeg-1 48k", MPEG1, 14, 1, 0, 960, 1152, 48000),
+        ]
+        for name, version_id, bitrate_index, rate_index, padding, length, samples, sample_rate in cases:
+            with self.subTest(name):
+                data = frame(version_id, bitrate_index, rate_index, padding)
+                header = parse_frame_header(data, 0)
+                self.assertEqual(header.length, length)
+                self.assertEqual(len(data), length)
+                self.assertEqual(header.samples, samples)
+                self.assertEqual(header.params.sample_rate, sample_rate)
+
+    def test_invalid_headers(self):
+        valid = frame()
+        for name, data in [
+            ("no sync", b'\x00' + valid[1:4]),
+            ("reserved version", bytes([0xFF, 0xE0 | (1 << 3) | 0x03]) + valid[2:4]),
+            ("free bitrate", valid[:2] + bytes([valid[2] & 0x0F]) + valid[3:4]),
+            ("bad bitrate", valid[:2] + bytes([0xF0 | (valid[2] & 0x0F)]) + valid[3:4]),
+            ("reserved sample rate", valid[:2] + bytes([valid[2] | 0x0C]) + valid[3:4]),
+            ("truncated", valid[:3]),
+        ]:
+            with self.subTest(name):
+                self.assertIsNone(parse_frame_header(data, 0))
+
+    def test_channels(self):
+        self.assertEqual(parse_frame_header(frame(channel_mode=MONO), 0).params.channels, 1)
+        self.assertEqual(parse_frame_header(frame(channel_mode=STEREO), 0).params.channels, 2)
+
+
+class TestParseMp3(unittest.TestCase):
+
+    def test_skips_id3_info_frame_and_trailing_tag(self):
+        # Xing header sits after the 32 bytes of MPEG-1 stereo side info
+        xing = frame(body=b'\x00' * 32 + b'Xing')
+        audio = [frame(fill=0x22), frame(padding=1, fill=0x33)]
+        stream = parse_mp3(id3_tag() + xing + b''.join(audio) + b'TAG' + b'\x00' * 125)
+
+        self.assertEqual([bytes(f) for f in stream.frames], audio)
+        self.assertEqual(stream.bitrate, 128)
+        self.assertAlmostEqual(stream_duration(stream), 2 * 1152 / 44100)
+
+    def test_mismatched_parameters(self):
+        cases = [
+            ("sample rate", frame(rate_index=1)),
+            ("channel mode", frame(channel_mode=MONO)),
+            ("version", frame(version_id=MPEG2, bitrate_index=8)),
+        ]
+        for name, other in cases:
+            with self.subTest(name):
+                self.assertIsNone(parse_mp3(frame() + other))
+
+    def test_lost_sync_and_empty(self):
+        self.assertIsNone(parse_mp3(frame() + b'\x00' * 20 + frame()))
+        self.assertIsNone(parse_mp3(id3_tag()))
+
+    def test_truncated_final_frame_is_dropped(self):
+        stream = parse_mp3(frame() + frame()[:100])
+        self.assertEqual(len(stream.frames), 1)
+
+
+class TestConcatMp3(unittest.TestCase):
+
+    def setUp(self):
+        self.gap = frame(fill=0x00)
+        patcher = mock.patch.object(mp3_frames, 'silence_frames', return_value=self.gap * 2)
+        self.silence = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.segments = [frame(fill=0x40 + i) * 2 for i in range(3)]
+
+    def frames(self, data):
+        return [bytes(f) for f in parse_mp3(data).frames]
+
+    def test_gaps_between_segments(self):
+        frames = self.frames(concat_mp3(self.segments, gap_ms=500))
+        # 3 segments of 2 frames, 2 gaps of 2 frames
+        self.assertEqual(len(frames), 10)
+        self.assertEqual(frames[2:4], [self.gap] * 2)
+        self.assertEqual(frames[:2], [frame(fill=0x40)] * 2)
+
+    def test_leading_gap(self):
+        frames = self.frames(concat_mp3(self.segments, gap_ms=500, leading_gap=True))
+        self.assertEqual(len(frames), 12)
+        self.assertEqual(frames[:2], [self.gap] * 2)
+
+    def test_single_segment_without_gap(self):
+        self.assertEqual(concat_mp3(self.segments[:1]), self.segments[0])
+        self.assertEqual(len(self.frames(concat_mp3(self.segments, gap_ms=0))), 6)
+        self.silence.assert_not_called()
+
+    def test_mixed_parameters_are_not_stream_copied(self):
+        self.assertIsNone(concat_mp3([self.segments[0], frame(rate_index=1)]))
+        self.assertIsNone(concat_mp3([self.segments[0], b'not mp3']))
+
+    def test_no_silence_available(self):
+        self.silence.return_value = None
+        self.assertIsNone(concat_mp3(self.segments))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import unittest
+from unittest import mock
+
+from src.server import progress
+from src.server.progress import get_status, overall_progress, report_progress, status_event
+
+
+class TestStatusEvent(unittest.TestCase):
+
+    def test_states(self):
+        stage_meta = {"stage": "synthesizing", "current_step": "Generating audio...", "progress": 72,
+                    "done": 12, "total": 20}
+        result = {"title": "A Paper", "audio_url": "/static/audio/A_Paper.mp3"}
+        running = {"status": "processing", "stage": "running", "current_step": "Processing..."}
+        queued = {"status": "processing", "stage": "queued", "current_step": "Waiting for a worker...",
+                  "progress": 0}
+        cases = [
+            ("pending", {"status": "PENDING", "result": None}, 'progress', queued),
+            ("progress", {"status": "PROGRESS", "result": stage_meta}, 'progress',
+             {"status": "processing", **stage_meta}),
+            ("retry", {"status": "RETRY", "result": RuntimeError("rate limited")}, 'progress', running),
+            ("started", {"status": "STARTED", "result": {"pid": 1}}, 'progress', running),
+            ("success", {"status": "SUCCESS", "result": result}, 'done', result),
+            ("failure", {"status": "FAILURE", "result": ValueError("No segments found in transcript")}, 'failed',
+             {"error": "No segments found in transcript"}),
+            ("revoked", {"status": "REVOKED", "result": "revoked"}, 'failed', {"error": "revoked"}),
+        ]
+        for name, meta, event, payload in cases:
+            with self.subTest(name):
+                self.assertEqual(status_event(meta), (event, payload))
+
+    def test_retry_payload_has_no_progress_figure(self):
+        # Clients keep the last progress they saw instead of dropping back to 0%
+        _, payload = status_event({"status": "RETRY", "result": None})
+        self.assertNotIn("progress", payload)
+
+
+class TestProgressStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.store = {}
+        self.backend = mock.Mock()
+        self.backend.get_task_meta.side_effect = lambda job_id: dict(self.meta)
+        self.meta = {"status": "PENDING", "result": None}
+        redis_client = mock.Mock()
+        redis_client.set.side_effect = lambda key, value, ex=None: self.store.__setitem__(key, value)
+        redis_client.get.side_effect = self.store.get
+        patches = [
+            mock.patch.object(progress, 'current_app', mock.Mock(backend=self.backend)),
+            mock.patch.object(progress, 'get_redis', return_value=redis_client),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_progress_is_merged_while_running(self):
+        report_progress('job-1', 'synthesizing', 10, 20)
+        meta = get_status('job-1')
+        self.assertEqual(meta["status"], "PROGRESS")
+        self.assertEqual((meta["result"]["stage"], meta["result"]["progress"]), ("synthesizing", 77))
+        self.backend.store_result.assert_not_called()
+
+    def test_late_progress_never_hides_a_final_state(self):
+        self.meta = {"status": "FAILURE", "result": TimeoutError("Only 3/20 segments finished")}
+        report_progress('job-1', 'synthesizing', 19, 20)
+        self.assertEqual(get_status('job-1')["status"], "FAILURE")
+        self.assertEqual(json.loads(self.store[progress.progress_key('job-1')])["done"], 19)
+
+
+class TestOverallProgress(unittest.TestCase):
+
+    def test_stage_slices(self):
+        self.assertEqual(overall_progress('downloading'), 0)
+        self.assertEqual(overall_progress('synthesizing', 0, 20), 60)
+        self.assertEqual(overall_progress('synthesizing', 10, 20), 77)
+        self.assertEqual(overall_progress('synthesizing', 30, 20), 95)
+        self.assertEqual(overall_progress('finalizing', 1, 0), 95)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.server.sqlite_cache import SQLiteLRUCache, FileLRUCache, make_cache_key
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestSQLiteLRUCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.clock = FakeClock()
+        patcher = mock.patch('src.server.sqlite_cache.time.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_cache(self, **limits):
+        return SQLiteLRUCache(os.path.join(self.tmp.name, 'cache.db'), table='test_entries', **limits)
+
+    def test_evicts_least_recently_used_over_max_bytes(self):
+        cache = self.make_cache(max_bytes=30)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, b'x' * 10)
+            self.clock.now += 1
+        # Touch 'a' so 'b' becomes the least recently used
+        self.assertEqual(cache.get('a'), b'x' * 10)
+        self.clock.now += 1
+
+        cache.put('d', b'y' * 10)
+        self.assertIsNone(cache.get('b'))
+        for key in ('a', 'c', 'd'):
+            self.assertIsNotNone(cache.get(key))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['size_bytes'], 30)
+
+    def test_max_entries(self):
+        cache = self.make_cache(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, b'1')
+            self.clock.now += 1
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_ttl_expiry(self):
+        cache = self.make_cache()
+        cache.put('short', b'1', ttl=10)
+        cache.put('forever', b'2')
+        self.clock.now += 5
+        self.assertEqual(cache.get('short'), b'1')
+        self.clock.now += 10
+        self.assertIsNone(cache.get('short'))
+        self.assertEqual(cache.get('forever'), b'2')
+        self.assertEqual(cache.stats()['entries'], 1)
+
+    def test_stats_counters_are_shared_across_instances(self):
+        cache = self.make_cache()
+        cache.put('a', b'abc')
+        cache.get('a')
+        cache.get('a')
+        cache.get('missing')
+
+        stats = self.make_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertEqual(stats['hit_rate'], 0.667)
+        self.assertEqual((stats['entries'], stats['size_bytes']), (1, 3))
+
+    def test_file_cache_removes_evicted_files(self):
+        cache = FileLRUCache(os.path.join(self.tmp.name, 'files'), max_bytes=10)
+        paths = []
+        for key in ('aa11', 'bb22'):
+            source = os.path.join(self.tmp.name, f'{key}.src')
+            with open(source, 'wb') as f:
+                f.write(b'z' * 8)
+            paths.append(cache.store(key, source, etag=key))
+            self.clock.now += 1
+
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertIsNone(cache.lookup('aa11'))
+        self.assertEqual(cache.lookup('bb22')['etag'], 'bb22')
+
+    def test_make_cache_key_ignores_dict_order(self):
+        self.assertEqual(make_cache_key('x', {'a': 1, 'b': 2}), make_cache_key('x', {'b': 2, 'a': 1}))
+        self.assertNotEqual(make_cache_key('x', 1), make_cache_key('x', 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
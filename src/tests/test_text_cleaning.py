@@ -0,0 +1,70 @@
+import unittest
+
+from src.server.generate_transcript.document import build_document
+from src.server.generate_transcript.text_cleaning import clean_pages, TRUNCATION_MARKER
+
+
+def page(number, body):
+    return "\n".join(["Journal of Examples, Vol. 3", *body, str(number)])
+
+
+class TestCleanPages(unittest.TestCase):
+
+    def test_running_headers_and_page_numbers_are_removed(self):
+        topics = ["datasets", "training", "evaluation", "ablations", "limitations"]
+        pages = [page(i, [f"This page covers {topic}."]) for i, topic in enumerate(topics, 1)]
+        cleaned, stats = clean_pages(pages)
+        self.assertEqual(cleaned, [f"This page covers {topic}." for topic in topics])
+        self.assertEqual(stats["header_footer_lines"], 10)
+
+    def test_bibliography_is_dropped_but_appendix_kept(self):
+        body = [f"Paragraph {i} about the method." for i in range(10)]
+        pages = ["\n".join(body), "\n".join(["References", "[1] A. Author. A paper. 2020.",
+                                               "[2] B. Author. Another paper. 2021.",
+                                               "Appendix A", "Extra proofs."])]
+        cleaned, stats = clean_pages(pages)
+        self.assertEqual(cleaned[0], "\n".join(body))
+        self.assertEqual(cleaned[1], "Appendix A\nExtra proofs.")
+        self.assertGreater(stats["bibliography_chars"], 0)
+
+    def test_line_numbers_hyphenation_and_whitespace(self):
+        lines = [f"{100 + i}  The   experi-" if i == 2 else f"{100 + i} line {i} of the review copy" for i in range(8)]
+        lines[3] = "103 ments were run twice."
+        [text], stats = clean_pages(["\n".join(lines)])
+        self.assertIn("The experiments were run twice.", text)
+        self.assertTrue(text.startswith("line 0 of the review copy"))
+        self.assertEqual(stats["line_numbers"], 8)
+        self.assertEqual(stats["hyphenations"], 1)
+
+    def test_pages_keep_their_positions(self):
+        cleaned, _ = clean_pages(["First page.", None, "  ", "Last page."])
+        self.assertEqual(cleaned, ["First page.", "", "", "Last page."])
+
+
+class TestDocumentText(unittest.TestCase):
+
+    def test_cleaning_stats_and_savings(self):
+        topics = ["datasets", "training", "evaluation", "ablations", "limitations"]
+        pages = [page(i, [f"This page covers {topic}."]) for i, topic in enumerate(topics, 1)]
+        document = build_document(pages, token_budget=0)
+        self.assertNotIn("Journal of Examples", document.text())
+        self.assertEqual(document.stats["header_footer_lines"], 10)
+        self.assertGreater(document.stats["saved_tokens"], 0)
+        self.assertFalse(document.stats["truncated"])
+
+    def test_word_hyphenated_across_a_page_break(self):
+        document = build_document(["The experi-", "ments were run twice."], token_budget=0)
+        self.assertEqual(document.text(), "The experiments were run twice.\n")
+
+    def test_budget_truncates_at_line_break(self):
+        pages = ["\n".join(f"Sentence number {i} of a very long paper." for i in range(500))]
+        document = build_document(pages, token_budget=200)
+        text = document.text()
+        self.assertTrue(document.stats["truncated"])
+        self.assertTrue(text.rstrip("\n").endswith(TRUNCATION_MARKER))
+        self.assertTrue(text[:-len(TRUNCATION_MARKER) - 1].endswith("of a very long paper."))
+        self.assertLessEqual(document.stats["tokens"], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import unittest
+from unittest import mock
+
+from src.server.generate_transcript import pdf_processor
+from src.tests.helpers import make_figure
+
+
+class DictCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, value):
+        self.entries[key] = value
+
+
+def png_bytes(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestVisionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = DictCache()
+        patches = [
+            mock.patch.object(pdf_processor, 'get_vision_cache', return_value=self.cache),
+            mock.patch.object(pdf_processor, 'request_image_description',
+                              side_effect=lambda img: f"A {img.size[0]}px chart."),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.figure = make_figure()
+
+    def describe(self, *datas):
+        return pdf_processor.describe_images([{"page": 1, "image": n, "data": data} for n, data in enumerate(datas, 1)])
+
+    def test_identical_figure_is_served_from_cache(self):
+        self.describe(png_bytes(self.figure))
+        [described] = self.describe(png_bytes(self.figure))
+        self.assertEqual((described['description'], described['source']), ("A 400px chart.", 'cache'))
+
+    def test_near_duplicate_from_another_paper_is_described_again(self):
+        self.describe(png_bytes(self.figure))
+        [described] = self.describe(png_bytes(self.figure.resize((200, 150))))
+        self.assertEqual((described['description'], described['source']), ("A 200px chart.", 'vision'))
+
+    def test_near_duplicates_within_a_paper_share_a_description(self):
+        first, second = self.describe(png_bytes(self.figure), png_bytes(self.figure.resize((200, 150))))
+        self.assertEqual(second['description'], first['description'])
+        self.assertEqual(second['source'], 'duplicate')
+        self.assertEqual(pdf_processor.request_image_description.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()